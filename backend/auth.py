@@ -1,21 +1,32 @@
 from datetime import datetime, timedelta
+import os
 from typing import Optional, List
 from jose import JWTError, jwt
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from database.db import get_db
+from database.db import get_db, get_async_db, run_db
 from database.models import User, UserRole
+from .principal_cache import principal_cache
 
 SECRET_KEY = "SUPER_SECRET_KEY_FOR_BOOKING_App" # In production, use env variable
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Hash cost; stored hashes record their own rounds, so changing this only affects new passwords
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+
+pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto", pbkdf2_sha256__default_rounds=PASSWORD_HASH_ROUNDS)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+def derive_secret(label: bytes) -> bytes:
+    """A key of its own for `label`, derived from SECRET_KEY; HKDF is one-way, so the derived key does not reveal SECRET_KEY."""
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=label).derive(SECRET_KEY.encode())
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -34,34 +45,65 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def get_user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+def get_user_for_token(db: Session, user_id: Optional[int], email: str):
+    if user_id is None:
+        # Tokens issued before the uid claim was added
+        return get_user_by_email(db, email)
+    user = db.get(User, user_id)
+    return user if user is not None and user.email == email else None
+
+def credentials_error():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        if payload.get("sub") is None:
+            raise credentials_error()
     except JWTError:
-        raise credentials_exception
-    user = db.query(User).filter(User.email == email).first()
+        raise credentials_error()
+    return payload
+
+async def load_principal(db, claims: dict):
+    email, token_exp = claims["sub"], claims.get("exp", 0)
+    user = principal_cache.get(email, token_exp)
     if user is None:
-        raise credentials_exception
+        user = await run_db(db, get_user_for_token, claims.get("uid"), email)
+        if user is None:
+            raise credentials_error()
+        principal_cache.put(email, token_exp, user)
     return user
 
+async def get_current_user(claims: dict = Depends(get_token_claims), db = Depends(get_async_db)):
+    return await load_principal(db, claims)
+
 class RoleChecker:
     def __init__(self, allowed_roles: List[UserRole]):
         self.allowed_roles = allowed_roles
 
-    def __call__(self, user: User = Depends(get_current_user)):
+    def forbidden(self):
+        return HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have enough permissions to access this resource"
+        )
+
+    async def __call__(self, claims: dict = Depends(get_token_claims), db = Depends(get_async_db)):
+        # The signed role claim turns a token away before the user is looked up; tokens issued
+        # before the claim existed have none and are checked against the user only
+        role = claims.get("role")
+        if role is not None and role not in self.allowed_roles:
+            raise self.forbidden()
+        # The user's current role still decides, so a demotion applies before the token expires
+        user = await load_principal(db, claims)
         if user.role not in self.allowed_roles:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You do not have enough permissions to access this resource"
-            )
+            raise self.forbidden()
         return user
 
 customer_only = RoleChecker([UserRole.CUSTOMER])
@@ -0,0 +1,154 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from database.db import SessionLocal
+from database.models import EntryLog
+from .seat_reservation import run_with_busy_retry
+
+ENTRY_LOG_QUEUE_SIZE = int(os.getenv("ENTRY_LOG_QUEUE_SIZE", "10000"))
+ENTRY_LOG_BATCH_SIZE = int(os.getenv("ENTRY_LOG_BATCH_SIZE", "500"))
+ENTRY_LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("ENTRY_LOG_FLUSH_INTERVAL_SECONDS", "1"))
+
+logger = logging.getLogger(__name__)
+
+
+class EntryLogWriter:
+    """
+    Takes entry log rows off the scan path. Rows go to a bounded in-process
+    queue and a background thread inserts them in batches once `batch_size`
+    rows are waiting or `flush_interval` has passed. A full queue blocks the
+    scanning request until the writer catches up. stop() flushes everything
+    still queued; rows are only lost if the process is killed outright.
+    """
+
+    def __init__(self, session_factory=SessionLocal, max_queue: int = ENTRY_LOG_QUEUE_SIZE,
+                 batch_size: int = ENTRY_LOG_BATCH_SIZE, flush_interval: float = ENTRY_LOG_FLUSH_INTERVAL_SECONDS):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written_total = 0
+        self.batches_total = 0
+        self.failed_flushes = 0
+        self.last_flush_at = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._batch = []
+        # Held while a batch is collected or written, so flush() and the thread never share one
+        self._batch_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def log(self, db: Session, ticket_id: Optional[int], validated_by: int, result: str):
+        if not self.running:
+            # Scripts and tools that never start the writer log inline on the caller's session
+            db.add(EntryLog(ticket_id=ticket_id, validated_by=validated_by, result=result))
+            db.commit()
+            return
+        # Stamp the scan time now; the row may be inserted a second later
+        self._queue.put({"ticket_id": ticket_id, "validated_by": validated_by, "scanned_at": datetime.now(), "result": result})
+
+    def _write(self, rows):
+        db = self.session_factory()
+        try:
+            def write():
+                db.execute(insert(EntryLog), rows)
+                db.commit()
+
+            run_with_busy_retry(db, write)
+        finally:
+            db.close()
+        self.written_total += len(rows)
+        self.batches_total += 1
+        self.last_flush_at = datetime.now()
+
+    def _collect(self, deadline: Optional[float] = None):
+        """Fills the current batch up to batch_size, waiting for rows until `deadline` (monotonic time) if given."""
+        batch = self._batch
+        while len(batch) < self.batch_size:
+            try:
+                if deadline is None:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0 or self._stop.is_set():
+                        break
+                    batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self):
+        try:
+            self._write(self._batch)
+        except Exception:
+            # Keep the batch for the next attempt
+            self.failed_flushes += 1
+            raise
+        self._batch = []
+
+    def flush(self):
+        """Writes every queued row; returns how many were written."""
+        written = 0
+        with self._batch_lock:
+            while self._collect():
+                written += len(self._batch)
+                self._write_batch()
+        return written
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._batch_lock:
+                if not self._collect(deadline=time.monotonic() + self.flush_interval):
+                    continue
+                try:
+                    self._write_batch()
+                    continue
+                except Exception:
+                    logger.exception("Entry log flush failed, %d rows kept for the next attempt", len(self._batch))
+            self._stop.wait(self.flush_interval)
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="entry-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the thread and writes what is still queued. Never raises, so later shutdown steps still run."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 5)
+            if self._thread.is_alive():
+                # Still inside a write; flushing now could write its batch twice
+                logger.error("Entry log writer did not stop in time; %d rows not flushed", self._queue.qsize() + len(self._batch))
+                return
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final entry log flush failed; %d rows lost", self._queue.qsize() + len(self._batch))
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize() + len(self._batch),
+            "queue_capacity": self._queue.maxsize,
+            "written_total": self.written_total,
+            "batches_total": self.batches_total,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_at": self.last_flush_at,
+            "running": self.running,
+        }
+
+
+entry_log_writer = EntryLogWriter()
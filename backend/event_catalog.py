@@ -0,0 +1,204 @@
+import base64
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, inspect, select, tuple_
+from sqlalchemy.orm import Session
+
+from database.db import SessionLocal
+from database.models import Event, Venue, EventStatus
+
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "1024"))
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "10"))
+CATALOG_PAGE_SIZE = 20
+CATALOG_MAX_PAGE_SIZE = 100
+
+# Fields a client may project; the default is what an event card shows
+CATALOG_FIELDS = {
+    "id": Event.id,
+    "name": Event.name,
+    "category": Event.category,
+    "event_date": Event.event_date,
+    "ticket_price": Event.ticket_price,
+    "max_tickets_per_user": Event.max_tickets_per_user,
+    "venue_id": Event.venue_id,
+    "organizer_id": Event.organizer_id,
+    "venue_name": Venue.name,
+    "city": Venue.city,
+}
+DEFAULT_CATALOG_FIELDS = ("id", "name", "category", "event_date", "ticket_price", "city")
+VENUE_FIELDS = {"venue_name", "city"}
+
+# Changing any of these on an event or venue can move it in or out of a cached page
+_CATALOG_ATTRIBUTES = {Event: ("name", "category", "event_date", "ticket_price", "max_tickets_per_user", "venue_id",
+                               "organizer_id", "status"),
+                       Venue: ("name", "city")}
+
+
+class CatalogQuery(NamedTuple):
+    category: Optional[str] = None
+    city: Optional[str] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    cursor: Optional[Tuple[datetime, int]] = None
+    limit: int = CATALOG_PAGE_SIZE
+    fields: Tuple[str, ...] = DEFAULT_CATALOG_FIELDS
+
+
+def encode_cursor(event_date: datetime, event_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([event_date.isoformat(), event_id]).encode()).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        event_date, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(event_date), int(event_id)
+    except (ValueError, TypeError, UnicodeEncodeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    if not fields:
+        return DEFAULT_CATALOG_FIELDS
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in CATALOG_FIELDS]
+    if unknown or not names:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(CATALOG_FIELDS)}")
+    return names
+
+
+def list_catalog(db: Session, query: CatalogQuery):
+    """
+    One page of upcoming events, soonest first, with only the requested
+    columns. Pages are keyset-paginated on (event_date, id), so every page
+    costs the same index range scan however deep the client scrolls.
+    """
+    stmt = (
+        select(Event.event_date, Event.id, *(CATALOG_FIELDS[name] for name in query.fields))
+        .where(Event.status == EventStatus.UPCOMING)
+        .order_by(Event.event_date, Event.id)
+        .limit(query.limit + 1)
+    )
+    if query.city is not None or VENUE_FIELDS.intersection(query.fields):
+        stmt = stmt.join(Venue, Venue.id == Event.venue_id)
+    if query.category is not None:
+        stmt = stmt.where(Event.category == query.category)
+    if query.city is not None:
+        stmt = stmt.where(Venue.city == query.city)
+    if query.date_from is not None:
+        stmt = stmt.where(Event.event_date >= query.date_from)
+    if query.date_to is not None:
+        stmt = stmt.where(Event.event_date <= query.date_to)
+    if query.min_price is not None:
+        stmt = stmt.where(Event.ticket_price >= query.min_price)
+    if query.max_price is not None:
+        stmt = stmt.where(Event.ticket_price <= query.max_price)
+    if query.cursor is not None:
+        stmt = stmt.where(tuple_(Event.event_date, Event.id) > tuple_(*query.cursor))
+
+    rows = db.execute(stmt).all()
+    items = [dict(zip(query.fields, row[2:])) for row in rows[:query.limit]]
+    next_cursor = None
+    if len(rows) > query.limit:
+        last = rows[query.limit - 1]
+        next_cursor = encode_cursor(last.event_date, last.id)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+class CatalogCache:
+    """
+    Short-lived cache of encoded catalog pages keyed by the full query, so
+    repeated page loads skip the database and JSON encoding. Any committed
+    change to an event or venue clears it. Other processes only see the
+    change when their entries expire, which bounds staleness to the TTL.
+    """
+
+    def __init__(self, max_size: int = CATALOG_CACHE_SIZE, ttl: float = CATALOG_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, query: CatalogQuery) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(query)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[query]
+            self.misses += 1
+            return None
+
+    def put(self, query: CatalogQuery, page, generation: int) -> bytes:
+        """Encodes and caches `page`, unless the catalog changed since `generation` was read."""
+        body = json.dumps(jsonable_encoder(page)).encode()
+        with self._lock:
+            if generation == self.generation:
+                self._entries[query] = (body, time.monotonic() + self.ttl)
+                self._entries.move_to_end(query)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return body
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+catalog_cache = CatalogCache()
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _collect_catalog_changes(session, flush_context, instances):
+    # Bulk UPDATE statements bypass this hook; call catalog_cache.invalidate() after them
+    if session.info.get("catalog_changed"):
+        return
+    for obj in list(session.new) + list(session.deleted):
+        if type(obj) in _CATALOG_ATTRIBUTES:
+            session.info["catalog_changed"] = True
+            return
+    for obj in session.dirty:
+        attributes = _CATALOG_ATTRIBUTES.get(type(obj))
+        if attributes and any(inspect(obj).attrs[attr].history.has_changes() for attr in attributes):
+            session.info["catalog_changed"] = True
+            return
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_catalog_changes(session):
+    if session.info.pop("catalog_changed", False):
+        catalog_cache.invalidate()
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_catalog_changes(session, previous_transaction):
+    session.info.pop("catalog_changed", None)
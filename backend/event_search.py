@@ -0,0 +1,183 @@
+"""
+Full-text search over upcoming events.
+
+On SQLite the search runs against the FTS5 index created by the migrations
+(event names, categories, venue names and cities, organizer names), with
+prefix matching, bm25 ranking and single-typo correction. Other databases
+fall back to substring matching without ranking or typo tolerance.
+
+The index is kept in sync by triggers; rebuild it after restoring a backup
+or bulk-loading with triggers disabled:
+
+    python -m backend.event_search --rebuild
+"""
+import argparse
+import re
+import string
+import time
+from typing import List, Optional
+
+from sqlalchemy import DateTime, bindparam, or_, select, text
+from sqlalchemy.orm import Session
+
+from database.models import Event, OrganizerProfile, User, Venue, EventStatus
+
+SEARCH_MAX_RESULTS = 50
+SEARCH_MAX_TERMS = 8
+# Typos are only corrected in terms at least this long; shorter ones have too many neighbours
+SEARCH_MIN_TYPO_LENGTH = 4
+# bm25 weights for the name, category, venue and organizer columns
+SEARCH_COLUMN_WEIGHTS = (10.0, 2.0, 4.0, 3.0)
+
+_TERM_ALPHABET = string.ascii_lowercase + string.digits
+
+_SEARCH_SQL = text(f"""
+    SELECT e.id, e.name, e.category, e.event_date, e.ticket_price, v.city, hits.score
+    FROM (
+        SELECT rowid, bm25(event_search, {", ".join(map(str, SEARCH_COLUMN_WEIGHTS))}) AS score FROM event_search
+        WHERE event_search MATCH :match
+        ORDER BY score LIMIT :limit
+    ) AS hits
+    JOIN events e ON e.id = hits.rowid
+    LEFT JOIN venues v ON v.id = e.venue_id
+    ORDER BY hits.score
+""").columns(event_date=DateTime)
+
+_VOCAB_SQL = text("SELECT term, doc FROM event_search_vocab WHERE term IN :terms").bindparams(bindparam("terms", expanding=True))
+
+
+def search_terms(query: str) -> List[str]:
+    """Splits `query` into the terms the index's unicode61 tokenizer would produce."""
+    return re.findall(r"\w+", query.lower())[:SEARCH_MAX_TERMS]
+
+
+def match_expression(terms: List[List[str]]) -> str:
+    """
+    FTS5 MATCH string requiring every term. Each term is a list of
+    alternatives; every alternative is quoted so user input cannot inject
+    FTS syntax, and matched as a prefix once it is long enough for the
+    prefix index.
+    """
+    groups = []
+    for alternatives in terms:
+        tokens = [f'"{token}"*' if len(token) >= 2 else f'"{token}"' for token in alternatives]
+        groups.append(tokens[0] if len(tokens) == 1 else f"({' OR '.join(tokens)})")
+    return " ".join(groups)
+
+
+def edits1(term: str):
+    """Every string one deletion, transposition, substitution or insertion away from `term`."""
+    splits = [(term[:i], term[i:]) for i in range(len(term) + 1)]
+    return (
+        {a + b[1:] for a, b in splits if b}
+        | {a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1}
+        | {a + c + b[1:] for a, b in splits if b for c in _TERM_ALPHABET}
+        | {a + c + b for a, b in splits for c in _TERM_ALPHABET}
+    ) - {term}
+
+
+def _has_prefix(db: Session, term: str) -> bool:
+    return db.execute(
+        text("SELECT 1 FROM event_search_vocab WHERE term >= :term AND term < :upper LIMIT 1"),
+        {"term": term, "upper": term + "\uffff"},
+    ).first() is not None
+
+
+def correct_terms(db: Session, terms: List[str]) -> Optional[List[List[str]]]:
+    """
+    Replaces each term that matches nothing in the index with the indexed
+    words one edit away from it, most common first. Returns None if no term
+    needed or got a correction.
+    """
+    corrected, changed = [], False
+    for term in terms:
+        if len(term) < SEARCH_MIN_TYPO_LENGTH or _has_prefix(db, term):
+            corrected.append([term])
+            continue
+        candidates = db.execute(_VOCAB_SQL, {"terms": sorted(edits1(term))}).all()
+        if not candidates:
+            corrected.append([term])
+            continue
+        corrected.append([word for word, _ in sorted(candidates, key=lambda row: -row.doc)[:3]])
+        changed = True
+    return corrected if changed else None
+
+
+def _search_fts(db: Session, terms: List[str], limit: int):
+    rows = db.execute(_SEARCH_SQL, {"match": match_expression([[term] for term in terms]), "limit": limit}).all()
+    corrected_query = None
+    if not rows:
+        corrected = correct_terms(db, terms)
+        if corrected is not None:
+            rows = db.execute(_SEARCH_SQL, {"match": match_expression(corrected), "limit": limit}).all()
+            corrected_query = " ".join(alternatives[0] for alternatives in corrected)
+    return [dict(row._mapping) for row in rows], corrected_query
+
+
+def search_like(db: Session, terms: List[str], limit: int):
+    """The substring search used where there is no FTS5 index; it scans every upcoming event."""
+    stmt = (
+        select(Event.id, Event.name, Event.category, Event.event_date, Event.ticket_price, Venue.city)
+        .outerjoin(Venue, Venue.id == Event.venue_id)
+        .outerjoin(OrganizerProfile, OrganizerProfile.user_id == Event.organizer_id)
+        .outerjoin(User, User.id == Event.organizer_id)
+        .where(Event.status == EventStatus.UPCOMING)
+        .order_by(Event.event_date, Event.id)
+        .limit(limit)
+    )
+    for term in terms:
+        pattern = f"%{term}%"
+        stmt = stmt.where(or_(Event.name.ilike(pattern), Event.category.ilike(pattern), Venue.name.ilike(pattern),
+                              Venue.city.ilike(pattern), OrganizerProfile.company_name.ilike(pattern), User.name.ilike(pattern)))
+    return [dict(row._mapping) for row in db.execute(stmt)], None
+
+
+def search_events(db: Session, query: str, limit: int = 20):
+    """Best matching upcoming events for `query`, as event cards with a relevance score (lower is better)."""
+    terms = search_terms(query)
+    if not terms:
+        return {"query": query, "corrected_query": None, "items": []}
+    if db.get_bind().dialect.name == "sqlite":
+        items, corrected_query = _search_fts(db, terms, limit)
+    else:
+        items, corrected_query = search_like(db, terms, limit)
+    return {"query": query, "corrected_query": corrected_query, "items": items}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild", action="store_true", help="repopulate the index from the event tables")
+    parser.add_argument("query", nargs="?", help="run a search and print the results")
+    args = parser.parse_args(argv)
+    if not args.rebuild and not args.query:
+        parser.error("nothing to do: pass --rebuild and/or a query")
+
+    from database.db import engine, SessionLocal
+    from database.migrations import rebuild_event_search, run_migrations
+
+    if args.rebuild:
+        if engine.dialect.name != "sqlite":
+            parser.error("the full-text index is only used on SQLite")
+        run_migrations(engine)
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            rebuild_event_search(conn)
+            indexed = conn.execute(text("SELECT count(*) FROM event_search")).scalar()
+        print(f"Indexed {indexed} upcoming events in {time.perf_counter() - started:.1f}s")
+    if args.query:
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            result = search_events(db, args.query)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        finally:
+            db.close()
+        if result["corrected_query"]:
+            print(f"Showing results for: {result['corrected_query']}")
+        for item in result["items"]:
+            print(f"{item['id']:>8}  {item['name']}  ({item['category']}, {item['city']}, {item['event_date']})")
+        print(f"{len(result['items'])} results in {elapsed_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
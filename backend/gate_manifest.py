@@ -0,0 +1,185 @@
+import base64
+import hashlib
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from database.models import EntryLog, Order, Ticket, TicketStatus
+from .seat_reservation import run_with_busy_retry
+from .event_stats import add_event_stats
+from .auth import derive_secret
+
+# Each manifest entry is an 8-byte code hash followed by a 4-byte ticket id, sorted by hash
+MANIFEST_RECORD = struct.Struct(">QI")
+SYNC_CHUNK_SIZE = 500
+
+# Manifests are signed with Ed25519 and gates only ever hold the public key, so a stolen
+# scanner can check manifests but not forge one. GATE_MANIFEST_PRIVATE_KEY is the base64
+# 32-byte private key; without it one is derived from SECRET_KEY under its own label.
+_MANIFEST_SIGNING_KEY = Ed25519PrivateKey.from_private_bytes(
+    base64.b64decode(os.environ["GATE_MANIFEST_PRIVATE_KEY"]) if os.getenv("GATE_MANIFEST_PRIVATE_KEY")
+    else derive_secret(b"gate-manifest")
+)
+# What gates are given (GET /entry/manifest-key), base64 of the raw 32-byte public key
+MANIFEST_PUBLIC_KEY = base64.b64encode(
+    _MANIFEST_SIGNING_KEY.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+).decode("ascii")
+
+
+def code_hash(ticket_code: str) -> int:
+    return int.from_bytes(hashlib.sha256(ticket_code.strip().upper().encode()).digest()[:8], "big")
+
+
+def _manifest_payload(event_id: int, generated_at: str, entries: str) -> bytes:
+    return f"manifest:{event_id}:{generated_at}:{entries}".encode()
+
+
+def build_manifest(db: Session, event_id: int):
+    """
+    Compact, signed snapshot of the event's active tickets for offline gates:
+    a sorted array of (code hash, ticket id) records. Gates never receive the
+    codes themselves, only their hashes.
+    """
+    rows = (
+        db.query(Ticket.id, Ticket.ticket_code)
+        .join(Order, Ticket.order_id == Order.id)
+        .filter(Order.event_id == event_id, Ticket.status == TicketStatus.ACTIVE)
+        .all()
+    )
+    records = sorted((code_hash(code), ticket_id) for ticket_id, code in rows if code)
+    entries = base64.b64encode(b"".join(MANIFEST_RECORD.pack(*r) for r in records)).decode("ascii")
+    generated_at = datetime.now().isoformat()
+    return {
+        "event_id": event_id,
+        "generated_at": generated_at,
+        "ticket_count": len(records),
+        "entries": entries,
+        "signature": base64.b64encode(_MANIFEST_SIGNING_KEY.sign(_manifest_payload(event_id, generated_at, entries))).decode("ascii"),
+    }
+
+
+def verify_manifest(manifest, public_key: str = MANIFEST_PUBLIC_KEY) -> bool:
+    """Whether `manifest` was signed by the key whose base64 public half is `public_key`."""
+    payload = _manifest_payload(manifest["event_id"], manifest["generated_at"], manifest["entries"])
+    try:
+        Ed25519PublicKey.from_public_bytes(base64.b64decode(public_key)).verify(base64.b64decode(manifest["signature"]), payload)
+    except (InvalidSignature, ValueError):
+        return False
+    return True
+
+
+class GateScanner:
+    """
+    Validates scans at one gate against a manifest with no network access.
+    Admitted tickets are remembered in memory; every scan is queued for a
+    later upload with apply_gate_scans().
+    """
+
+    def __init__(self, manifest, public_key: Optional[str] = MANIFEST_PUBLIC_KEY):
+        if public_key is not None and not verify_manifest(manifest, public_key):
+            raise ValueError("Manifest signature does not match")
+        self.event_id = manifest["event_id"]
+        self._hashes = array("Q")
+        self._ticket_ids = array("I")
+        for h, ticket_id in MANIFEST_RECORD.iter_unpack(base64.b64decode(manifest["entries"])):
+            self._hashes.append(h)
+            self._ticket_ids.append(ticket_id)
+        self.admitted = set()
+        self.scans: List[Dict] = []
+
+    def lookup(self, ticket_code: str) -> Optional[int]:
+        h = code_hash(ticket_code)
+        i = bisect_left(self._hashes, h)
+        if i < len(self._hashes) and self._hashes[i] == h:
+            return self._ticket_ids[i]
+        return None
+
+    def scan(self, ticket_code: str, scanned_at: Optional[datetime] = None):
+        ticket_id = self.lookup(ticket_code)
+        if ticket_id is None:
+            result, reason = "failed", "Invalid ticket"
+        elif ticket_id in self.admitted:
+            result, reason = "failed", "Ticket already used"
+        else:
+            self.admitted.add(ticket_id)
+            result, reason = "success", "Valid ticket"
+        self.scans.append({"ticket_id": ticket_id, "scanned_at": scanned_at or datetime.now(), "result": result})
+        return result, reason, ticket_id
+
+    def drain_scans(self) -> List[Dict]:
+        scans, self.scans = self.scans, []
+        return scans
+
+
+def apply_gate_scans(db: Session, event_id: int, scans: List[Dict], validated_by: int):
+    """
+    Reconciles scans uploaded by an offline gate. The earliest successful scan
+    of each ticket marks it used with a conditional UPDATE; a ticket that was
+    meanwhile used elsewhere, cancelled or never belonged to the event is
+    reported as a conflict. Every scan is kept in the entry log. Nothing is
+    committed until the end, so the whole upload is retried if the database is busy.
+    """
+    def reconcile():
+        first_admission = {}
+        for scan in sorted(scans, key=lambda s: s["scanned_at"]):
+            if scan["result"] == "success" and scan["ticket_id"] is not None:
+                first_admission.setdefault(scan["ticket_id"], scan)
+
+        event_orders = select(Order.id).where(Order.event_id == event_id)
+        ticket_ids = list(first_admission)
+        marked = set()
+        for i in range(0, len(ticket_ids), SYNC_CHUNK_SIZE):
+            marked.update(db.execute(
+                update(Ticket)
+                .where(
+                    Ticket.id.in_(ticket_ids[i:i + SYNC_CHUNK_SIZE]),
+                    Ticket.order_id.in_(event_orders),
+                    Ticket.status == TicketStatus.ACTIVE,
+                )
+                .values(status=TicketStatus.USED)
+                .returning(Ticket.id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all())
+
+        rejected = [ticket_id for ticket_id in ticket_ids if ticket_id not in marked]
+        current = {}
+        for i in range(0, len(rejected), SYNC_CHUNK_SIZE):
+            current.update(db.query(Ticket.id, Ticket.status).filter(Ticket.id.in_(rejected[i:i + SYNC_CHUNK_SIZE])).all())
+        reasons = {TicketStatus.USED: "Ticket already used", TicketStatus.CANCELLED: "Ticket cancelled"}
+
+        conflicts, log_rows = [], []
+        for scan in scans:
+            result = scan["result"]
+            if result == "success":
+                ticket_id = scan["ticket_id"]
+                if first_admission.get(ticket_id) is not scan:
+                    result = "conflict"
+                    conflicts.append({"ticket_id": ticket_id, "scanned_at": scan["scanned_at"], "reason": "Ticket already used"})
+                elif ticket_id not in marked:
+                    result = "conflict"
+                    conflicts.append({"ticket_id": ticket_id, "scanned_at": scan["scanned_at"],
+                                      "reason": reasons.get(current.get(ticket_id), "Invalid ticket")})
+            log_rows.append({"ticket_id": scan["ticket_id"], "validated_by": validated_by,
+                             "scanned_at": scan["scanned_at"], "result": result})
+        if log_rows:
+            db.execute(insert(EntryLog), log_rows)
+        add_event_stats(db, event_id, scans_admitted=len(marked))
+        db.commit()
+
+        return {
+            "received": len(scans),
+            "admitted": len(marked),
+            "failed": sum(1 for scan in scans if scan["result"] != "success"),
+            "conflicts": conflicts,
+        }
+
+    return run_with_busy_retry(db, reconcile)
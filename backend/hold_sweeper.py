@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import update
+
+from database.db import SessionLocal
+from database.models import Seat, Order, SeatStatus, OrderStatus
+from .seat_reservation import bump_inventory_version, record_seat_changes
+from .event_stats import add_seat_transition
+
+HOLD_SWEEP_INTERVAL_SECONDS = float(os.getenv("HOLD_SWEEP_INTERVAL_SECONDS", "5"))
+HOLD_SWEEP_BATCH_SIZE = int(os.getenv("HOLD_SWEEP_BATCH_SIZE", "500"))
+
+logger = logging.getLogger(__name__)
+
+
+class HoldSweeper:
+    """
+    Background thread that releases expired seat holds and cancels the
+    pending orders that owned them. Each batch is one indexed range read on
+    (status, held_until) plus conditional UPDATEs that stamp a new
+    inventory version on each affected event.
+    """
+
+    def __init__(self, session_factory=SessionLocal, interval: float = HOLD_SWEEP_INTERVAL_SECONDS,
+                 batch_size: int = HOLD_SWEEP_BATCH_SIZE):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.reclaimed_total = 0
+        self.orders_cancelled_total = 0
+        self.last_sweep_at = None
+        self.lag_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sweep_once(self) -> int:
+        reclaimed = 0
+        db = self.session_factory()
+        try:
+            now = datetime.now()
+            oldest = (
+                db.query(Seat.held_until)
+                .filter(Seat.status == SeatStatus.HELD, Seat.held_until < now)
+                .order_by(Seat.held_until)
+                .first()
+            )
+            # How long the oldest expired hold has been waiting to be reclaimed
+            self.lag_seconds = (now - oldest.held_until).total_seconds() if oldest else 0.0
+
+            while True:
+                expired = (
+                    db.query(Seat.id, Seat.event_id, Seat.order_id)
+                    .filter(Seat.status == SeatStatus.HELD, Seat.held_until < now)
+                    .order_by(Seat.held_until)
+                    .limit(self.batch_size)
+                    .all()
+                )
+                if not expired:
+                    break
+
+                expired_by_event = defaultdict(list)
+                for s in expired:
+                    expired_by_event[s.event_id].append(s.id)
+
+                released_by_event = {}
+                for event_id, seat_ids in expired_by_event.items():
+                    version = bump_inventory_version(db, event_id)
+                    released_by_event[event_id] = db.execute(
+                        update(Seat)
+                        .where(Seat.id.in_(seat_ids), Seat.status == SeatStatus.HELD, Seat.held_until < now)
+                        .values(status=SeatStatus.AVAILABLE, held_until=None, order_id=None, version=version)
+                        .returning(Seat.id)
+                        .execution_options(synchronize_session=False)
+                    ).scalars().all()
+                    record_seat_changes(db, event_id, released_by_event[event_id], SeatStatus.AVAILABLE, version)
+                    add_seat_transition(db, event_id, len(released_by_event[event_id]), SeatStatus.HELD, SeatStatus.AVAILABLE)
+
+                order_ids = {s.order_id for s in expired if s.order_id is not None}
+                cancelled = 0
+                if order_ids:
+                    cancelled = db.execute(
+                        update(Order)
+                        .where(Order.id.in_(order_ids), Order.order_status == OrderStatus.PENDING)
+                        .values(order_status=OrderStatus.CANCELLED)
+                        .execution_options(synchronize_session=False)
+                    ).rowcount
+                db.commit()
+
+                reclaimed += sum(len(seat_ids) for seat_ids in released_by_event.values())
+                self.orders_cancelled_total += cancelled
+                if len(expired) < self.batch_size:
+                    break
+        finally:
+            db.close()
+
+        self.reclaimed_total += reclaimed
+        self.last_sweep_at = datetime.now()
+        return reclaimed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep_once()
+            except Exception:
+                logger.exception("Hold sweep failed")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hold-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+
+    def stats(self):
+        return {
+            "reclaimed_total": self.reclaimed_total,
+            "orders_cancelled_total": self.orders_cancelled_total,
+            "lag_seconds": self.lag_seconds,
+            "last_sweep_at": self.last_sweep_at,
+            "running": bool(self._thread and self._thread.is_alive()),
+        }
+
+
+hold_sweeper = HoldSweeper()
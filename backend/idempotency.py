@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.models import IdempotencyKey
+
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "300"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+def request_fingerprint(endpoint: str, payload) -> str:
+    body = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{endpoint}\n{body}".encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Remembers the response to each (user, Idempotency-Key) pair for a TTL, so
+    a retried request gets the original response back with one primary-key
+    read instead of running again. The response is stored in the same
+    transaction as the work it describes. Only successful responses are
+    stored: a request that failed changed nothing and may be retried with
+    the same key.
+    """
+
+    def __init__(self, ttl_seconds: int = IDEMPOTENCY_KEY_TTL_SECONDS,
+                 purge_interval: float = IDEMPOTENCY_PURGE_INTERVAL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self.stored_total = 0
+        self.replayed_total = 0
+        self.mismatched_total = 0
+        self.purged_total = 0
+        self._last_purge = 0.0
+
+    def _lookup(self, db: Session, user_id: int, key: str, fingerprint: str):
+        """Returns (record, stored response); the response is None if the key is new or expired."""
+        record = db.get(IdempotencyKey, (user_id, key))
+        if record is None or record.expires_at <= datetime.now():
+            return record, None
+        if record.request_hash != fingerprint:
+            self.mismatched_total += 1
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        self.replayed_total += 1
+        return record, json.loads(record.response)
+
+    def _purge_expired(self, db: Session):
+        if time.monotonic() - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = time.monotonic()
+        self.purged_total += db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.expires_at < datetime.now())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    def run(self, db: Session, user_id: int, key: Optional[str], endpoint: str, payload, fn, *args):
+        """
+        Runs fn(db, *args), which must not commit, and commits its work along
+        with the response. If `key` was already used by this user for the same
+        endpoint and payload, returns the stored response without calling fn.
+        """
+        if key is None:
+            response = fn(db, *args)
+            db.commit()
+            return response
+        if not 0 < len(key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters")
+
+        fingerprint = request_fingerprint(endpoint, payload)
+        record, stored = self._lookup(db, user_id, key, fingerprint)
+        if stored is not None:
+            return stored
+        try:
+            response = fn(db, *args)
+            if record is None:
+                record = IdempotencyKey(user_id=user_id, key=key)
+                db.add(record)
+            record.request_hash = fingerprint
+            record.response = json.dumps(jsonable_encoder(response))
+            record.expires_at = datetime.now() + timedelta(seconds=self.ttl_seconds)
+            db.flush()
+            self._purge_expired(db)
+            db.commit()
+        except (HTTPException, IntegrityError):
+            # A concurrent request with the same key may have committed first; if so, answer like it did
+            db.rollback()
+            _, stored = self._lookup(db, user_id, key, fingerprint)
+            if stored is None:
+                raise
+            return stored
+        self.stored_total += 1
+        return response
+
+    def stats(self):
+        return {
+            "stored_total": self.stored_total,
+            "replayed_total": self.replayed_total,
+            "mismatched_total": self.mismatched_total,
+            "purged_total": self.purged_total,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+idempotency_store = IdempotencyStore()
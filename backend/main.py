@@ -1,19 +1,41 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from database.db import engine, Base, get_db
+from database.db import engine, Base, get_db, get_async_db, run_db
+from database.migrations import run_migrations
 from database.models import User, UserRole, Order, OrderStatus, Ticket, TicketStatus, Seat
 from pydantic import BaseModel
-from .auth import get_password_hash, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, RoleChecker, customer_only
+from .auth import get_password_hash, verify_password, create_access_token, get_user_by_email, ACCESS_TOKEN_EXPIRE_MINUTES, RoleChecker, customer_only
 
 from datetime import timedelta
 from typing import List, Optional
-from .routers import admin, organizer, customer, entry, support, organizer_profile
+from .routers import admin, organizer, customer, entry, support, organizer_profile, payments
+from .hold_sweeper import hold_sweeper
+from .entry_log_writer import entry_log_writer
+from .password_pool import password_pool, PasswordPoolBusyError, PASSWORD_HASH_RETRY_AFTER_SECONDS
+from .payment_utils import payment_gateway
+from .payment_outbox import payment_event_processor
+from .event_stats import event_stats_reconciler
+from contextlib import asynccontextmanager
 import uuid
 
-Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
-app = FastAPI(title="Event Ticket Booking Platform API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    hold_sweeper.start()
+    entry_log_writer.start()
+    payment_event_processor.start()
+    event_stats_reconciler.start()
+    yield
+    hold_sweeper.stop()
+    entry_log_writer.stop()
+    payment_event_processor.stop()
+    event_stats_reconciler.stop()
+    password_pool.shutdown()
+    await payment_gateway.aclose()
+
+app = FastAPI(title="Event Ticket Booking Platform API", lifespan=lifespan)
 
 app.include_router(admin.router)
 app.include_router(organizer.router)
@@ -21,6 +43,7 @@ app.include_router(customer.router)
 app.include_router(entry.router)
 app.include_router(support.router)
 app.include_router(organizer_profile.router)
+app.include_router(payments.router)
 
 class UserCreate(BaseModel):
     name: str
@@ -28,23 +51,43 @@ class UserCreate(BaseModel):
     password: str
     role: UserRole = UserRole.CUSTOMER
 
-@app.post("/signup")
-def signup(user_data: UserCreate, db: Session = Depends(get_db)):
+def password_pool_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, please retry shortly",
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
 
-    db_user = db.query(User).filter(User.email == user_data.email).first()
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_pwd = get_password_hash(user_data.password)
+def create_user(db: Session, user_data: UserCreate, hashed_pwd: str):
     new_user = User(name=user_data.name, email=user_data.email, password=hashed_pwd, role=user_data.role)
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    return new_user
+
+@app.post("/signup")
+async def signup(user_data: UserCreate, db = Depends(get_async_db)):
+
+    try:
+        with password_pool.admit():
+            db_user = await run_db(db, get_user_by_email, user_data.email)
+            if db_user:
+                raise HTTPException(status_code=400, detail="Email already registered")
+            hashed_pwd = await password_pool.run(get_password_hash, user_data.password)
+    except PasswordPoolBusyError:
+        raise password_pool_busy()
+    new_user = await run_db(db, create_user, user_data, hashed_pwd)
     return {"message": "User created successfully", "user_id": new_user.id}
 
 @app.post("/token")
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db = Depends(get_async_db)):
+    try:
+        with password_pool.admit():
+            user = await run_db(db, get_user_by_email, form_data.username)
+            password_ok = user is not None and await password_pool.run(verify_password, form_data.password, user.password)
+    except PasswordPoolBusyError:
+        raise password_pool_busy()
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -52,7 +95,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": user.id, "role": user.role}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer", "role": user.role}
 
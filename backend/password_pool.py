@@ -0,0 +1,95 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+# Hashing workers yield the CPU to request handling when both want it
+PASSWORD_HASH_NICE = int(os.getenv("PASSWORD_HASH_NICE", "10"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+
+
+def _lower_priority(increment: int):
+    if increment and hasattr(os, "nice"):
+        os.nice(increment)
+
+
+class PasswordPoolBusyError(Exception):
+    def __init__(self):
+        super().__init__("Password hashing pool is saturated")
+
+
+class PasswordHashingPool:
+    """
+    Dedicated, size-limited worker processes for password hashing and
+    verification, so pbkdf2 never runs on the event loop or the request
+    threadpool and cannot starve them of CPU during a login storm. At most
+    `workers + max_pending` requests are admitted; beyond that admit() raises
+    PasswordPoolBusyError instead of queueing.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.completed = 0
+        self.rejected = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @contextmanager
+    def admit(self):
+        """
+        Reserves a slot for one signup or login. Taken before any other work,
+        so an overloaded server rejects requests before touching the database.
+        """
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_pending:
+                self.rejected += 1
+                raise PasswordPoolBusyError()
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the parent already runs the hold sweeper and threadpool threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_lower_priority,
+                    initargs=(PASSWORD_HASH_NICE,),
+                )
+            return self._executor
+
+    async def run(self, fn, *args):
+        result = await asyncio.wrap_future(self._get_executor().submit(fn, *args))
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self._in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+password_pool = PasswordHashingPool()
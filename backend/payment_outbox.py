@@ -0,0 +1,255 @@
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+
+from database.db import SessionLocal, dialect_insert
+from database.models import Order, PaymentEvent, Seat, OrderStatus, PaymentEventStatus, SeatStatus
+from .seat_reservation import bump_inventory_version, record_seat_changes, run_with_busy_retry
+from .ticket_issuance import issue_order_tickets
+from .event_stats import add_event_stats, add_seat_transition
+
+# Webhook events that carry a captured payment; anything else is acknowledged and dropped
+PAYMENT_EVENT_TYPES = {"payment.captured", "order.paid"}
+
+PAYMENT_OUTBOX_BATCH_SIZE = int(os.getenv("PAYMENT_OUTBOX_BATCH_SIZE", "200"))
+PAYMENT_OUTBOX_INTERVAL_SECONDS = float(os.getenv("PAYMENT_OUTBOX_INTERVAL_SECONDS", "1"))
+PAYMENT_OUTBOX_MAX_ATTEMPTS = int(os.getenv("PAYMENT_OUTBOX_MAX_ATTEMPTS", "5"))
+
+payment_events_table = PaymentEvent.__table__
+
+logger = logging.getLogger(__name__)
+
+
+def record_payment_event(db: Session, event_type: str, payment, payload: str) -> bool:
+    """
+    Queues the payment entity of a verified webhook in the outbox and commits.
+    Returns False if the payment was already queued (Razorpay redelivers
+    webhooks, and sends both payment.captured and order.paid for a payment).
+    """
+    stmt = dialect_insert(db, PaymentEvent).values(
+        gateway_payment_id=payment["id"],
+        gateway_order_id=payment.get("order_id"),
+        event_type=event_type,
+        amount=payment.get("amount"),
+        payload=payload,
+        status=PaymentEventStatus.PENDING,
+        attempts=0,
+    ).on_conflict_do_nothing(index_elements=["gateway_payment_id"])
+
+    def write():
+        inserted = db.execute(stmt).rowcount
+        db.commit()
+        return inserted
+
+    return bool(run_with_busy_retry(db, write))
+
+
+class PaymentEventProcessor:
+    """
+    Background thread that applies queued payment webhooks. A batch of events
+    is applied in one transaction: the held seats of every paid order are
+    booked with one conditional UPDATE per event, the orders are confirmed
+    with another, and all their tickets are issued with one bulk insert. Locks
+    are taken in the same order as the hold sweeper (event, seats, orders).
+    Payments that cannot be applied (unknown order, wrong amount, order
+    cancelled, or some of its seats no longer held) are marked rejected for a
+    manual refund; an order is only booked if all of its seats still are.
+    """
+
+    def __init__(self, session_factory=SessionLocal, interval: float = PAYMENT_OUTBOX_INTERVAL_SECONDS,
+                 batch_size: int = PAYMENT_OUTBOX_BATCH_SIZE, max_attempts: int = PAYMENT_OUTBOX_MAX_ATTEMPTS):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.outcomes = Counter()
+        self.batches_total = 0
+        self.last_batch_at = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _apply(self, db: Session, events: List[PaymentEvent]) -> Counter:
+        """Applies `events` and records their outcome, then commits."""
+        orders = {
+            order.gateway_order_id: order
+            for order in db.query(Order).filter(Order.gateway_order_id.in_({e.gateway_order_id for e in events}))
+        }
+        outcome = {}
+        paid = {}  # order id -> (order, event)
+        for event in events:
+            order = orders.get(event.gateway_order_id)
+            if order is None:
+                outcome[event.id] = (PaymentEventStatus.REJECTED, "Unknown gateway order")
+            elif order.order_status == OrderStatus.CONFIRMED:
+                outcome[event.id] = (PaymentEventStatus.IGNORED, "Order already confirmed")
+            elif order.order_status != OrderStatus.PENDING:
+                outcome[event.id] = (PaymentEventStatus.REJECTED, f"Order is {order.order_status}")
+            elif event.amount != round(order.total_amount * 100):
+                outcome[event.id] = (PaymentEventStatus.REJECTED, "Amount does not match the order")
+            elif order.id in paid:
+                outcome[event.id] = (PaymentEventStatus.REJECTED, "Order was paid twice")
+            else:
+                paid[order.id] = (order, event)
+
+        order_ids_by_event = defaultdict(list)
+        for order, _ in paid.values():
+            order_ids_by_event[order.event_id].append(order.id)
+        booked = defaultdict(list)
+        short = {}  # order id -> why its seats cannot all be booked
+        for event_id, order_ids in order_ids_by_event.items():
+            # Holds past held_until still count until the sweeper releases them: the customer has paid
+            version = bump_inventory_version(db, event_id)
+            # Every seat writer takes the event's version lock first, so these counts hold until commit
+            held = dict(
+                db.query(Seat.order_id, func.count(Seat.id))
+                .filter(Seat.order_id.in_(order_ids), Seat.status == SeatStatus.HELD)
+                .group_by(Seat.order_id)
+            )
+            complete = []
+            for order_id in order_ids:
+                expected = paid[order_id][0].seat_count
+                if not held.get(order_id):
+                    short[order_id] = "Seat hold was released before the payment arrived"
+                elif expected is not None and held[order_id] != expected:
+                    short[order_id] = f"Only {held[order_id]} of {expected} seats are still held"
+                else:
+                    complete.append(order_id)
+            if not complete:
+                continue
+            rows = db.execute(
+                update(Seat)
+                .where(Seat.order_id.in_(complete), Seat.status == SeatStatus.HELD)
+                .values(status=SeatStatus.BOOKED, held_until=None, version=version)
+                .returning(Seat.id, Seat.order_id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            for seat_id, order_id in rows:
+                booked[order_id].append(seat_id)
+            record_seat_changes(db, event_id, [seat_id for seat_id, _ in rows], SeatStatus.BOOKED, version)
+            add_seat_transition(db, event_id, len(rows), SeatStatus.HELD, SeatStatus.BOOKED)
+
+        confirmed = set()
+        if booked:
+            confirmed = set(db.execute(
+                update(Order)
+                .where(Order.id.in_(booked), Order.order_status == OrderStatus.PENDING)
+                .values(order_status=OrderStatus.CONFIRMED, payment_mode="razorpay")
+                .returning(Order.id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all())
+        issued = issue_order_tickets(db, [(paid[order_id][0], booked[order_id]) for order_id in confirmed])
+        revenue = defaultdict(float)
+        for order_id in confirmed:
+            revenue[paid[order_id][0].event_id] += paid[order_id][0].total_amount
+        for event_id, amount in revenue.items():
+            add_event_stats(db, event_id, gross_revenue=amount)
+        for order_id, (order, event) in paid.items():
+            if order_id in confirmed:
+                outcome[event.id] = (PaymentEventStatus.PROCESSED, f"{len(issued.get(order_id, []))} tickets issued")
+            else:
+                outcome[event.id] = (PaymentEventStatus.REJECTED, short.get(order_id, "Order was no longer pending"))
+
+        now = datetime.now()
+        db.execute(
+            update(payment_events_table)
+            .where(payment_events_table.c.id == bindparam("event_id"), payment_events_table.c.status == PaymentEventStatus.PENDING)
+            .values(status=bindparam("new_status"), result=bindparam("new_result"), processed_at=now,
+                    attempts=payment_events_table.c.attempts + 1),
+            [{"event_id": event_id, "new_status": status, "new_result": result} for event_id, (status, result) in outcome.items()],
+        )
+        db.commit()
+        return Counter(status.value for status, _ in outcome.values())
+
+    def _record_failure(self, db: Session, event_id: int, error: Exception):
+        event = db.get(PaymentEvent, event_id)
+        event.attempts = (event.attempts or 0) + 1
+        event.result = f"{type(error).__name__}: {error}"[:500]
+        if event.attempts >= self.max_attempts:
+            event.status = PaymentEventStatus.FAILED
+            event.processed_at = datetime.now()
+            self.outcomes[PaymentEventStatus.FAILED.value] += 1
+        db.commit()
+
+    def process_once(self) -> int:
+        """Applies one batch of pending events; returns how many were taken."""
+        db = self.session_factory()
+        try:
+            event_ids = [event_id for (event_id,) in (
+                db.query(PaymentEvent.id)
+                .filter(PaymentEvent.status == PaymentEventStatus.PENDING)
+                .order_by(PaymentEvent.id)
+                .limit(self.batch_size)
+            )]
+            if not event_ids:
+                return 0
+
+            def apply(ids):
+                events = db.query(PaymentEvent).filter(PaymentEvent.id.in_(ids), PaymentEvent.status == PaymentEventStatus.PENDING).all()
+                return self._apply(db, events) if events else Counter()
+
+            try:
+                self.outcomes.update(run_with_busy_retry(db, lambda: apply(event_ids)))
+            except Exception:
+                db.rollback()
+                logger.exception("Payment event batch failed, retrying events one at a time")
+                # Isolate the event that breaks the batch; the rest still go through
+                for event_id in event_ids:
+                    try:
+                        self.outcomes.update(run_with_busy_retry(db, lambda: apply([event_id])))
+                    except Exception as e:
+                        db.rollback()
+                        logger.exception("Payment event %s failed", event_id)
+                        self._record_failure(db, event_id, e)
+            self.batches_total += 1
+            self.last_batch_at = datetime.now()
+            return len(event_ids)
+        finally:
+            db.close()
+
+    def wake(self):
+        """Asks the thread to process now instead of at the next interval, e.g. after a webhook was queued."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                while not self._stop.is_set() and self.process_once() == self.batch_size:
+                    pass
+            except Exception:
+                logger.exception("Payment event processing failed")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="payment-event-processor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 5)
+
+    def stats(self):
+        return {
+            "processed_total": self.outcomes[PaymentEventStatus.PROCESSED.value],
+            "ignored_total": self.outcomes[PaymentEventStatus.IGNORED.value],
+            "rejected_total": self.outcomes[PaymentEventStatus.REJECTED.value],
+            "failed_total": self.outcomes[PaymentEventStatus.FAILED.value],
+            "batches_total": self.batches_total,
+            "last_batch_at": self.last_batch_at,
+            "running": bool(self._thread and self._thread.is_alive()),
+        }
+
+
+payment_event_processor = PaymentEventProcessor()
@@ -1,39 +1,213 @@
-import razorpay
+import asyncio
+import hashlib
+import hmac
 import os
+import random
+import time
+
+import httpx
 
 # Razorpay Configuration
 # Replace these with your actual keys or use environment variables
 RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID", "rzp_test_placeholder_id")
 RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "placeholder_secret")
+# Set when the webhook is configured in the Razorpay dashboard
+RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET", "placeholder_webhook_secret")
+# Point at `python -m benchmarks.fake_razorpay` for local runs and load tests
+RAZORPAY_API_URL = os.getenv("RAZORPAY_API_URL", "https://api.razorpay.com/v1")
+
+RAZORPAY_TIMEOUT_SECONDS = float(os.getenv("RAZORPAY_TIMEOUT_SECONDS", "5"))
+RAZORPAY_CONNECT_TIMEOUT_SECONDS = float(os.getenv("RAZORPAY_CONNECT_TIMEOUT_SECONDS", "2"))
+RAZORPAY_MAX_CONNECTIONS = int(os.getenv("RAZORPAY_MAX_CONNECTIONS", "50"))
+RAZORPAY_MAX_RETRIES = int(os.getenv("RAZORPAY_MAX_RETRIES", "2"))
+RAZORPAY_RETRY_BACKOFF_SECONDS = float(os.getenv("RAZORPAY_RETRY_BACKOFF_SECONDS", "0.2"))
+# Consecutive failed calls that open the circuit, and how long it stays open
+RAZORPAY_BREAKER_THRESHOLD = int(os.getenv("RAZORPAY_BREAKER_THRESHOLD", "5"))
+RAZORPAY_BREAKER_RESET_SECONDS = float(os.getenv("RAZORPAY_BREAKER_RESET_SECONDS", "30"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
 
-client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+class GatewayError(Exception):
+    pass
 
-def create_razorpay_order(amount_in_inr: float, receipt_id: str):
+
+class GatewayUnavailableError(GatewayError):
+    def __init__(self, retry_after: float):
+        super().__init__("Payment gateway is unavailable")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
     """
-    Creates a Razorpay order.
-    Amount should be in INR (automatically converted to paise).
+    Closed until `threshold` consecutive calls fail, then open: calls are
+    refused immediately for `reset_timeout` seconds. After that one trial call
+    is let through (half-open); its outcome closes or re-opens the circuit.
     """
-    data = {
-        "amount": int(amount_in_inr * 100),  # amount in paise
-        "currency": "INR",
-        "receipt": receipt_id,
-        "payment_capture": 1  # auto capture
-    }
-    order = client.order.create(data=data)
-    return order
+
+    def __init__(self, threshold: int = RAZORPAY_BREAKER_THRESHOLD, reset_timeout: float = RAZORPAY_BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.opened_total = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def before_call(self) -> bool:
+        """Raises GatewayUnavailableError if the call must not be made; returns True for the half-open trial call."""
+        state = self.state
+        if state == "open" or (state == "half_open" and self.trial_in_flight):
+            raise GatewayUnavailableError(max(self.reset_timeout - (time.monotonic() - self.opened_at), 1))
+        self.trial_in_flight = state == "half_open"
+        return self.trial_in_flight
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            if self.opened_at is None:
+                self.opened_total += 1
+            self.opened_at = time.monotonic()
+
+
+class RazorpayGateway:
+    """
+    Async Razorpay API client. Requests share one pooled HTTP connection pool
+    and have bounded connect/read timeouts, so a slow gateway holds sockets
+    rather than worker threads. Transport errors and 429/5xx responses are
+    retried with jittered exponential backoff; a call that still fails counts
+    against the circuit breaker, which fails fast while the gateway is down.
+    Retrying an order creation can at worst leave an extra unpaid Razorpay
+    order behind, which Razorpay expires on its own.
+    """
+
+    def __init__(self, base_url: str = RAZORPAY_API_URL, key_id: str = RAZORPAY_KEY_ID, key_secret: str = RAZORPAY_KEY_SECRET,
+                 max_retries: int = RAZORPAY_MAX_RETRIES, breaker: CircuitBreaker = None):
+        self.base_url = base_url.rstrip("/")
+        self.auth = (key_id, key_secret)
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.calls_total = 0
+        self.retries_total = 0
+        self.failures_total = 0
+        self.rejected_total = 0
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                auth=self.auth,
+                timeout=httpx.Timeout(RAZORPAY_TIMEOUT_SECONDS, connect=RAZORPAY_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=RAZORPAY_MAX_CONNECTIONS, max_keepalive_connections=RAZORPAY_MAX_CONNECTIONS),
+            )
+        return self._client
+
+    async def _request(self, method: str, path: str, **kwargs):
+        try:
+            trial = self.breaker.before_call()
+        except GatewayUnavailableError:
+            self.rejected_total += 1
+            raise
+        self.calls_total += 1
+        try:
+            return await self._attempt(method, path, **kwargs)
+        finally:
+            if trial:
+                # A cancelled trial call must not keep the half-open circuit blocked
+                self.breaker.trial_in_flight = False
+
+    async def _attempt(self, method: str, path: str, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries_total += 1
+                await asyncio.sleep(random.uniform(0, RAZORPAY_RETRY_BACKOFF_SECONDS * 2 ** attempt))
+            try:
+                response = await self._get_client().request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                error = GatewayError(f"{type(e).__name__} talking to Razorpay")
+                continue
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                error = GatewayError(f"Razorpay returned {response.status_code}")
+                continue
+            if response.is_error:
+                # The request itself was rejected; the gateway is healthy
+                self.breaker.record_success()
+                raise GatewayError(f"Razorpay returned {response.status_code}: {response.text[:200]}")
+            try:
+                body = response.json()
+            except ValueError:
+                # e.g. an HTML error page from a proxy in front of the gateway
+                error = GatewayError(f"Razorpay returned a non-JSON {response.status_code} response")
+                continue
+            self.breaker.record_success()
+            return body
+        self.failures_total += 1
+        self.breaker.record_failure()
+        raise error
+
+    async def create_order(self, amount_in_inr: float, receipt_id: str):
+        """
+        Creates a Razorpay order.
+        Amount should be in INR (automatically converted to paise).
+        """
+        data = {
+            "amount": int(round(amount_in_inr * 100)),  # amount in paise
+            "currency": "INR",
+            "receipt": receipt_id,
+            "payment_capture": 1  # auto capture
+        }
+        return await self._request("POST", "/orders", json=data)
+
+    async def fetch_payment(self, payment_id: str):
+        """The payment as Razorpay recorded it, for checking which order it paid and how much."""
+        return await self._request("GET", f"/payments/{payment_id}")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self):
+        return {
+            "base_url": self.base_url,
+            "breaker_state": self.breaker.state,
+            "breaker_opened_total": self.breaker.opened_total,
+            "consecutive_failures": self.breaker.failures,
+            "calls_total": self.calls_total,
+            "retries_total": self.retries_total,
+            "failures_total": self.failures_total,
+            "rejected_total": self.rejected_total,
+        }
+
+
+payment_gateway = RazorpayGateway()
+
 
 def verify_payment_signature(razorpay_order_id: str, razorpay_payment_id: str, razorpay_signature: str):
     """
-    Verifies the Razorpay payment signature.
+    Verifies the Razorpay payment signature (HMAC-SHA256 of "order_id|payment_id"
+    with the key secret, as the Razorpay SDK does). Runs locally, no API call.
     Returns True if valid, False otherwise.
     """
-    params_dict = {
-        'razorpay_order_id': razorpay_order_id,
-        'razorpay_payment_id': razorpay_payment_id,
-        'razorpay_signature': razorpay_signature
-    }
-    try:
-        client.utility.verify_payment_signature(params_dict)
-        return True
-    except Exception:
-        return False
+    expected = hmac.new(RAZORPAY_KEY_SECRET.encode(), f"{razorpay_order_id}|{razorpay_payment_id}".encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected.encode(), str(razorpay_signature).encode())
+
+
+def verify_webhook_signature(body: bytes, signature: str):
+    """Webhooks are signed with HMAC-SHA256 of the raw request body and the webhook secret."""
+    expected = hmac.new(RAZORPAY_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected.encode(), signature.encode())
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event, inspect
+
+from database.db import SessionLocal
+from database.models import User
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+
+# Changing any of these must force the next request to reload the user
+_AUTH_ATTRIBUTES = ("email", "password", "role")
+
+
+class PrincipalCache:
+    """
+    Bounded LRU of authenticated users keyed by (token subject, token expiry),
+    so get_current_user only queries the users table once per token per TTL.
+    Entries never outlive their token. Cached users are detached, read-only
+    instances shared between requests.
+    """
+
+    def __init__(self, max_size: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, subject: str, token_exp: int) -> Optional[User]:
+        key = (subject, token_exp)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, subject: str, token_exp: int, user: User):
+        expires_at = min(time.time() + self.ttl, token_exp)
+        key = (subject, token_exp)
+        with self._lock:
+            self._entries[key] = (user, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == subject]:
+                del self._entries[key]
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _collect_principal_changes(session, flush_context, instances):
+    # Bulk UPDATE statements bypass this hook; call principal_cache.invalidate() after them
+    subjects = session.info.setdefault("principal_invalidations", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, User):
+            continue
+        state = inspect(obj)
+        if obj in session.deleted or any(state.attrs[attr].history.has_changes() for attr in _AUTH_ATTRIBUTES):
+            # Tokens were issued for the previous email, so drop entries under it as well
+            subjects.update(value for value in state.attrs.email.history.deleted if value)
+            subjects.add(obj.email)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_principal_changes(session):
+    for subject in session.info.pop("principal_invalidations", ()):
+        principal_cache.invalidate(subject)
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_principal_changes(session, previous_transaction):
+    session.info.pop("principal_invalidations", None)
@@ -1,14 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from database.db import get_db
-from database.models import User, Venue, Event, UserRole, EventStatus
+from database.models import User, Venue, Event, EventSalesStats, OrganizerProfile, PaymentEvent, UserRole, EventStatus, DEFAULT_HOLD_TTL_SECONDS, MIN_HOLD_TTL_SECONDS, MAX_HOLD_TTL_SECONDS
 from ..auth import RoleChecker
-from pydantic import BaseModel
+from ..hold_sweeper import hold_sweeper
+from ..principal_cache import principal_cache
+from ..password_pool import password_pool
+from ..entry_log_writer import entry_log_writer
+from ..idempotency import idempotency_store
+from ..payment_utils import payment_gateway
+from ..payment_outbox import payment_event_processor
+from ..event_catalog import catalog_cache
+from ..seat_map import seat_maps
+from ..event_stats import STAT_COLUMNS, event_stats_reconciler
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import List, Optional
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 admin_only = RoleChecker([UserRole.ADMIN])
 
+PROFILE_FIELDS = ("id", "user_id", "company_name", "bio", "years_of_experience", "specialization", "is_verified")
+MAX_ORGANIZER_IDS = 500
+
 class VenueCreate(BaseModel):
     name: str
     city: str
@@ -23,11 +38,24 @@ class EventCreate(BaseModel):
     event_date: datetime
     ticket_price: float
     max_tickets_per_user: int
+    hold_ttl_seconds: int = Field(DEFAULT_HOLD_TTL_SECONDS, ge=MIN_HOLD_TTL_SECONDS, le=MAX_HOLD_TTL_SECONDS)
 
 @router.get("/events/all")
 def get_all_events(db: Session = Depends(get_db), current_user = Depends(admin_only)):
     return db.query(Event).all()
 
+@router.get("/events/stats")
+def get_event_sales_stats(limit: int = 100, offset: int = 0, db: Session = Depends(get_db), current_user = Depends(admin_only)):
+    rows = (
+        db.query(Event.id, Event.name, Event.status, *(getattr(EventSalesStats, c) for c in STAT_COLUMNS))
+        .outerjoin(EventSalesStats, EventSalesStats.event_id == Event.id)
+        .order_by(Event.id)
+        .offset(offset)
+        .limit(min(limit, 1000))
+        .all()
+    )
+    return [{"event_id": r.id, "name": r.name, "status": r.status, **{c: getattr(r, c) or 0 for c in STAT_COLUMNS}} for r in rows]
+
 @router.get("/venues")
 def get_venues(db: Session = Depends(get_db), current_user = Depends(admin_only)):
     return db.query(Venue).all()
@@ -36,9 +64,27 @@ def get_venues(db: Session = Depends(get_db), current_user = Depends(admin_only)
 def get_organizers(db: Session = Depends(get_db), current_user = Depends(admin_only)):
     return db.query(User).filter(User.role == UserRole.ORGANIZER).all()
 
+@router.get("/organizers/profiles")
+def get_organizers_with_profiles(ids: Optional[List[int]] = Query(None), db: Session = Depends(get_db), current_user = Depends(admin_only)):
+    """Organizers with their profile (None until they create one) in one query; `ids` (repeatable) limits it to those organizers."""
+    if ids is not None and len(ids) > MAX_ORGANIZER_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_ORGANIZER_IDS} ids per request")
+    query = (
+        db.query(User.id, User.name, User.email, *(getattr(OrganizerProfile, f).label(f"profile_{f}") for f in PROFILE_FIELDS))
+        .outerjoin(OrganizerProfile, OrganizerProfile.user_id == User.id)
+        .filter(User.role == UserRole.ORGANIZER)
+        .order_by(User.id)
+    )
+    if ids is not None:
+        query = query.filter(User.id.in_(ids))
+    return [
+        {"id": r.id, "name": r.name, "email": r.email,
+         "profile": {f: getattr(r, f"profile_{f}") for f in PROFILE_FIELDS} if r.profile_id is not None else None}
+        for r in query
+    ]
+
 @router.get("/organizers/{org_id}/profile")
 def get_organizer_profile(org_id: int, db: Session = Depends(get_db), current_user = Depends(admin_only)):
-    from database.models import OrganizerProfile
     profile = db.query(OrganizerProfile).filter(OrganizerProfile.user_id == org_id).first()
     return profile
 
@@ -103,4 +149,52 @@ def update_event_status(event_id: int, status: EventStatus, db: Session = Depend
         raise HTTPException(status_code=404, detail="Event not found")
     db_event.status = status
     db.commit()
+    seat_maps.invalidate(event_id)
     return {"message": f"Event status updated to {status}"}
+
+@router.get("/holds/sweeper")
+def get_hold_sweeper_stats(current_user = Depends(admin_only)):
+    return hold_sweeper.stats()
+
+@router.get("/entry-logs/writer")
+def get_entry_log_writer_stats(current_user = Depends(admin_only)):
+    return entry_log_writer.stats()
+
+@router.get("/auth/principal-cache")
+def get_principal_cache_stats(current_user = Depends(admin_only)):
+    return principal_cache.stats()
+
+@router.get("/auth/password-pool")
+def get_password_pool_stats(current_user = Depends(admin_only)):
+    return password_pool.stats()
+
+@router.get("/catalog/cache")
+def get_catalog_cache_stats(current_user = Depends(admin_only)):
+    return catalog_cache.stats()
+
+@router.get("/seat-maps/cache")
+def get_seat_map_cache_stats(current_user = Depends(admin_only)):
+    return seat_maps.stats()
+
+@router.get("/event-stats/reconciler")
+def get_event_stats_reconciler_stats(current_user = Depends(admin_only)):
+    return event_stats_reconciler.stats()
+
+@router.post("/event-stats/reconcile")
+def reconcile_event_stats(repair: bool = True, current_user = Depends(admin_only)):
+    # Recounts every event's counters from seats, orders and tickets now, instead of at the next interval
+    return event_stats_reconciler.reconcile_once(repair=repair)
+
+@router.get("/idempotency-keys")
+def get_idempotency_stats(current_user = Depends(admin_only)):
+    return idempotency_store.stats()
+
+@router.get("/payments/gateway")
+def get_payment_gateway_stats(current_user = Depends(admin_only)):
+    return payment_gateway.stats()
+
+@router.get("/payments/outbox")
+def get_payment_outbox_stats(db: Session = Depends(get_db), current_user = Depends(admin_only)):
+    stats = payment_event_processor.stats()
+    stats["events_by_status"] = dict(db.query(PaymentEvent.status, func.count(PaymentEvent.id)).group_by(PaymentEvent.status).all())
+    return stats
@@ -1,20 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
-from database.db import get_db
-from database.models import Event, Seat, UserRole, Order, Ticket, RefundRequest, SupportCase, Offer, EventStatus, OrderStatus, TicketStatus
+from database.db import get_db, get_async_db, run_db
+from database.models import Event, Seat, UserRole, Order, Ticket, RefundRequest, SupportCase, Offer, EventStatus, OrderStatus, TicketStatus, SeatStatus, DEFAULT_HOLD_TTL_SECONDS, MIN_HOLD_TTL_SECONDS, MAX_HOLD_TTL_SECONDS
 from ..auth import RoleChecker, get_current_user
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
-from datetime import datetime
-import uuid
-from ..payment_utils import create_razorpay_order, verify_payment_signature
+from datetime import datetime, timedelta
+import json
+import asyncio
+from ..payment_utils import payment_gateway, verify_payment_signature, GatewayError, GatewayUnavailableError
+from ..seat_reservation import claim_seats, assign_seats_to_order, confirm_held_seats, seat_changes_since, SeatUnavailableError
+from ..seat_map import EventNotFoundError, seat_maps
+from ..seat_events import seat_events
+from ..ticket_counts import get_ticket_count
+from ..ticket_issuance import issue_tickets
+from ..event_stats import add_event_stats
+from ..idempotency import idempotency_store
+from ..event_search import SEARCH_MAX_RESULTS, search_events
+from ..event_catalog import CatalogQuery, CATALOG_PAGE_SIZE, CATALOG_MAX_PAGE_SIZE, catalog_cache, decode_cursor, list_catalog, parse_fields
 
 router = APIRouter(prefix="/customer", tags=["customer"])
 customer_only = RoleChecker([UserRole.CUSTOMER])
 
+SEAT_STREAM_KEEPALIVE_SECONDS = 15
+
 class OrderCreate(BaseModel):
     event_id: int
-    seat_ids: List[int]
+    seat_ids: List[int] = Field(min_length=1)
     offer_code: Optional[str] = None
 
 class RefundRequestCreate(BaseModel):
@@ -26,15 +40,73 @@ class SupportCaseCreate(BaseModel):
     description: str
 
 @router.get("/events")
-def view_upcoming_events(db: Session = Depends(get_db)):
-    return db.query(Event).filter(Event.status == EventStatus.UPCOMING).all()
+async def view_upcoming_events(
+    category: Optional[str] = None,
+    city: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(CATALOG_PAGE_SIZE, ge=1, le=CATALOG_MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db = Depends(get_async_db),
+):
+    # fields=id,name,...: columns to return; pass next_cursor back as cursor for the next page
+    try:
+        query = CatalogQuery(category, city, date_from, date_to, min_price, max_price,
+                             decode_cursor(cursor) if cursor else None, limit, parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    body = catalog_cache.get(query)
+    if body is None:
+        generation = catalog_cache.generation
+        body = catalog_cache.put(query, await run_db(db, list_catalog, query), generation)
+    return Response(content=body, media_type="application/json")
+
+@router.get("/events/search")
+async def search_upcoming_events(q: str = Query(..., min_length=1, max_length=200),
+                                 limit: int = Query(20, ge=1, le=SEARCH_MAX_RESULTS), db = Depends(get_async_db)):
+    return await run_db(db, search_events, q, limit)
 
 @router.get("/events/{event_id}/seats")
-def view_event_seats(event_id: int, db: Session = Depends(get_db)):
-    return db.query(Seat).filter(Seat.event_id == event_id).all()
+async def view_event_seats(event_id: int, format: str = "list", since: Optional[int] = None, db = Depends(get_async_db)):
+    # "list": one dict per seat; "compact": run-length seat ids plus a base64 byte-per-seat status array
+    if since is None and format not in ("list", "compact"):
+        raise HTTPException(status_code=400, detail="format must be 'list' or 'compact'")
+    try:
+        # since=N: only seats changed after inventory version N (since=-1 returns every seat)
+        if since is not None:
+            return await run_db(db, seat_changes_since, event_id, since)
+        return await run_db(db, seat_maps.render, event_id, format == "compact")
+    except EventNotFoundError:
+        raise HTTPException(status_code=404, detail="Event not found or not open for booking")
 
-@router.post("/orders")
-def place_order(order_data: OrderCreate, db: Session = Depends(get_db), current_user = Depends(customer_only)):
+@router.get("/events/{event_id}/stream")
+async def stream_seat_changes(event_id: int, request: Request):
+    """
+    Server-sent events with committed seat changes for one event.
+    Each message carries the new inventory version and {seat_id: status};
+    changes that pile up while a client is slow are coalesced per seat.
+    """
+    subscription = seat_events.subscribe(event_id)
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    batch = await asyncio.wait_for(subscription.next_batch(), timeout=SEAT_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"id: {batch['version']}\nevent: seats\ndata: {json.dumps(batch)}\n\n"
+        finally:
+            seat_events.unsubscribe(subscription)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def create_order(db: Session, order_data: OrderCreate, user_id: int):
     event = db.query(Event).filter(Event.id == order_data.event_id).first()
     if not event or event.status != EventStatus.UPCOMING:
         raise HTTPException(status_code=400, detail="Event not available for booking")
@@ -42,22 +114,31 @@ def place_order(order_data: OrderCreate, db: Session = Depends(get_db), current_
     if len(order_data.seat_ids) > event.max_tickets_per_user:
         raise HTTPException(status_code=400, detail=f"Cannot book more than {event.max_tickets_per_user} tickets")
     
-    # Check if user already has tickets for this event
-    existing_orders = db.query(Order).filter(Order.user_id == current_user.id, Order.event_id == order_data.event_id, Order.order_status == OrderStatus.CONFIRMED).all()
-    # Simplified check: total seats in confirmed orders
-    total_existing_seats = 0
-    for o in existing_orders:
-        total_existing_seats += db.query(Ticket).filter(Ticket.order_id == o.id).count()
+    # Check if user already has tickets for this event (maintained counter, one primary-key read)
+    total_existing_seats = get_ticket_count(db, user_id, order_data.event_id)
     
     if total_existing_seats + len(order_data.seat_ids) > event.max_tickets_per_user:
          raise HTTPException(status_code=400, detail="Total tickets exceed limit for this user")
 
-    # Double booking protection (locking seats)
-    seats = db.query(Seat).filter(Seat.id.in_(order_data.seat_ids), Seat.status == "available").all()
-    if len(seats) != len(order_data.seat_ids):
-        raise HTTPException(status_code=400, detail="Some seats are already booked or invalid")
+    if len(set(order_data.seat_ids)) != len(order_data.seat_ids):
+        raise HTTPException(status_code=400, detail="Duplicate seats in order")
+
+    # Double booking protection: one conditional UPDATE holds every seat or none
+    # Clamped, since events created before the bounds were enforced may carry any value
+    hold_ttl = min(max(event.hold_ttl_seconds or DEFAULT_HOLD_TTL_SECONDS, MIN_HOLD_TTL_SECONDS), MAX_HOLD_TTL_SECONDS)
+    held_until = datetime.now() + timedelta(seconds=hold_ttl)
+    try:
+        claim_seats(db, order_data.event_id, order_data.seat_ids, SeatStatus.HELD, held_until)
+    except SeatUnavailableError as e:
+        raise HTTPException(status_code=400, detail=f"Some seats are already booked or invalid: {e.seat_ids}")
     
-    total_amount = event.ticket_price * len(order_data.seat_ids)
+    # Seats generated from a layout carry their own price tier
+    seat_count, total_amount = db.query(
+        func.count(Seat.id), func.coalesce(func.sum(func.coalesce(Seat.price, event.ticket_price)), 0)
+    ).filter(Seat.id.in_(order_data.seat_ids), Seat.event_id == order_data.event_id).one()
+    if seat_count != len(order_data.seat_ids):
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Some seats are invalid for this event")
     
     # Apply offer
     if order_data.offer_code:
@@ -67,44 +148,74 @@ def place_order(order_data: OrderCreate, db: Session = Depends(get_db), current_
             offer.used_count += 1
     
     new_order = Order(
-        user_id=current_user.id,
+        user_id=user_id,
         event_id=order_data.event_id,
         total_amount=total_amount,
         payment_mode="simulation",
-        order_status=OrderStatus.PENDING
+        order_status=OrderStatus.PENDING,
+        seat_count=len(order_data.seat_ids)
     )
     db.add(new_order)
     db.flush() # Get order ID
+    assign_seats_to_order(db, order_data.seat_ids, new_order.id)
     
-    # Reserve seats
-    for seat in seats:
-        seat.status = "booked"
-    
-    db.commit()
-    return {"message": "Order created", "order_id": new_order.id, "total_amount": total_amount}
+    return {"message": "Order created", "order_id": new_order.id, "total_amount": total_amount, "held_until": held_until}
+
+@router.post("/orders")
+async def place_order(order_data: OrderCreate, idempotency_key: Optional[str] = Header(None), db = Depends(get_async_db), current_user = Depends(customer_only)):
+    # A retried request with the same Idempotency-Key gets the first response back; no seats or offers are touched
+    return await run_db(db, idempotency_store.run, current_user.id, idempotency_key, "POST /customer/orders", order_data,
+                        create_order, order_data, current_user.id)
 
 class RazorpayOrderResponse(BaseModel):
     razorpay_order_id: str
     amount: int
     currency: str
 
+def get_pending_order(db: Session, order_id: int, user_id: int):
+    return db.query(Order).filter(Order.id == order_id, Order.user_id == user_id, Order.order_status == OrderStatus.PENDING).first()
+
+def attach_gateway_order(db: Session, order_id: int, gateway_order_id: str) -> str:
+    """Links the Razorpay order to ours for the payment webhook; returns the linked id if another request won the race."""
+    linked = db.execute(
+        update(Order)
+        .where(Order.id == order_id, Order.gateway_order_id.is_(None), Order.order_status == OrderStatus.PENDING)
+        .values(gateway_order_id=gateway_order_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if linked:
+        return gateway_order_id
+    # The hold may have expired (or the order been paid) while Razorpay was creating its order
+    order = db.query(Order.gateway_order_id, Order.order_status).filter(Order.id == order_id).first()
+    if order.order_status != OrderStatus.PENDING:
+        raise HTTPException(status_code=400, detail=f"Order is {order.order_status} and can no longer be paid")
+    return order.gateway_order_id
+
 @router.post("/orders/{order_id}/create-razorpay-order", response_model=RazorpayOrderResponse)
-def get_razorpay_order(order_id: int, db: Session = Depends(get_db), current_user = Depends(customer_only)):
-    order = db.query(Order).filter(Order.id == order_id, Order.user_id == current_user.id).first()
-    if not order or order.order_status != OrderStatus.PENDING:
+async def get_razorpay_order(order_id: int, db = Depends(get_async_db), current_user = Depends(customer_only)):
+    order = await run_db(db, get_pending_order, order_id, current_user.id)
+    if not order:
         raise HTTPException(status_code=400, detail="Invalid order for payment")
+    amount = int(round(order.total_amount * 100))
+    if order.gateway_order_id:
+        # Already created; a second Razorpay order could be paid but never matched by the webhook
+        return {"razorpay_order_id": order.gateway_order_id, "amount": amount, "currency": "INR"}
     
-    # Create Razorpay order
+    # Create Razorpay order; the gateway call is awaited, so a slow gateway ties up no worker thread
     receipt_id = f"order_rcptid_{order_id}"
     try:
-        razorpay_order = create_razorpay_order(order.total_amount, receipt_id)
-        return {
-            "razorpay_order_id": razorpay_order["id"],
-            "amount": razorpay_order["amount"],
-            "currency": razorpay_order["currency"]
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create Razorpay order: {str(e)}")
+        razorpay_order = await payment_gateway.create_order(order.total_amount, receipt_id)
+    except GatewayUnavailableError as e:
+        raise HTTPException(status_code=503, detail="Payment gateway is unavailable, please retry shortly",
+                            headers={"Retry-After": str(int(e.retry_after))})
+    except GatewayError as e:
+        raise HTTPException(status_code=502, detail=f"Failed to create Razorpay order: {str(e)}")
+    return {
+        "razorpay_order_id": await run_db(db, attach_gateway_order, order_id, razorpay_order["id"]),
+        "amount": razorpay_order["amount"],
+        "currency": razorpay_order["currency"]
+    }
 
 class PaymentVerification(BaseModel):
     razorpay_order_id: str
@@ -112,81 +223,93 @@ class PaymentVerification(BaseModel):
     razorpay_signature: str
     seat_ids: List[int]
 
-@router.post("/orders/{order_id}/verify-razorpay-payment")
-def verify_razorpay_payment(order_id: int, payment_data: PaymentVerification, db: Session = Depends(get_db), current_user = Depends(customer_only)):
-    order = db.query(Order).filter(Order.id == order_id, Order.user_id == current_user.id).first()
-    if not order or order.order_status != OrderStatus.PENDING:
+def confirm_razorpay_payment(db: Session, order_id: int, payment_data: PaymentVerification, payment: dict, user_id: int):
+    order = db.query(Order).filter(Order.id == order_id, Order.user_id == user_id).first()
+    if not order:
+        raise HTTPException(status_code=400, detail="Invalid order for verification")
+    # A valid signature only proves some Razorpay order was paid; it must be the one created for this order
+    if order.gateway_order_id is None:
+        raise HTTPException(status_code=400, detail="No Razorpay order was created for this order; call create-razorpay-order first")
+    if order.gateway_order_id != payment_data.razorpay_order_id:
+        raise HTTPException(status_code=400, detail="Invalid order for verification")
+    if (payment.get("order_id") != order.gateway_order_id or payment.get("amount") != round(order.total_amount * 100)
+            or payment.get("status") not in ("authorized", "captured")):
+        raise HTTPException(status_code=400, detail="Payment does not match the order")
+
+    if order.order_status == OrderStatus.CONFIRMED and order.gateway_order_id:
+        # The payment webhook confirmed the order first
+        ticket_count = db.query(func.count(Ticket.id)).filter(Ticket.order_id == order_id).scalar()
+        return {"message": "Payment verified and tickets generated", "order_id": order_id, "ticket_count": ticket_count}
+    if order.order_status != OrderStatus.PENDING:
         raise HTTPException(status_code=400, detail="Invalid order for verification")
-    
-    # Verify signature
-    is_valid = verify_payment_signature(
-        payment_data.razorpay_order_id,
-        payment_data.razorpay_payment_id,
-        payment_data.razorpay_signature
-    )
-    
-    if not is_valid:
-        raise HTTPException(status_code=400, detail="Payment verification failed")
     
     # Confirm seats and generate tickets (Logic shared with simulation but adapted)
-    seats = db.query(Seat).filter(Seat.id.in_(payment_data.seat_ids), Seat.event_id == order.event_id, Seat.status == "booked").all()
-    if len(seats) != len(payment_data.seat_ids):
+    try:
+        seat_ids = confirm_held_seats(db, order.event_id, order_id, payment_data.seat_ids)
+    except SeatUnavailableError:
         raise HTTPException(status_code=400, detail="Seats are no longer available or invalid")
 
     order.order_status = OrderStatus.CONFIRMED
     order.payment_mode = "razorpay"
     
-    # Generate tickets
-    tickets = []
-    for seat in seats:
-        ticket_code = f"TICK-{str(uuid.uuid4()).split('-')[0].upper()}"
-        new_ticket = Ticket(
-            order_id=order_id,
-            seat_id=seat.id,
-            ticket_code=ticket_code,
-            status=TicketStatus.ACTIVE
-        )
-        tickets.append(new_ticket)
-    
-    db.add_all(tickets)
-    db.commit()
+    ticket_ids = issue_tickets(db, order, seat_ids)
+    add_event_stats(db, order.event_id, gross_revenue=order.total_amount)
     
-    return {"message": "Payment verified and tickets generated", "order_id": order_id, "ticket_count": len(tickets)}
+    return {"message": "Payment verified and tickets generated", "order_id": order_id, "ticket_count": len(ticket_ids)}
+
+@router.post("/orders/{order_id}/verify-razorpay-payment")
+async def verify_razorpay_payment(order_id: int, payment_data: PaymentVerification, idempotency_key: Optional[str] = Header(None), db = Depends(get_async_db), current_user = Depends(customer_only)):
+    if not verify_payment_signature(payment_data.razorpay_order_id, payment_data.razorpay_payment_id, payment_data.razorpay_signature):
+        raise HTTPException(status_code=400, detail="Payment verification failed")
+    # The amount actually paid is only known to Razorpay
+    try:
+        payment = await payment_gateway.fetch_payment(payment_data.razorpay_payment_id)
+    except GatewayUnavailableError as e:
+        raise HTTPException(status_code=503, detail="Payment gateway is unavailable, please retry shortly",
+                            headers={"Retry-After": str(int(e.retry_after))})
+    except GatewayError as e:
+        raise HTTPException(status_code=502, detail=f"Failed to fetch the Razorpay payment: {str(e)}")
+    return await run_db(db, idempotency_store.run, current_user.id, idempotency_key, f"POST /customer/orders/{order_id}/verify-razorpay-payment",
+                        payment_data, confirm_razorpay_payment, order_id, payment_data, payment, current_user.id)
 
 class PaymentConfirm(BaseModel):
     seat_ids: List[int]
 
-@router.post("/orders/{order_id}/confirm_payment")
-def confirm_payment_and_generate_tickets(order_id: int, payment_data: PaymentConfirm, db: Session = Depends(get_db), current_user = Depends(customer_only)):
-    order = db.query(Order).filter(Order.id == order_id, Order.user_id == current_user.id).first()
+def confirm_simulated_payment(db: Session, order_id: int, payment_data: PaymentConfirm, user_id: int):
+    order = db.query(Order).filter(Order.id == order_id, Order.user_id == user_id).first()
     if not order or order.order_status != OrderStatus.PENDING:
         raise HTTPException(status_code=400, detail="Invalid order for payment")
     
-    # Verify seats are still booked (or 'booked' by this user in this order)
-    # The seats were set to 'booked' in place_order.
-    seats = db.query(Seat).filter(Seat.id.in_(payment_data.seat_ids), Seat.event_id == order.event_id, Seat.status == "booked").all()
-    if len(seats) != len(payment_data.seat_ids):
+    # The seats were held for this order in place_order and must not have been released since.
+    try:
+        seat_ids = confirm_held_seats(db, order.event_id, order_id, payment_data.seat_ids)
+    except SeatUnavailableError:
         raise HTTPException(status_code=400, detail="Seats are no longer available or invalid")
 
     order.order_status = OrderStatus.CONFIRMED
     
-    # Generate tickets
-    tickets = []
-    for seat in seats:
-        # Using cast to string to avoid lint issues with indexing hex
-        ticket_code = f"TICK-{str(uuid.uuid4()).split('-')[0].upper()}"
-        new_ticket = Ticket(
-            order_id=order_id,
-            seat_id=seat.id,
-            ticket_code=ticket_code,
-            status=TicketStatus.ACTIVE
-        )
-        tickets.append(new_ticket)
-    
-    db.add_all(tickets)
-    db.commit()
+    ticket_ids = issue_tickets(db, order, seat_ids)
+    add_event_stats(db, order.event_id, gross_revenue=order.total_amount)
     
-    return {"message": "Payment successful and tickets generated", "order_id": order_id, "ticket_count": len(tickets)}
+    return {"message": "Payment successful and tickets generated", "order_id": order_id, "ticket_count": len(ticket_ids)}
+
+@router.post("/orders/{order_id}/confirm_payment")
+def confirm_payment_and_generate_tickets(order_id: int, payment_data: PaymentConfirm, idempotency_key: Optional[str] = Header(None), db: Session = Depends(get_db), current_user = Depends(customer_only)):
+    return idempotency_store.run(db, current_user.id, idempotency_key, f"POST /customer/orders/{order_id}/confirm_payment", payment_data,
+                                 confirm_simulated_payment, order_id, payment_data, current_user.id)
+
+def get_order_status(db: Session, order_id: int, user_id: int):
+    order = db.query(Order).filter(Order.id == order_id, Order.user_id == user_id).first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    ticket_count = db.query(func.count(Ticket.id)).filter(Ticket.order_id == order_id).scalar()
+    return {"order_id": order.id, "order_status": order.order_status, "total_amount": order.total_amount,
+            "payment_mode": order.payment_mode, "ticket_count": ticket_count}
+
+@router.get("/orders/{order_id}")
+async def view_order(order_id: int, db = Depends(get_async_db), current_user = Depends(customer_only)):
+    # Polled after a Razorpay checkout until the payment webhook has confirmed the order
+    return await run_db(db, get_order_status, order_id, current_user.id)
 
 @router.get("/tickets")
 def view_tickets(db: Session = Depends(get_db), current_user = Depends(customer_only)):
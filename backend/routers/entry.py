@@ -1,49 +1,154 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import and_, select, update
 from sqlalchemy.orm import Session
-from database.db import get_db
-from database.models import Ticket, EntryLog, UserRole, TicketStatus
+from database.db import get_async_db, run_db
+from database.models import Ticket, Order, EntryLog, UserRole, TicketStatus
 from ..auth import RoleChecker
+from ..ticket_codes import is_signed_ticket_code, read_ticket_code
+from ..gate_manifest import MANIFEST_PUBLIC_KEY, build_manifest, apply_gate_scans
+from ..seat_reservation import run_with_busy_retry
+from ..entry_log_writer import entry_log_writer
+from ..event_stats import add_event_stats
+from pydantic import BaseModel
 from datetime import datetime
+from typing import List, Optional
 
 router = APIRouter(prefix="/entry", tags=["entry"])
 entry_manager_only = RoleChecker([UserRole.ENTRY_MANAGER])
 
-@router.post("/validate/{ticket_code}")
-def validate_ticket(ticket_code: str, db: Session = Depends(get_db), current_user = Depends(entry_manager_only)):
-    ticket = db.query(Ticket).filter(Ticket.ticket_code == ticket_code).first()
+STATUS_REASONS = {TicketStatus.USED: "Ticket already used", TicketStatus.CANCELLED: "Ticket cancelled"}
+
+def ticket_criteria(ticket_code: str, event_id: Optional[int] = None):
+    """
+    Returns (criterion selecting the scanned ticket, reason). Signed codes are
+    checked without the database first: one for another event gets no
+    criterion, and a genuine one is matched by primary key. Codes that do not
+    verify, unsigned ones and those minted under a replaced key, are only
+    accepted if they are on record; a forged code matches no ticket.
+    """
+    claims = read_ticket_code(ticket_code) if is_signed_ticket_code(ticket_code) else None
+    if claims is None:
+        criterion = Ticket.ticket_code == ticket_code
+        if event_id is not None:
+            criterion = and_(criterion, Ticket.order_id.in_(select(Order.id).where(Order.event_id == event_id)))
+        return criterion, None
+    if event_id is not None and claims.event_id != event_id:
+        return None, "Ticket is for a different event"
+    return Ticket.id == claims.ticket_id, None
+
+def find_ticket(db: Session, ticket_code: str, event_id: Optional[int] = None):
+    criterion, reason = ticket_criteria(ticket_code, event_id)
+    if criterion is None:
+        return None, reason
+    return db.query(Ticket).filter(criterion).first(), None
+
+def check_ticket(db: Session, ticket_code: str, validated_by: int, event_id: Optional[int] = None):
+    ticket, wrong_event = find_ticket(db, ticket_code, event_id)
     
     result = "failed"
-    reason = "Invalid ticket"
+    reason = wrong_event or "Invalid ticket"
     
     if ticket:
         if ticket.status == TicketStatus.ACTIVE:
             result = "success"
             reason = "Valid ticket"
-        elif ticket.status == TicketStatus.USED:
-            reason = "Ticket already used"
-        elif ticket.status == TicketStatus.CANCELLED:
-            reason = "Ticket cancelled"
-    
-    # Log entry attempt
-    log = EntryLog(
-        ticket_id=ticket.id if ticket else None,
-        validated_by=current_user.id,
-        result=result
-    )
-    db.add(log)
-    db.commit()
+        else:
+            reason = STATUS_REASONS.get(ticket.status, reason)
     
+    # Log entry attempt off the request path
+    entry_log_writer.log(db, ticket.id if ticket else None, validated_by, result)
+    return result, reason, ticket.id if ticket else None
+
+@router.post("/validate/{ticket_code}")
+async def validate_ticket(ticket_code: str, event_id: Optional[int] = None, db = Depends(get_async_db), current_user = Depends(entry_manager_only)):
+    result, reason, ticket_id = await run_db(db, check_ticket, ticket_code, current_user.id, event_id)
     if result == "success":
-        return {"message": reason, "ticket_id": ticket.id}
+        return {"message": reason, "ticket_id": ticket_id}
     else:
         raise HTTPException(status_code=400, detail=reason)
 
-@router.patch("/tickets/{ticket_id}/use")
-def mark_ticket_as_used(ticket_id: int, db: Session = Depends(get_db), current_user = Depends(entry_manager_only)):
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
-    if not ticket or ticket.status != TicketStatus.ACTIVE:
+def admit_ticket(db: Session, ticket_code: str, validated_by: int, event_id: Optional[int] = None):
+    """
+    Validates and marks a ticket used in one transaction. The conditional
+    UPDATE only matches an active ticket, so when several gates scan the same
+    code at once exactly one of them admits it. Admissions are logged in the
+    same transaction; rejections change nothing and are logged in the background.
+    """
+    criterion, reason = ticket_criteria(ticket_code, event_id)
+    if criterion is None:
+        entry_log_writer.log(db, None, validated_by, "failed")
+        return "failed", reason or "Invalid ticket", None
+
+    def admit():
+        admitted = db.execute(
+            update(Ticket)
+            .where(criterion, Ticket.status == TicketStatus.ACTIVE)
+            .values(status=TicketStatus.USED)
+            .returning(Ticket.id, Ticket.order_id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if admitted is None:
+            db.commit()
+            return None
+        db.add(EntryLog(ticket_id=admitted.id, validated_by=validated_by, result="success"))
+        add_event_stats(db, db.query(Order.event_id).filter(Order.id == admitted.order_id).scalar(), scans_admitted=1)
+        db.commit()
+        return admitted.id
+
+    ticket_id = run_with_busy_retry(db, admit)
+    if ticket_id is not None:
+        return "success", "Ticket admitted", ticket_id
+
+    ticket = db.query(Ticket.id, Ticket.status).filter(criterion).first()
+    entry_log_writer.log(db, ticket.id if ticket else None, validated_by, "failed")
+    if ticket is None:
+        return "failed", "Invalid ticket", None
+    return "failed", STATUS_REASONS.get(ticket.status, "Invalid ticket"), ticket.id
+
+@router.post("/admit/{ticket_code}")
+async def scan_and_admit(ticket_code: str, event_id: Optional[int] = None, db = Depends(get_async_db), current_user = Depends(entry_manager_only)):
+    result, reason, ticket_id = await run_db(db, admit_ticket, ticket_code, current_user.id, event_id)
+    if result == "success":
+        return {"message": reason, "ticket_id": ticket_id}
+    else:
+        raise HTTPException(status_code=400, detail=reason)
+
+def use_ticket(db: Session, ticket_id: int):
+    marked = db.execute(
+        update(Ticket)
+        .where(Ticket.id == ticket_id, Ticket.status == TicketStatus.ACTIVE)
+        .values(status=TicketStatus.USED)
+        .returning(Ticket.order_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if marked is None:
         raise HTTPException(status_code=400, detail="Cannot mark as used")
-    
-    ticket.status = TicketStatus.USED
+    add_event_stats(db, db.query(Order.event_id).filter(Order.id == marked.order_id).scalar(), scans_admitted=1)
     db.commit()
+
+@router.patch("/tickets/{ticket_id}/use")
+async def mark_ticket_as_used(ticket_id: int, db = Depends(get_async_db), current_user = Depends(entry_manager_only)):
+    await run_db(db, use_ticket, ticket_id)
     return {"message": "Ticket marked as used"}
+
+class GateScan(BaseModel):
+    ticket_id: Optional[int] = None
+    scanned_at: datetime
+    result: str
+
+class GateScanUpload(BaseModel):
+    scans: List[GateScan]
+
+@router.get("/manifest-key")
+def get_manifest_key(current_user = Depends(entry_manager_only)):
+    """Public key that verifies gate manifests; gates can pin it instead of fetching it."""
+    return {"algorithm": "Ed25519", "public_key": MANIFEST_PUBLIC_KEY}
+
+@router.get("/events/{event_id}/manifest")
+async def get_gate_manifest(event_id: int, db = Depends(get_async_db), current_user = Depends(entry_manager_only)):
+    return await run_db(db, build_manifest, event_id)
+
+@router.post("/events/{event_id}/scans")
+async def upload_gate_scans(event_id: int, upload: GateScanUpload, db = Depends(get_async_db), current_user = Depends(entry_manager_only)):
+    scans = [scan.dict() for scan in upload.scans]
+    return await run_db(db, apply_gate_scans, event_id, scans, current_user.id)
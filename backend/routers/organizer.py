@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from database.db import get_db
-from database.models import Event, Seat, UserRole, Order, EventStatus, Venue
+from database.models import Event, EventSalesStats, Seat, UserRole, EventStatus, Venue, SeatStatus
 from ..auth import RoleChecker
+from ..seat_map import seat_maps
+from ..seat_reservation import bump_inventory_version, record_seat_changes
+from ..seat_layout import MAX_SEATS_PER_REQUEST, SeatLayout, bulk_insert_seats, generate_layout, layout_size
+from ..event_stats import STAT_COLUMNS, add_seat_transition
 from pydantic import BaseModel
 from typing import List
 
@@ -13,8 +17,7 @@ organizer_only = RoleChecker([UserRole.ORGANIZER])
 def get_my_events(db: Session = Depends(get_db), current_user = Depends(organizer_only)):
     return db.query(Event).filter(Event.organizer_id == current_user.id).all()
 
-@router.post("/events/{event_id}/seats")
-def create_seats(event_id: int, seat_count: int, db: Session = Depends(get_db), current_user = Depends(organizer_only)):
+def _get_owned_event_and_venue(db: Session, event_id: int, current_user):
     event = db.query(Event).filter(Event.id == event_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
@@ -24,40 +27,75 @@ def create_seats(event_id: int, seat_count: int, db: Session = Depends(get_db),
     venue = db.query(Venue).filter(Venue.id == event.venue_id).first()
     if not venue:
          raise HTTPException(status_code=404, detail="Venue not found")
+    return event, venue
+
+def _insert_seats(db: Session, event_id: int, venue: Venue, existing_seats_count: int, rows, version: int) -> int:
+    inserted = bulk_insert_seats(db, rows)
+    if existing_seats_count + len(inserted) > venue.total_capacity:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Total seats exceed venue capacity of {venue.total_capacity}")
+    record_seat_changes(db, event_id, inserted, SeatStatus.AVAILABLE, version)
+    add_seat_transition(db, event_id, len(inserted), None, SeatStatus.AVAILABLE)
+    db.commit()
+    seat_maps.invalidate(event_id)
+    return len(inserted)
+
+@router.post("/events/{event_id}/seats")
+def create_seats(event_id: int, seat_count: int = Query(..., ge=1, le=MAX_SEATS_PER_REQUEST), db: Session = Depends(get_db), current_user = Depends(organizer_only)):
+    event, venue = _get_owned_event_and_venue(db, event_id, current_user)
 
     existing_seats_count = db.query(Seat).filter(Seat.event_id == event_id).count()
     
     if existing_seats_count + seat_count > venue.total_capacity:
         raise HTTPException(status_code=400, detail=f"Total seats exceed venue capacity of {venue.total_capacity}")
 
-    new_seats = []
-    for i in range(seat_count):
-        seat_num = f"S{existing_seats_count + i + 1}"
-        new_seats.append(Seat(event_id=event_id, seat_number=seat_num, status="available"))
-    
-    db.add_all(new_seats)
-    db.commit()
-    return {"message": f"{seat_count} additional seats created for event {event_id}. Total now: {existing_seats_count + seat_count}"}
+    version = bump_inventory_version(db, event_id)
+    rows = (
+        {"event_id": event_id, "seat_number": f"S{existing_seats_count + i + 1}", "status": SeatStatus.AVAILABLE.value, "version": version}
+        for i in range(seat_count)
+    )
+    created = _insert_seats(db, event_id, venue, existing_seats_count, rows, version)
+    return {"message": f"{created} additional seats created for event {event_id}. Total now: {existing_seats_count + created}"}
+
+@router.post("/events/{event_id}/seats/layout")
+def create_seat_layout(event_id: int, layout: SeatLayout, db: Session = Depends(get_db), current_user = Depends(organizer_only)):
+    """Generates seats per section/row; seats that already exist are left untouched."""
+    event, venue = _get_owned_event_and_venue(db, event_id, current_user)
+    if layout_size(layout) > MAX_SEATS_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"A layout can create at most {MAX_SEATS_PER_REQUEST} seats per request")
+    if layout_size(layout) > venue.total_capacity:
+        raise HTTPException(status_code=400, detail=f"Layout exceeds venue capacity of {venue.total_capacity}")
+
+    existing_seats_count = db.query(Seat).filter(Seat.event_id == event_id).count()
+    version = bump_inventory_version(db, event_id)
+    created = _insert_seats(db, event_id, venue, existing_seats_count, generate_layout(event_id, layout, version), version)
+    return {"message": f"{created} seats created for event {event_id}. Total now: {existing_seats_count + created}", "created": created}
 
 @router.get("/events/{event_id}/summary")
 def view_booking_summary(event_id: int, db: Session = Depends(get_db), current_user = Depends(organizer_only)):
-    event = db.query(Event).filter(Event.id == event_id).first()
-    if not event:
+    # One primary-key lookup: the counters are kept current by the booking, payment, refund and entry paths
+    row = (
+        db.query(Event.name, Event.organizer_id, *(getattr(EventSalesStats, c) for c in STAT_COLUMNS))
+        .outerjoin(EventSalesStats, EventSalesStats.event_id == Event.id)
+        .filter(Event.id == event_id)
+        .first()
+    )
+    if not row:
         raise HTTPException(status_code=404, detail="Event not found")
-    if event.organizer_id != current_user.id:
+    if row.organizer_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to view this event's summary")
-    
-    booked_count = db.query(Seat).filter(Seat.event_id == event_id, Seat.status == "booked").count()
-    total_seats = db.query(Seat).filter(Seat.event_id == event_id).count()
-    
-    from sqlalchemy import func
-    revenue = db.query(func.sum(Order.total_amount)).filter(Order.event_id == event_id, Order.order_status == "confirmed").scalar() or 0
+    stats = {c: getattr(row, c) or 0 for c in STAT_COLUMNS}
     
     return {
-        "event_name": event.name,
-        "total_seats": total_seats,
-        "booked_seats": booked_count,
-        "revenue": revenue
+        "event_name": row.name,
+        "total_seats": stats["seats_available"] + stats["seats_held"] + stats["seats_sold"],
+        "booked_seats": stats["seats_sold"],
+        "held_seats": stats["seats_held"],
+        "available_seats": stats["seats_available"],
+        "revenue": stats["gross_revenue"] - stats["refunded_amount"],
+        "gross_revenue": stats["gross_revenue"],
+        "refunded_amount": stats["refunded_amount"],
+        "scans_admitted": stats["scans_admitted"],
     }
 
 @router.patch("/events/{event_id}/close")
@@ -67,4 +105,5 @@ def close_bookings(event_id: int, db: Session = Depends(get_db), current_user =
         raise HTTPException(status_code=404, detail="Event not found")
     event.status = EventStatus.CLOSED
     db.commit()
+    seat_maps.invalidate(event_id)
     return {"message": "Bookings closed"}
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from database.db import get_async_db, run_db
+from ..payment_utils import verify_webhook_signature
+from ..payment_outbox import PAYMENT_EVENT_TYPES, record_payment_event, payment_event_processor
+from typing import Optional
+import json
+
+router = APIRouter(prefix="/payments", tags=["payments"])
+
+@router.post("/razorpay/webhook")
+async def razorpay_webhook(request: Request, x_razorpay_signature: Optional[str] = Header(None), db = Depends(get_async_db)):
+    """
+    Razorpay webhook. Captured payments are only queued here, in one insert;
+    the payment event processor confirms the orders and issues tickets in
+    batches, so a burst of captures costs the gateway nothing but this.
+    """
+    body = await request.body()
+    if not x_razorpay_signature or not verify_webhook_signature(body, x_razorpay_signature):
+        raise HTTPException(status_code=400, detail="Invalid webhook signature")
+    try:
+        payload = json.loads(body)
+        if payload["event"] not in PAYMENT_EVENT_TYPES:
+            return {"status": "ignored"}
+        payment = payload["payload"]["payment"]["entity"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Malformed webhook payload")
+    if not isinstance(payment, dict) or not payment.get("id"):
+        raise HTTPException(status_code=400, detail="Malformed webhook payload")
+
+    queued = await run_db(db, record_payment_event, payload["event"], payment, body.decode())
+    if queued:
+        payment_event_processor.wake()
+    return {"status": "queued" if queued else "duplicate"}
@@ -1,8 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from database.db import get_db
 from database.models import SupportCase, RefundRequest, Order, Seat, Ticket, UserRole, RefundStatus, OrderStatus, TicketStatus
 from ..auth import RoleChecker
+from ..seat_reservation import release_seats
+from ..ticket_counts import add_ticket_count
+from ..event_stats import add_event_stats
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional
@@ -41,19 +45,31 @@ def approve_refund(refund_id: int, approval: RefundApproval, db: Session = Depen
     req = db.query(RefundRequest).filter(RefundRequest.id == refund_id).first()
     if not req:
         raise HTTPException(status_code=404, detail="Refund request not found")
+    if req.status != RefundStatus.PENDING:
+        raise HTTPException(status_code=400, detail="Refund request already resolved")
     
     if approval.approve:
+        # Conditional, so two approved requests for one order cannot refund it (and its counters) twice
+        refunded = db.execute(
+            update(Order)
+            .where(Order.id == req.order_id, Order.order_status == OrderStatus.CONFIRMED)
+            .values(order_status=OrderStatus.REFUNDED)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not refunded:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Order is not confirmed or was already refunded")
         req.status = RefundStatus.APPROVED
         order = db.query(Order).filter(Order.id == req.order_id).first()
-        order.order_status = OrderStatus.REFUNDED
         
         # Free seats and cancel tickets
         tickets = db.query(Ticket).filter(Ticket.order_id == order.id).all()
+        used = sum(1 for t in tickets if t.status == TicketStatus.USED)
         for t in tickets:
             t.status = TicketStatus.CANCELLED
-            seat = db.query(Seat).filter(Seat.id == t.seat_id).first()
-            if seat:
-                seat.status = "available"
+        release_seats(db, order.event_id, [t.seat_id for t in tickets])
+        add_ticket_count(db, order.user_id, order.event_id, -len(tickets))
+        add_event_stats(db, order.event_id, refunded_amount=order.total_amount, scans_admitted=-used)
     else:
         req.status = RefundStatus.REJECTED
     
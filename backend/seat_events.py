@@ -0,0 +1,109 @@
+"""
+Live seat changes for GET /customer/events/{id}/stream.
+
+The broker is in-process: it fans out the seat changes committed through
+this worker's SessionLocal sessions (requests and the in-process hold
+sweeper), handed over by the after_commit hook below. It shares nothing
+with other processes, so it is only complete when the app runs as a single
+worker. Under several uvicorn workers, or with writes from another process
+such as the admin shell, a subscriber misses every change committed
+elsewhere. Such deployments should have clients poll
+GET /customer/events/{id}/seats?since=<version> instead, which reads the
+database. That is also how any client catches up after reconnecting: each
+message's id is the inventory version it brings the client to.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Dict, Set
+
+from sqlalchemy import event
+
+from database.db import SessionLocal
+from .seat_map import seat_maps
+
+
+class SeatSubscription:
+    """
+    One live subscriber of an event's seat changes. Pending changes are
+    coalesced per seat, so a slow consumer holds at most one entry per seat
+    and receives the latest status instead of every intermediate step.
+    """
+
+    def __init__(self, event_id: int, loop: asyncio.AbstractEventLoop):
+        self.event_id = event_id
+        self.loop = loop
+        self.version = 0
+        self._pending: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._signalled = False
+        self._ready = asyncio.Event()
+
+    def offer(self, seat_ids, status: str, version: int):
+        with self._lock:
+            for seat_id in seat_ids:
+                self._pending[seat_id] = status
+            self.version = max(self.version, version)
+            if self._signalled:
+                return
+            self._signalled = True
+        try:
+            self.loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass  # subscriber's loop already closed
+
+    async def next_batch(self):
+        await self._ready.wait()
+        with self._lock:
+            self._ready.clear()
+            self._signalled = False
+            pending, self._pending = self._pending, {}
+            version = self.version
+        return {"event_id": self.event_id, "version": version, "seats": pending}
+
+
+class SeatEventBroker:
+    """In-process fan-out of committed seat changes to subscribers of each event."""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[SeatSubscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_id: int) -> SeatSubscription:
+        subscription = SeatSubscription(event_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[event_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: SeatSubscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.event_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.event_id]
+
+    def subscriber_count(self, event_id: int) -> int:
+        with self._lock:
+            return len(self._subscribers.get(event_id, ()))
+
+    def publish(self, event_id: int, seat_ids, status: str, version: int):
+        with self._lock:
+            subscribers = list(self._subscribers.get(event_id, ()))
+        for subscription in subscribers:
+            subscription.offer(seat_ids, status, version)
+
+
+seat_events = SeatEventBroker()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _dispatch_seat_changes(session):
+    for event_id, seat_ids, status, version in session.info.pop("seat_changes", []):
+        seat_maps.update(event_id, seat_ids, status)
+        seat_events.publish(event_id, seat_ids, status, version)
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_seat_changes(session, previous_transaction):
+    session.info.pop("seat_changes", None)
@@ -0,0 +1,70 @@
+from typing import Iterator, List, Optional
+
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from database.db import dialect_insert
+from database.models import Seat, SeatStatus
+
+SEAT_INSERT_CHUNK_SIZE = 5000
+# Upper bound on seats generated by one request, whatever the venue capacity
+MAX_SEATS_PER_REQUEST = 100_000
+MAX_SECTION_ROWS = 1000
+MAX_SEATS_PER_ROW = 1000
+
+
+class SectionLayout(BaseModel):
+    name: str = Field(min_length=1, max_length=32)
+    rows: int = Field(ge=1, le=MAX_SECTION_ROWS)
+    seats_per_row: int = Field(ge=1, le=MAX_SEATS_PER_ROW)
+    price: Optional[float] = Field(None, ge=0)
+
+
+class SeatLayout(BaseModel):
+    sections: List[SectionLayout] = Field(min_length=1, max_length=100)
+
+
+def layout_size(layout: SeatLayout) -> int:
+    return sum(s.rows * s.seats_per_row for s in layout.sections)
+
+
+def generate_layout(event_id: int, layout: SeatLayout, version: int) -> Iterator[dict]:
+    """Yields one insert row per seat, numbered "<section>-<row>-<seat>"."""
+    for section in layout.sections:
+        for row in range(1, section.rows + 1):
+            for seat in range(1, section.seats_per_row + 1):
+                yield {
+                    "event_id": event_id,
+                    "seat_number": f"{section.name}-{row}-{seat}",
+                    "section": section.name,
+                    "price": section.price,
+                    "status": SeatStatus.AVAILABLE.value,
+                    "version": version,
+                }
+
+
+def _insert_ignoring_duplicates(db: Session):
+    return (
+        dialect_insert(db, Seat.__table__)
+        .on_conflict_do_nothing(index_elements=["event_id", "seat_number"])
+        .returning(Seat.__table__.c.id)
+    )
+
+
+def bulk_insert_seats(db: Session, rows, chunk_size: int = SEAT_INSERT_CHUNK_SIZE) -> List[int]:
+    """
+    Inserts seat rows through Core executemany in chunks, without building
+    ORM objects. Seats whose (event_id, seat_number) already exists are
+    skipped, so re-running a layout is safe. Returns the ids actually inserted.
+    """
+    stmt = _insert_ignoring_duplicates(db)
+    inserted = []
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            inserted.extend(db.execute(stmt, chunk).scalars().all())
+            chunk = []
+    if chunk:
+        inserted.extend(db.execute(stmt, chunk).scalars().all())
+    return inserted
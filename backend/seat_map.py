@@ -0,0 +1,204 @@
+"""
+In-memory seat maps for the seat map endpoint.
+
+Each app worker keeps its own registry. Writes committed by this worker are
+applied to it directly (seat_events hands them over after commit). Writes
+from other workers, the hold sweeper process or the admin shell are picked
+up on the next read instead: every read first looks up the event's status
+and inventory_version, and when the version has moved on it pulls just the
+seats changed since (WHERE event_id = ? AND version > ?), or reloads the
+map when seats were added. A closed event is dropped on the next read.
+"""
+import base64
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+from sqlalchemy.orm import Session
+
+from database.models import Event, Seat, EventStatus, SeatStatus
+
+SEAT_MAP_CACHE_SIZE = int(os.getenv("SEAT_MAP_CACHE_SIZE", "1000"))
+
+# One byte per seat in the compact encoding
+STATUS_CODES = {SeatStatus.AVAILABLE: 0, SeatStatus.HELD: 1, SeatStatus.BOOKED: 2}
+STATUS_NAMES = {code: status.value for status, code in STATUS_CODES.items()}
+
+
+class EventSeatMap:
+    """
+    Seat inventory of one event kept as parallel arrays indexed by seat
+    position (ordered by seat id), so reads never hydrate ORM objects.
+    """
+
+    def __init__(self, event_id: int, rows, version: int = 0):
+        self.event_id = event_id
+        self.version = version  # Event.inventory_version the statuses are current as of
+        self.seat_ids: List[int] = []
+        self.seat_numbers: List[str] = []
+        self.statuses = bytearray()
+        for seat_id, seat_number, status in rows:
+            self.seat_ids.append(seat_id)
+            self.seat_numbers.append(seat_number)
+            self.statuses.append(STATUS_CODES.get(status, STATUS_CODES[SeatStatus.BOOKED]))
+        self._index: Dict[int, int] = {seat_id: i for i, seat_id in enumerate(self.seat_ids)}
+
+    def set_status(self, seat_ids: Iterable[int], status: str):
+        code = STATUS_CODES[status]
+        for seat_id in seat_ids:
+            i = self._index.get(seat_id)
+            if i is not None:
+                self.statuses[i] = code
+
+    def catch_up(self, rows, version: int) -> bool:
+        """
+        Applies (seat_id, status) rows changed after self.version. Returns
+        False, changing nothing, if a row is a seat this map does not have.
+        """
+        if any(seat_id not in self._index for seat_id, _ in rows):
+            return False
+        for seat_id, status in rows:
+            self.statuses[self._index[seat_id]] = STATUS_CODES.get(status, STATUS_CODES[SeatStatus.BOOKED])
+        self.version = max(self.version, version)
+        return True
+
+    def counts(self):
+        return {name: self.statuses.count(code) for code, name in STATUS_NAMES.items()}
+
+    def to_list(self):
+        return [
+            {"id": seat_id, "event_id": self.event_id, "seat_number": number, "status": STATUS_NAMES[code]}
+            for seat_id, number, code in zip(self.seat_ids, self.seat_numbers, self.statuses)
+        ]
+
+    def id_ranges(self):
+        """Seat ids run-length encoded as [first_id, count] pairs."""
+        ranges = []
+        for seat_id in self.seat_ids:
+            if ranges and ranges[-1][0] + ranges[-1][1] == seat_id:
+                ranges[-1][1] += 1
+            else:
+                ranges.append([seat_id, 1])
+        return ranges
+
+    def to_compact(self):
+        return {
+            "event_id": self.event_id,
+            "seat_id_ranges": self.id_ranges(),
+            "seat_numbers": self.seat_numbers,
+            "statuses": base64.b64encode(bytes(self.statuses)).decode("ascii"),
+            "status_codes": STATUS_NAMES,
+            "counts": self.counts(),
+        }
+
+
+class EventNotFoundError(LookupError):
+    pass
+
+
+class SeatMapRegistry:
+    """
+    Process-wide LRU of EventSeatMap objects for events open for booking.
+    Writers call update() after committing a seat status change; invalidate()
+    forces a reload when seats are added or the event is closed. get()
+    revalidates against events.inventory_version, so changes committed by
+    other processes are never served stale.
+    """
+
+    def __init__(self, max_size: int = SEAT_MAP_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self._maps: "OrderedDict[int, EventSeatMap]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _current_version(self, db: Session, event_id: int) -> int:
+        event = db.query(Event.status, Event.inventory_version).filter(Event.id == event_id).first()
+        if event is None or event.status != EventStatus.UPCOMING:
+            raise EventNotFoundError(event_id)
+        return event.inventory_version or 0
+
+    def _load(self, db: Session, event_id: int, version: int) -> EventSeatMap:
+        rows = (
+            db.query(Seat.id, Seat.seat_number, Seat.status)
+            .filter(Seat.event_id == event_id)
+            .order_by(Seat.id)
+            .all()
+        )
+        return EventSeatMap(event_id, rows, version)
+
+    def _catch_up(self, db: Session, seat_map: EventSeatMap, version: int) -> bool:
+        rows = db.query(Seat.id, Seat.status).filter(Seat.event_id == seat_map.event_id, Seat.version > seat_map.version).all()
+        with self._lock:
+            self.refreshes += 1
+            return seat_map.catch_up(rows, version)
+
+    def get(self, db: Session, event_id: int) -> EventSeatMap:
+        """The event's seat map; raises EventNotFoundError unless the event exists and is upcoming."""
+        # Read the version first: every change up to it is then in whatever is read after
+        try:
+            version = self._current_version(db, event_id)
+        except EventNotFoundError:
+            self.invalidate(event_id)
+            raise
+        with self._lock:
+            seat_map = self._maps.get(event_id)
+            if seat_map is not None:
+                self._maps.move_to_end(event_id)
+                self.hits += 1
+            else:
+                self.misses += 1
+                writes_before_load = self._writes
+        if seat_map is not None:
+            if version <= seat_map.version or self._catch_up(db, seat_map, version):
+                return seat_map
+            # Seats were added elsewhere
+            self.invalidate(event_id)
+            with self._lock:
+                writes_before_load = self._writes
+        seat_map = self._load(db, event_id, version)
+        with self._lock:
+            # A write that raced the load may be missing from it; serve it once without caching
+            if self._writes == writes_before_load:
+                seat_map = self._maps.setdefault(event_id, seat_map)
+                while len(self._maps) > self.max_size:
+                    self._maps.popitem(last=False)
+                    self.evictions += 1
+        return seat_map
+
+    def render(self, db: Session, event_id: int, compact: bool = False):
+        seat_map = self.get(db, event_id)
+        with self._lock:
+            return seat_map.to_compact() if compact else seat_map.to_list()
+
+    def update(self, event_id: int, seat_ids: Iterable[int], status: str):
+        with self._lock:
+            self._writes += 1
+            seat_map = self._maps.get(event_id)
+            if seat_map is not None:
+                seat_map.set_status(seat_ids, status)
+
+    def invalidate(self, event_id: int):
+        with self._lock:
+            self._writes += 1
+            self._maps.pop(event_id, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._maps),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+            }
+
+
+seat_maps = SeatMapRegistry()
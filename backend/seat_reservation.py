@@ -0,0 +1,182 @@
+import random
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from database.models import Event, Seat, EventStatus, SeatStatus
+from .event_stats import add_seat_transition
+from .seat_map import EventNotFoundError
+
+# SQLite reports writer contention as "database is locked" once its busy timeout expires.
+MAX_BUSY_RETRIES = 5
+BUSY_BACKOFF_SECONDS = 0.05
+
+
+class SeatUnavailableError(Exception):
+    def __init__(self, seat_ids: Iterable[int]):
+        self.seat_ids = sorted(seat_ids)
+        super().__init__(f"Seats not available: {self.seat_ids}")
+
+
+def _is_busy_error(exc: OperationalError) -> bool:
+    message = str(exc.orig if exc.orig is not None else exc).lower()
+    return "locked" in message or "busy" in message
+
+
+def run_with_busy_retry(db: Session, operation):
+    """
+    Runs `operation()` and retries it with jittered exponential backoff while
+    the database reports it is busy. The session is rolled back before each
+    retry, so `operation` must be the first write of the transaction.
+    """
+    for attempt in range(MAX_BUSY_RETRIES):
+        try:
+            return operation()
+        except OperationalError as e:
+            db.rollback()
+            if not _is_busy_error(e) or attempt == MAX_BUSY_RETRIES - 1:
+                raise
+            time.sleep(BUSY_BACKOFF_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+def bump_inventory_version(db: Session, event_id: int) -> int:
+    """
+    Increments the event's inventory version and returns the new value.
+    Every seat status change is stamped with it so clients can fetch deltas.
+    """
+    return db.execute(
+        update(Event)
+        .where(Event.id == event_id)
+        .values(inventory_version=func.coalesce(Event.inventory_version, 0) + 1)
+        .returning(Event.inventory_version)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+
+
+def record_seat_changes(db: Session, event_id: int, seat_ids: List[int], status: str, version: int):
+    """
+    Queues a seat status change on the session. The changes are handed to the
+    in-memory seat maps and live subscribers once the transaction commits,
+    and dropped if it rolls back (see seat_events).
+    """
+    if seat_ids:
+        db.info.setdefault("seat_changes", []).append((event_id, list(seat_ids), status, version))
+
+
+def claim_seats(db: Session, event_id: int, seat_ids: List[int], status: str = SeatStatus.HELD,
+                held_until: Optional[datetime] = None) -> List[int]:
+    """
+    Claims seats with a single conditional UPDATE (available -> `status`).
+    All-or-nothing: if any seat was taken or does not belong to the event,
+    the transaction is rolled back and SeatUnavailableError lists the lost seats.
+    """
+    requested = set(seat_ids)
+    stmt = (
+        update(Seat)
+        .where(Seat.id.in_(requested), Seat.event_id == event_id, Seat.status == SeatStatus.AVAILABLE)
+        .returning(Seat.id)
+        .execution_options(synchronize_session=False)
+    )
+
+    def claim():
+        version = bump_inventory_version(db, event_id)
+        return version, db.execute(stmt.values(status=status, held_until=held_until, version=version)).scalars().all()
+
+    version, claimed = run_with_busy_retry(db, claim)
+
+    lost = requested - set(claimed)
+    if lost:
+        db.rollback()
+        raise SeatUnavailableError(lost)
+    record_seat_changes(db, event_id, claimed, status, version)
+    add_seat_transition(db, event_id, len(claimed), SeatStatus.AVAILABLE, status)
+    return sorted(claimed)
+
+
+def assign_seats_to_order(db: Session, seat_ids: List[int], order_id: int):
+    db.execute(
+        update(Seat)
+        .where(Seat.id.in_(seat_ids))
+        .values(order_id=order_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def confirm_held_seats(db: Session, event_id: int, order_id: int, seat_ids: List[int]) -> List[int]:
+    """
+    Turns the order's holds into bookings. All-or-nothing, like claim_seats:
+    seats no longer held for this order raise SeatUnavailableError. A hold
+    past held_until counts until the hold sweeper releases it, the same rule
+    the payment webhook applies (payment_outbox), so a payment confirmed by
+    /verify and one confirmed by the webhook cannot disagree.
+    """
+    requested = set(seat_ids)
+    version = bump_inventory_version(db, event_id)
+    claimed = set(db.execute(
+        update(Seat)
+        .where(
+            Seat.id.in_(requested),
+            Seat.order_id == order_id,
+            Seat.status == SeatStatus.HELD,
+        )
+        .values(status=SeatStatus.BOOKED, held_until=None, version=version)
+        .returning(Seat.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all())
+
+    lost = requested - claimed
+    if lost:
+        db.rollback()
+        raise SeatUnavailableError(lost)
+    record_seat_changes(db, event_id, claimed, SeatStatus.BOOKED, version)
+    add_seat_transition(db, event_id, len(claimed), SeatStatus.HELD, SeatStatus.BOOKED)
+    return sorted(claimed)
+
+
+def release_seats(db: Session, event_id: int, seat_ids: List[int]) -> List[int]:
+    """Makes the given seats available again, e.g. after a refund or an expired hold."""
+    if not seat_ids:
+        return []
+    version = bump_inventory_version(db, event_id)
+    released = []
+    # One UPDATE per previous status, so the sales counters know what each seat was released from
+    for status in (SeatStatus.BOOKED, SeatStatus.HELD):
+        ids = db.execute(
+            update(Seat)
+            .where(Seat.id.in_(seat_ids), Seat.event_id == event_id, Seat.status == status)
+            .values(status=SeatStatus.AVAILABLE, held_until=None, order_id=None, version=version)
+            .returning(Seat.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        add_seat_transition(db, event_id, len(ids), status, SeatStatus.AVAILABLE)
+        released.extend(ids)
+    record_seat_changes(db, event_id, released, SeatStatus.AVAILABLE, version)
+    return released
+
+
+def seat_changes_since(db: Session, event_id: int, since: int):
+    """
+    Seats whose status changed after inventory version `since`, plus the
+    current version. Raises EventNotFoundError unless the event exists and is
+    upcoming, as the full seat map does.
+    """
+    # Read the version first: every change up to it is then guaranteed to be in the delta
+    event = db.query(Event.status, Event.inventory_version).filter(Event.id == event_id).first()
+    if event is None or event.status != EventStatus.UPCOMING:
+        raise EventNotFoundError(event_id)
+    version = event.inventory_version or 0
+    changes = (
+        db.query(Seat.id, Seat.seat_number, Seat.status)
+        .filter(Seat.event_id == event_id, Seat.version > since)
+        .order_by(Seat.id)
+        .all()
+    )
+    return {
+        "event_id": event_id,
+        "version": version,
+        "changes": [{"id": c.id, "seat_number": c.seat_number, "status": c.status} for c in changes],
+    }
@@ -0,0 +1,52 @@
+import base64
+import hashlib
+import hmac
+import os
+from typing import NamedTuple, Optional
+
+from .auth import SECRET_KEY, derive_secret
+
+# Anyone holding this key can mint ticket codes, so it must never be the JWT key. Without
+# TICKET_CODE_SECRET it is derived from SECRET_KEY under its own label.
+TICKET_CODE_SECRET = os.getenv("TICKET_CODE_SECRET", "").encode() or derive_secret(b"ticket-codes")
+if hmac.compare_digest(TICKET_CODE_SECRET, SECRET_KEY.encode()):
+    raise RuntimeError("TICKET_CODE_SECRET must not be the JWT SECRET_KEY; set a separate secret or leave it unset to derive one")
+TICKET_CODE_PREFIX = "TICK"
+# 80-bit truncated HMAC-SHA256, 16 base32 characters
+TICKET_CODE_MAC_BYTES = 10
+
+
+class TicketClaims(NamedTuple):
+    ticket_id: int
+    event_id: int
+    seat_id: int
+
+
+def _signature(payload: str) -> str:
+    digest = hmac.new(TICKET_CODE_SECRET, payload.encode(), hashlib.sha256).digest()
+    return base64.b32encode(digest[:TICKET_CODE_MAC_BYTES]).decode("ascii")
+
+
+def make_ticket_code(ticket_id: int, event_id: int, seat_id: Optional[int]) -> str:
+    """TICK-<event>-<seat>-<ticket>-<signature>; unique because the ticket id is."""
+    payload = f"{TICKET_CODE_PREFIX}-{event_id}-{seat_id or 0}-{ticket_id}"
+    return f"{payload}-{_signature(payload)}"
+
+
+def is_signed_ticket_code(ticket_code: str) -> bool:
+    """Signed codes have five parts; older TICK-XXXXXXXX codes are only known to the database."""
+    return ticket_code.count("-") == 4
+
+
+def read_ticket_code(ticket_code: str) -> Optional[TicketClaims]:
+    """Claims of a signed ticket code, or None if it is malformed or its signature does not match."""
+    if not is_signed_ticket_code(ticket_code):
+        return None
+    payload, signature = ticket_code.strip().upper().rsplit("-", 1)
+    prefix, event_id, seat_id, ticket_id = payload.split("-")
+    if prefix != TICKET_CODE_PREFIX or not hmac.compare_digest(signature.encode(), _signature(payload).encode()):
+        return None
+    try:
+        return TicketClaims(int(ticket_id), int(event_id), int(seat_id))
+    except ValueError:
+        return None
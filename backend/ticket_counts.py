@@ -0,0 +1,28 @@
+from sqlalchemy.orm import Session
+
+from database.db import dialect_insert
+from database.models import UserEventTicketCount
+
+
+def get_ticket_count(db: Session, user_id: int, event_id: int) -> int:
+    count = (
+        db.query(UserEventTicketCount.ticket_count)
+        .filter(UserEventTicketCount.user_id == user_id, UserEventTicketCount.event_id == event_id)
+        .scalar()
+    )
+    return count or 0
+
+
+def add_ticket_count(db: Session, user_id: int, event_id: int, delta: int):
+    """
+    Adjusts the user's confirmed ticket count for an event in the current
+    transaction. Call with a positive delta when tickets are issued and a
+    negative one when they are refunded.
+    """
+    if not delta:
+        return
+    stmt = dialect_insert(db, UserEventTicketCount).values(user_id=user_id, event_id=event_id, ticket_count=max(delta, 0))
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["user_id", "event_id"],
+        set_={"ticket_count": UserEventTicketCount.ticket_count + delta},
+    ))
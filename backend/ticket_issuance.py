@@ -0,0 +1,54 @@
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm import Session
+
+from database.models import Order, Ticket, TicketStatus
+from .ticket_codes import make_ticket_code
+from .ticket_counts import add_ticket_count
+
+tickets_table = Ticket.__table__
+
+
+def issue_tickets(db: Session, order: Order, seat_ids: List[int]) -> List[int]:
+    """Issues one active ticket per confirmed seat of `order` and returns their ids. Does not commit."""
+    return issue_order_tickets(db, [(order, seat_ids)]).get(order.id, [])
+
+
+def issue_order_tickets(db: Session, orders: List[Tuple[Order, List[int]]]) -> Dict[int, List[int]]:
+    """
+    Issues tickets for the confirmed seats of any number of orders and returns
+    {order id: ticket ids}. The rows go in with one multi-row INSERT ...
+    RETURNING and get their signed codes in one executemany UPDATE, however
+    many tickets there are. Codes embed the ticket id, so they cannot collide.
+    Does not commit.
+    """
+    by_id = {order.id: order for order, _ in orders}
+    values = [
+        {"order_id": order.id, "seat_id": seat_id, "status": TicketStatus.ACTIVE}
+        for order, seat_ids in orders for seat_id in seat_ids
+    ]
+    if not values:
+        return {}
+    rows = db.execute(
+        # Codes are paired by the returned order and seat ids, so RETURNING order does not matter
+        insert(tickets_table).returning(tickets_table.c.id, tickets_table.c.order_id, tickets_table.c.seat_id),
+        values,
+    ).all()
+    db.execute(
+        update(tickets_table)
+        .where(tickets_table.c.id == bindparam("issued_id"))
+        .values(ticket_code=bindparam("issued_code")),
+        [{"issued_id": row.id, "issued_code": make_ticket_code(row.id, by_id[row.order_id].event_id, row.seat_id)} for row in rows],
+    )
+
+    issued: Dict[int, List[int]] = {}
+    for row in rows:
+        issued.setdefault(row.order_id, []).append(row.id)
+    counts = Counter()
+    for order_id, ticket_ids in issued.items():
+        counts[by_id[order_id].user_id, by_id[order_id].event_id] += len(ticket_ids)
+    for (user_id, event_id), count in counts.items():
+        add_ticket_count(db, user_id, event_id, count)
+    return issued
@@ -0,0 +1,10 @@
+"""
+Load tests, race checks and benchmarks for the backend, kept out of the app
+package. Each module is a script, run from the repository root:
+
+    python -m benchmarks.<name> --help
+
+They build their own data in a temporary SQLite database (seeding.py), and
+the HTTP ones start the app under uvicorn (app_server.py). Scripts that check
+correctness as well as speed exit with status 1 when a check fails.
+"""
@@ -0,0 +1,122 @@
+"""
+Many gates, one ticket, same instant.
+
+Every scanner presents every ticket of the sold-out event at once, first
+through check_ticket followed by use_ticket and then through admit_ticket
+alone, and the script counts tickets reported valid at more than one gate.
+admit_ticket must admit each ticket exactly once, log every scan and keep
+the admission counter in step.
+
+    python -m benchmarks.admission_race [--tickets 2000] [--scanners 16]
+"""
+import argparse
+import sys
+import threading
+import time
+from collections import Counter
+
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+
+from backend.event_stats import EventStatsReconciler
+from backend.routers.entry import admit_ticket, check_ticket, use_ticket
+from backend.ticket_codes import make_ticket_code
+from database.models import EntryLog, Ticket, TicketStatus
+
+from .seeding import ENTRY_MANAGER_ID, SOLD_OUT_EVENT_ID, seed_sold_out_event, sessions, temp_database
+
+
+def fresh_database(name: str, tickets: int):
+    engine = temp_database(name)
+    seed_sold_out_event(engine, tickets)
+    return engine, sessions(engine)
+
+
+def race(Session, codes, scanners: int, scan):
+    """Every scanner presents every code, in the same order, so each code is contended by all of them."""
+    reported_valid, errors = Counter(), []
+    lock = threading.Lock()
+    barrier = threading.Barrier(scanners)
+
+    def scanner():
+        db = Session()
+        try:
+            barrier.wait()
+            for code in codes:
+                try:
+                    ticket_id = scan(db, code)
+                except OperationalError as e:
+                    db.rollback()
+                    errors.append(e)
+                    continue
+                if ticket_id is not None:
+                    with lock:
+                        reported_valid[ticket_id] += 1
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=scanner) for _ in range(scanners)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started, reported_valid, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=2000)
+    parser.add_argument("--scanners", type=int, default=16)
+    args = parser.parse_args(argv)
+    if args.tickets < 1 or args.scanners < 2:
+        parser.error("need at least one ticket and two scanners")
+
+    codes = [make_ticket_code(n, SOLD_OUT_EVENT_ID, n) for n in range(1, args.tickets + 1)]
+    scans = args.tickets * args.scanners
+
+    def validate_then_use(db, code):
+        result, _, ticket_id = check_ticket(db, code, ENTRY_MANAGER_ID, SOLD_OUT_EVENT_ID)
+        if result != "success":
+            return None
+        try:
+            use_ticket(db, ticket_id)
+        except HTTPException:
+            db.rollback()  # another gate marked it used in between, after this one was told it is valid
+        return ticket_id
+
+    def admit_once(db, code):
+        result, _, ticket_id = admit_ticket(db, code, ENTRY_MANAGER_ID, SOLD_OUT_EVENT_ID)
+        return ticket_id if result == "success" else None
+
+    print(f"{args.tickets} tickets, each presented at {args.scanners} gates at once ({scans} scans per flow)")
+    checks = {}
+    for name, scan in (("validate + use", validate_then_use), ("admit", admit_once)):
+        engine, Session = fresh_database(f"{name.split()[0]}.db", args.tickets)
+        elapsed, reported_valid, errors = race(Session, codes, args.scanners, scan)
+        doubles = sum(1 for n in reported_valid.values() if n > 1)
+        print(f"  {name:<15} {scans / elapsed:>8,.0f} scans/s, {doubles} tickets reported valid at more than one gate, "
+              f"{len(errors)} failed scans")
+        if scan is admit_once:
+            db = Session()
+            used = db.query(Ticket).filter(Ticket.status == TicketStatus.USED).count()
+            admissions = db.query(EntryLog).filter(EntryLog.result == "success").count()
+            logged = db.query(EntryLog).count()
+            db.close()
+            drift = EventStatsReconciler(session_factory=Session, repair=False).reconcile_once(event_ids=[SOLD_OUT_EVENT_ID])
+            checks.update({
+                "no failed scans": not errors,
+                "every ticket admitted exactly once": len(reported_valid) == args.tickets and doubles == 0,
+                "every ticket marked used": used == args.tickets,
+                "one success log per ticket": admissions == args.tickets,
+                "every scan logged": logged == scans,
+                "admission counter matches": drift["drifted_events"] == 0,
+            })
+        engine.dispose()
+    for name, ok in checks.items():
+        print(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Runs the app (and the fake gateway) under uvicorn for the HTTP benchmarks."""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_serving(process, port: int, timeout: float = 60):
+    """Waits until the FastAPI app started as `process` answers on `port`."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/openapi.json", timeout=1).status_code == 200:
+                return process
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("server did not start")
+
+
+def start_server(database_url: str, port: int, async_db: str = "auto", **env):
+    """backend.main:app on `port` against `database_url`; extra keyword arguments become environment variables."""
+    env = dict(os.environ, DATABASE_URL=database_url, ASYNC_DB=async_db, PYTHONPATH=REPO_ROOT, **env)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning", "--no-access-log",
+         # Longer than any queued request waits, so the client never reuses a connection the server is closing
+         "--timeout-keep-alive", "120"],
+        cwd=tempfile.gettempdir(), env=env,
+    )
+    return wait_until_serving(server, port)
+
+
+def start_fake_gateway(port: int, *options):
+    """benchmarks.fake_razorpay on `port`, with its command-line `options`."""
+    gateway = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_razorpay", "--port", str(port), *options],
+        cwd=tempfile.gettempdir(), env=dict(os.environ, PYTHONPATH=REPO_ROOT),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return wait_until_serving(gateway, port)
+
+
+def stop(*processes):
+    for process in processes:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+def bearer(email: str, user_id: int, role: str) -> dict:
+    """Authorization header for `user_id`, valid for an hour."""
+    from backend.auth import create_access_token
+
+    token = create_access_token({"sub": email, "uid": user_id, "role": role}, timedelta(hours=1))
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,98 @@
+"""
+Async versus sync session path under load.
+
+The app serves the same burst of authenticated reads twice: once on the
+sync fallback (ASYNC_DB=0, run_db in the threadpool) and once on
+AsyncSession over aiosqlite (ASYNC_DB=1). Half the requests are customers
+polling one of their orders, half are seat delta polls. The load generator
+shares the machine with the server.
+
+    python -m benchmarks.async_benchmark [--requests 3000] [--concurrency 100]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+from .app_server import bearer, free_port, start_server, stop
+from .seeding import FIRST_CUSTOMER_ID, UPCOMING_EVENT_ID, catalog_customers, customer_email, seed_catalog, temp_database
+
+EVENTS = 20
+SEATS_PER_EVENT = 100
+
+
+async def fire(base_url: str, requests, concurrency: int):
+    latencies, failures = [], Counter()
+    gate = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def one(path, headers):
+            async with gate:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path, headers=headers)
+                except httpx.TransportError as e:
+                    failures[type(e).__name__] += 1
+                    return
+                if response.status_code != 200:
+                    failures[f"HTTP {response.status_code}"] += 1
+                    return
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(path, headers) for path, headers in requests))
+        return time.perf_counter() - started, latencies, failures
+
+
+def plan_requests(count: int):
+    """(path, headers) pairs: even ones poll an order as its owner, odd ones poll seat changes."""
+    customers = catalog_customers(EVENTS)
+    orders = EVENTS * ((SEATS_PER_EVENT + 1) // 2)
+    requests = []
+    for n in range(count):
+        order_id = 1 + n % orders
+        user_id = FIRST_CUSTOMER_ID + order_id % customers
+        path = f"/customer/orders/{order_id}" if n % 2 == 0 else f"/customer/events/{UPCOMING_EVENT_ID}/seats?since=0"
+        requests.append((path, bearer(customer_email(user_id), user_id, "customer")))
+    return requests
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args(argv)
+    if args.requests < 2 or args.concurrency < 1:
+        parser.error("need at least 2 requests and a concurrency of 1")
+
+    engine = temp_database("async.db")
+    seed_catalog(engine, EVENTS, SEATS_PER_EVENT)
+    database_url = str(engine.url)
+    engine.dispose()
+    requests = plan_requests(args.requests)
+
+    print(f"{args.requests} requests, {args.concurrency} in flight")
+    print(f"{'mode':<22} {'req/s':>8} {'p50':>9} {'p99':>9} {'failed':>7}")
+    failed_total = 0
+    for name, async_db in (("sync (threadpool)", "0"), ("async (aiosqlite)", "1")):
+        port = free_port()
+        server = start_server(database_url, port, async_db)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            asyncio.run(fire(base_url, requests[:args.concurrency], args.concurrency))  # warm-up
+            elapsed, latencies, failures = asyncio.run(fire(base_url, requests, args.concurrency))
+        finally:
+            stop(server)
+        failed_total += sum(failures.values())
+        cuts = statistics.quantiles(latencies, n=100) if len(latencies) >= 2 else [0.0] * 99
+        print(f"{name:<22} {len(latencies) / elapsed:>8,.0f} {cuts[49] * 1000:>6.1f} ms {cuts[98] * 1000:>6.1f} ms "
+              f"{sum(failures.values()):>7}" + "".join(f"  {reason}: {n}" for reason, n in failures.items()))
+    return 0 if failed_total == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
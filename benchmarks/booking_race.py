@@ -0,0 +1,129 @@
+"""
+Flash-sale booking race.
+
+Thousands of customers order overlapping seats of one event at once, most of
+them fighting over the same front rows, through create_order as
+POST /customer/orders runs it. Afterwards no seat may be held by two orders,
+every winner must hold exactly the seats it asked for, and the event's sales
+counters must match its seats.
+
+    python -m benchmarks.booking_race [--seats 2000] [--orders 5000] [--workers 16]
+"""
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+
+from backend.event_stats import EventStatsReconciler
+from backend.idempotency import IdempotencyStore
+from backend.routers.customer import OrderCreate, create_order
+from database.models import Seat, SeatStatus
+
+from .seeding import FIRST_CUSTOMER_ID, FLASH_SALE_EVENT_ID, seed_flash_sale, sessions, temp_database
+
+
+def plan_orders(rng, seats: int, orders: int, hot_fraction: float):
+    """One order per customer for 1-4 seats; most of them go for the same block of front-row seats."""
+    hot = max(int(seats * hot_fraction), 4)
+    plans = []
+    for _ in range(orders):
+        pool = hot if rng.random() < 0.8 else seats
+        plans.append(rng.sample(range(1, pool + 1), rng.randint(1, 4)))
+    return plans
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seats", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--hot-fraction", type=float, default=0.05, help="share of seats most orders compete for")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    if args.seats < 4:
+        parser.error("--seats must be at least 4")
+
+    rng = random.Random(args.seed)
+    engine = temp_database("race.db")
+    seed_flash_sale(engine, args.seats, args.orders)
+    Session = sessions(engine)
+
+    plans = plan_orders(rng, args.seats, args.orders, args.hot_fraction)
+    store = IdempotencyStore(purge_interval=0)
+    won, lost, errors, latencies = {}, [0], [], []
+    lock = threading.Lock()
+    next_plan = iter(enumerate(plans))
+
+    def worker():
+        db = Session()
+        try:
+            while True:
+                with lock:
+                    item = next(next_plan, None)
+                if item is None:
+                    return
+                n, seat_ids = item
+                user_id = FIRST_CUSTOMER_ID + n
+                order_data = OrderCreate(event_id=FLASH_SALE_EVENT_ID, seat_ids=seat_ids)
+                started = time.perf_counter()
+                try:
+                    response = store.run(db, user_id, None, "POST /customer/orders", order_data, create_order, order_data, user_id)
+                except HTTPException:
+                    db.rollback()
+                    with lock:
+                        lost[0] += 1
+                    continue
+                except OperationalError as e:
+                    db.rollback()
+                    errors.append(e)
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    won[response["order_id"]] = seat_ids
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    sold = Counter(seat_id for seat_ids in won.values() for seat_id in seat_ids)
+    double_booked = sum(1 for count in sold.values() if count > 1)
+    db = Session()
+    holders = dict(db.query(Seat.id, Seat.order_id).filter(Seat.event_id == FLASH_SALE_EVENT_ID, Seat.status == SeatStatus.HELD))
+    db.close()
+    drift = EventStatsReconciler(session_factory=Session, repair=False).reconcile_once(event_ids=[FLASH_SALE_EVENT_ID])
+    checks = {
+        "no failed transactions": not errors,
+        "no seat sold twice": double_booked == 0,
+        "every winning order holds its seats": all(holders.get(s) == order_id for order_id, seats in won.items() for s in seats),
+        "no seat held without a winning order": len(holders) == len(sold),
+        "sales counters match the seats": drift["drifted_events"] == 0,
+    }
+
+    attempts = len(won) + lost[0] + len(errors)
+    print(f"Orders: {attempts} from {args.workers} workers in {elapsed:.2f}s ({attempts / elapsed:,.0f} orders/s)")
+    print(f"  won {len(won)} ({len(sold)} seats), lost {lost[0]}, failed {len(errors)}")
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100)
+        print(f"  winning order latency p50 {cuts[49] * 1000:.1f} ms, p99 {cuts[98] * 1000:.1f} ms")
+    print(f"Double-booked seats: {double_booked}")
+    for name, ok in checks.items():
+        print(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    for e in errors[:5]:
+        print(f"  error: {e}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
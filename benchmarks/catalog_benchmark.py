@@ -0,0 +1,139 @@
+"""
+GET /customer/events on a catalog of 100k upcoming events.
+
+The old endpoint loaded every upcoming event as a full ORM object and
+JSON-encoded the lot. list_catalog is timed against it for the first page,
+a page halfway down through its cursor, each filter, all filters together
+and a page served from the response cache. Every page must hold the same
+events as filtering the full list in Python.
+
+    python -m benchmarks.catalog_benchmark [--events 100000]
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert
+
+from backend.event_catalog import CatalogCache, CatalogQuery, decode_cursor, list_catalog
+from database.models import Event, EventStatus, User, UserRole, Venue
+
+from .seeding import sessions, temp_database
+
+CATEGORIES = ("Music", "Sports", "Comedy", "Theatre", "Conference", "Festival", "Workshop", "Exhibition")
+CITIES = 20
+VENUES = 200
+ORGANIZERS = 50
+
+
+def seed(engine, events: int, rng):
+    start = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": o, "name": f"Organizer {o}", "email": f"org{o}@catalog", "password": "x", "role": UserRole.ORGANIZER.value}
+            for o in range(1, ORGANIZERS + 1)
+        ])
+        conn.execute(insert(Venue), [
+            {"id": v, "name": f"Venue {v}", "city": f"City {v % CITIES}", "total_capacity": 1000, "address": "-"}
+            for v in range(1, VENUES + 1)
+        ])
+        conn.execute(insert(Event), [
+            {"id": e, "venue_id": rng.randint(1, VENUES), "organizer_id": rng.randint(1, ORGANIZERS), "name": f"Event {e}",
+             "category": rng.choice(CATEGORIES), "event_date": start + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+             "ticket_price": float(rng.randrange(100, 5000, 50)), "max_tickets_per_user": 4, "status": "upcoming",
+             "inventory_version": 0, "hold_ttl_seconds": 600}
+            for e in range(1, events + 1)
+        ])
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    return start
+
+
+def timed(fn, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20, help="runs per timing (the full list runs 3 times)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    if args.events < 1000:
+        parser.error("--events must be at least 1000")
+
+    rng = random.Random(args.seed)
+    engine = temp_database("catalog.db")
+    start = seed(engine, args.events, rng)
+    Session = sessions(engine)
+    db = Session()
+
+    def old_endpoint():
+        events = db.query(Event).filter(Event.status == EventStatus.UPCOMING).all()
+        body = json.dumps(jsonable_encoder(events)).encode()
+        db.expunge_all()
+        return body
+
+    old_seconds, old_body = timed(old_endpoint, 3)
+    everything = sorted(json.loads(old_body), key=lambda e: (e["event_date"], e["id"]))
+    city_of = {venue_id: city for venue_id, city in db.query(Venue.id, Venue.city)}
+
+    deep = everything[args.events // 2]
+    filters = {
+        "category": {"category": "Music"},
+        "city": {"city": "City 3"},
+        "date range": {"date_from": start + timedelta(days=100), "date_to": start + timedelta(days=107)},
+        "price range": {"min_price": 1000.0, "max_price": 1500.0},
+        "all filters": {"category": "Music", "city": "City 3", "date_from": start + timedelta(days=30),
+                        "date_to": start + timedelta(days=120), "min_price": 500.0, "max_price": 3000.0},
+    }
+    queries = {"first page": CatalogQuery(),
+               "page at 50% depth": CatalogQuery(cursor=(datetime.fromisoformat(deep["event_date"]), deep["id"]))}
+    queries.update({name: CatalogQuery(**values) for name, values in filters.items()})
+
+    def expected_ids(query: CatalogQuery):
+        def matches(e):
+            date = datetime.fromisoformat(e["event_date"])
+            return ((query.category is None or e["category"] == query.category)
+                    and (query.city is None or city_of[e["venue_id"]] == query.city)
+                    and (query.date_from is None or date >= query.date_from)
+                    and (query.date_to is None or date <= query.date_to)
+                    and (query.min_price is None or e["ticket_price"] >= query.min_price)
+                    and (query.max_price is None or e["ticket_price"] <= query.max_price)
+                    and (query.cursor is None or (date, e["id"]) > query.cursor))
+        return [e["id"] for e in everything if matches(e)][:query.limit]
+
+    print(f"Catalog of {args.events:,} upcoming events, pages of {CatalogQuery().limit}")
+    print(f"{'request':<28} {'p50':>10} {'bytes':>12}")
+    print(f"{'full list (before)':<28} {old_seconds * 1000:>7.1f} ms {len(old_body):>12,}")
+    ok = True
+    cache = CatalogCache()
+    for name, query in queries.items():
+        seconds, page = timed(lambda: list_catalog(db, query), args.repeat)
+        body = cache.put(query, page, cache.generation)
+        matches = [item["id"] for item in page["items"]] == expected_ids(query)
+        ok = ok and matches
+        print(f"{name:<28} {seconds * 1000:>7.2f} ms {len(body):>12,}" + ("" if matches else "  FAIL: wrong events"))
+        if name == "first page":
+            cursor = decode_cursor(page["next_cursor"])
+            seconds, _ = timed(lambda: list_catalog(db, query._replace(cursor=cursor)), args.repeat)
+            print(f"{'next page (cursor)':<28} {seconds * 1000:>7.2f} ms")
+    seconds, body = timed(lambda: cache.get(queries["first page"]), args.repeat)
+    print(f"{'first page, cached':<28} {seconds * 1000:>7.3f} ms {len(body):>12,}")
+    print(f"  [{'ok' if ok else 'FAIL'}] every page matches filtering the full list")
+    db.close()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
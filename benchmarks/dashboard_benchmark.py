@@ -0,0 +1,175 @@
+"""
+Admin dashboard data loading with 1,000 organizers.
+
+First the Events and Manage Organizers tabs: each used to list the
+organizers and then fetch every profile on its own
+(GET /admin/organizers/{id}/profile), where now one
+GET /admin/organizers/profiles does. Both run over one keep-alive session,
+so only the number of requests differs, and must return the same profiles.
+
+Then the whole dashboard through the frontend's HTTP client
+(frontend/api_transport.py). It used to make its six reads one after
+another with bare requests.get, a new connection each, fetching venues and
+organizers twice; now the pooled session makes the four distinct reads
+concurrently on the fetch pool. A pooled but sequential run separates the
+two effects. Streamlit is not needed: the page is not rendered.
+
+    python -m benchmarks.dashboard_benchmark [--organizers 1000] [--repeat 5]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import requests
+from sqlalchemy import insert, text
+
+from backend.routers.admin import MAX_ORGANIZER_IDS, PROFILE_FIELDS
+from database.migrations import BACKFILLS
+from database.models import Event, OrganizerProfile, User, UserRole, Venue
+from frontend.api_transport import API_TIMEOUT, new_fetch_pool, new_http_session
+
+from .app_server import bearer, free_port, start_server, stop
+from .seeding import temp_database
+
+ADMIN_ID = 1
+FIRST_ORGANIZER_ID = 1000
+VENUES = 100
+EVENTS = 500
+# The admin dashboard's reads per run, before and after the shared client
+DASHBOARD_READS_BEFORE = ("/admin/venues", "/admin/venues", "/admin/organizers/profiles", "/admin/events/all",
+                          "/admin/events/stats", "/admin/organizers/profiles")
+DASHBOARD_READS = ("/admin/venues", "/admin/organizers/profiles", "/admin/events/all", "/admin/events/stats")
+
+
+def seed(engine, organizers: int, rng):
+    organizer_ids = range(FIRST_ORGANIZER_ID, FIRST_ORGANIZER_ID + organizers)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": ADMIN_ID, "name": "Admin", "email": "admin@dashboard", "password": "x", "role": UserRole.ADMIN.value},
+        ] + [
+            {"id": o, "name": f"Organizer {o}", "email": f"org{o}@dashboard", "password": "x", "role": UserRole.ORGANIZER.value}
+            for o in organizer_ids
+        ])
+        conn.execute(insert(OrganizerProfile), [
+            {"user_id": o, "company_name": f"Company {o}", "bio": "-", "years_of_experience": o % 20,
+             "specialization": rng.choice(("Music", "Sports", "Tech")), "is_verified": rng.random() < 0.5}
+            for o in organizer_ids if o % 4
+        ])
+        conn.execute(insert(Venue), [
+            {"id": v, "name": f"Venue {v}", "city": f"City {v % 10}", "total_capacity": 1000, "address": "-"}
+            for v in range(1, VENUES + 1)
+        ])
+        conn.execute(insert(Event), [
+            {"id": e, "venue_id": rng.randint(1, VENUES), "organizer_id": rng.choice(organizer_ids), "name": f"Event {e}",
+             "category": "Music", "event_date": datetime.now() + timedelta(days=30), "ticket_price": 500.0,
+             "max_tickets_per_user": 4, "status": "upcoming", "inventory_version": 0, "hold_ttl_seconds": 600}
+            for e in range(1, EVENTS + 1)
+        ])
+        conn.execute(text(BACKFILLS["event_sales_stats"]))
+    return list(organizer_ids)
+
+
+def median_run(load, repeat: int):
+    """Median seconds of `load()` over `repeat` runs after one warm-up, and the last run's result."""
+    result = load()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = load()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--organizers", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5, help="timed dashboard loads per variant")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    if args.organizers < 1 or args.repeat < 1:
+        parser.error("--organizers and --repeat must be positive")
+
+    rng = random.Random(args.seed)
+    engine = temp_database("dashboard.db")
+    organizer_ids = seed(engine, args.organizers, rng)
+    database_url = str(engine.url)
+    engine.dispose()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(database_url, port)
+    session, headers = requests.Session(), bearer("admin@dashboard", ADMIN_ID, "admin")
+    sent = [0]
+
+    def get(path, params=None):
+        sent[0] += 1
+        response = session.get(f"{base_url}{path}", params=params, headers=headers, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def per_organizer_profiles():
+        organizers = get("/admin/organizers")
+        return {o["id"]: get(f"/admin/organizers/{o['id']}/profile") for o in organizers}
+
+    def tabs_before():
+        # Events tab, then Manage Organizers tab, each with its own fan-out
+        return [per_organizer_profiles() for _ in range(2)][-1]
+
+    def tabs_after():
+        return [{o["id"]: o["profile"] for o in get("/admin/organizers/profiles")} for _ in range(2)][-1]
+
+    try:
+        print(f"{args.organizers:,} organizers, {sum(1 for o in organizer_ids if o % 4):,} with a profile")
+        print(f"{'Events + Manage Organizers tabs':<34} {'requests':>9} {'p50':>10}")
+        results = {}
+        for name, load in (("per-organizer profiles (before)", tabs_before), ("batch endpoint", tabs_after)):
+            sent[0] = 0
+            seconds, results[name] = median_run(load, args.repeat)
+            print(f"{name:<34} {sent[0] // (args.repeat + 1):>9,} {seconds * 1000:>7.0f} ms")
+        wanted = sorted(rng.sample(organizer_ids, min(MAX_ORGANIZER_IDS, len(organizer_ids))))
+        seconds, subset = median_run(lambda: get("/admin/organizers/profiles", {"ids": wanted}), args.repeat)
+        print(f"{f'ids= with {len(wanted)} organizers':<34} {1:>9,} {seconds * 1000:>7.0f} ms")
+
+        pooled, pool = new_http_session(), new_fetch_pool()
+
+        def read(http, path):
+            response = http.get(f"{base_url}{path}", headers=headers, timeout=API_TIMEOUT)
+            response.raise_for_status()
+            return path, response.json()
+
+        dashboard = {}
+        print(f"{'admin dashboard data':<34} {'requests':>9} {'p50':>10}")
+        for name, reads, load in (
+            ("bare requests, sequential (before)", DASHBOARD_READS_BEFORE, lambda: [read(requests, p) for p in DASHBOARD_READS_BEFORE]),
+            ("pooled session, sequential", DASHBOARD_READS, lambda: [read(pooled, p) for p in DASHBOARD_READS]),
+            ("pooled session, concurrent (after)", DASHBOARD_READS, lambda: list(pool.map(lambda p: read(pooled, p), DASHBOARD_READS))),
+        ):
+            seconds, responses = median_run(load, args.repeat)
+            dashboard[name] = dict(responses)
+            print(f"{name:<34} {len(reads):>9,} {seconds * 1000:>7.0f} ms")
+        pool.shutdown()
+    finally:
+        stop(server)
+
+    before, after = results["per-organizer profiles (before)"], results["batch endpoint"]
+    same_profiles = before.keys() == after.keys() and all(
+        (before[o] is None and after[o] is None)
+        or (before[o] is not None and after[o] is not None and all(before[o][f] == after[o][f] for f in PROFILE_FIELDS))
+        for o in before
+    )
+    checks = {
+        "batch endpoint returns the same profile for every organizer": same_profiles,
+        "ids= returns exactly the requested organizers": [o["id"] for o in subset] == wanted,
+        "dashboard data is the same however it is loaded": all(data == dashboard["bare requests, sequential (before)"]
+                                                              for data in dashboard.values()),
+    }
+    for name, ok in checks.items():
+        print(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Inline versus batched entry logging.
+
+Concurrent gates validate every ticket of the sold-out event through
+check_ticket, the POST /entry/validate path. In the first run each scan
+commits its own entry log row, because the writer is not running; in the
+second the background EntryLogWriter batches them. Every scan must be in
+entry_logs once the writer has stopped.
+
+    python -m benchmarks.entry_log_benchmark [--tickets 20000] [--gates 8]
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+
+from backend.entry_log_writer import entry_log_writer
+from backend.routers.entry import check_ticket
+from backend.ticket_codes import make_ticket_code
+from database.models import EntryLog
+
+from .seeding import ENTRY_MANAGER_ID, SOLD_OUT_EVENT_ID, seed_sold_out_event, sessions, temp_database
+
+
+def scan_all(Session, codes, gates: int):
+    latencies, admitted = [], [0]
+    lock = threading.Lock()
+
+    def gate(share):
+        db = Session()
+        local = []
+        try:
+            for code in share:
+                started = time.perf_counter()
+                result, _, _ = check_ticket(db, code, ENTRY_MANAGER_ID, SOLD_OUT_EVENT_ID)
+                db.close()  # as run_db does after every request
+                local.append(time.perf_counter() - started)
+                if result == "success":
+                    with lock:
+                        admitted[0] += 1
+        finally:
+            db.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=gate, args=(codes[n::gates],)) for n in range(gates)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started, latencies, admitted[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=20000)
+    parser.add_argument("--gates", type=int, default=8)
+    args = parser.parse_args(argv)
+    if args.tickets < 1 or args.gates < 1:
+        parser.error("--tickets and --gates must be positive")
+
+    codes = [make_ticket_code(n, SOLD_OUT_EVENT_ID, n) for n in range(1, args.tickets + 1)]
+    print(f"{args.tickets} scans from {args.gates} gates")
+    print(f"{'logging':<10} {'scans/s':>9} {'p50':>9} {'p99':>9} {'logged':>8}")
+    ok = True
+    for mode in ("inline", "batched"):
+        engine = temp_database(f"{mode}.db")
+        seed_sold_out_event(engine, args.tickets)
+        Session = sessions(engine)
+        drain = ""
+        if mode == "batched":
+            # The app's own writer, pointed at this database
+            entry_log_writer.session_factory = Session
+            entry_log_writer.start()
+        elapsed, latencies, admitted = scan_all(Session, codes, args.gates)
+        if mode == "batched":
+            started = time.perf_counter()
+            entry_log_writer.stop()
+            drain = f"  (queue drained {(time.perf_counter() - started) * 1000:.0f} ms after the last scan)"
+        db = Session()
+        logged = db.query(EntryLog).count()
+        db.close()
+        engine.dispose()
+        cuts = statistics.quantiles(latencies, n=100) if len(latencies) >= 2 else [0.0] * 99
+        print(f"{mode:<10} {len(latencies) / elapsed:>9,.0f} {cuts[49] * 1000:>6.2f} ms {cuts[98] * 1000:>6.2f} ms {logged:>8}{drain}")
+        ok = ok and logged == args.tickets and admitted == args.tickets
+    print(f"  [{'ok' if ok else 'FAIL'}] every scan admitted and logged")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
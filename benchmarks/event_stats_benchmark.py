@@ -0,0 +1,102 @@
+"""
+Organizer summary from counters, and what reconciling them costs.
+
+On the seed_catalog dataset (half of every event's seats sold, one
+confirmed order per sold seat) the booking summary is computed the old way,
+three aggregate queries over seats and orders, and by view_booking_summary,
+which reads one event_sales_stats row; the two must agree. A few events'
+counters are then bumped behind the app's back and the reconciler runs
+three times: reporting, which must find exactly those events, repairing,
+and reporting again, which must find nothing.
+
+    python -m benchmarks.event_stats_benchmark [--events 20] [--seats-per-event 50000]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from sqlalchemy import func, update
+
+from backend.event_stats import EventStatsReconciler
+from backend.routers.organizer import view_booking_summary
+from database.models import Event, EventSalesStats, Order, Seat, User
+
+from .seeding import seed_catalog, sessions, temp_database
+
+
+def timed(fn, repeat: int):
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return samples, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--seats-per-event", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20, help="summary reads timed per event")
+    parser.add_argument("--drifted", type=int, default=5, help="events whose counters are bumped before reconciling")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    if args.events < 1 or args.seats_per_event < 2 or not 0 < args.drifted <= args.events:
+        parser.error("need events, at least two seats per event and 1..events drifted events")
+
+    engine = temp_database("stats.db")
+    seed_catalog(engine, args.events, args.seats_per_event)
+    Session = sessions(engine)
+    db = Session()
+
+    def three_queries(event_id):
+        # view_booking_summary before the counters
+        event = db.query(Event).filter(Event.id == event_id).first()
+        booked_count = db.query(Seat).filter(Seat.event_id == event_id, Seat.status == "booked").count()
+        total_seats = db.query(Seat).filter(Seat.event_id == event_id).count()
+        revenue = db.query(func.sum(Order.total_amount)).filter(Order.event_id == event_id, Order.order_status == "confirmed").scalar() or 0
+        return {"event_name": event.name, "total_seats": total_seats, "booked_seats": booked_count, "revenue": revenue}
+
+    before, after, mismatched = [], [], []
+    for event_id in range(1, args.events + 1):
+        organizer = db.get(User, db.get(Event, event_id).organizer_id)
+        samples, old = timed(lambda: three_queries(event_id), args.repeat)
+        before.extend(samples)
+        samples, new = timed(lambda: view_booking_summary(event_id, db, organizer), args.repeat)
+        after.extend(samples)
+        if any(new[key] != value for key, value in old.items()):
+            mismatched.append(event_id)
+    db.close()
+
+    print(f"{args.events} events x {args.seats_per_event:,} seats, half sold")
+    print(f"{'organizer summary':<22} {'p50':>9} {'p99':>9}")
+    for name, samples in (("three aggregates", before), ("counter row", after)):
+        cuts = statistics.quantiles(samples, n=100)
+        print(f"{name:<22} {cuts[49] * 1000:>6.2f} ms {cuts[98] * 1000:>6.2f} ms")
+
+    drifted = sorted(random.Random(args.seed).sample(range(1, args.events + 1), args.drifted))
+    with engine.begin() as conn:
+        conn.execute(update(EventSalesStats).where(EventSalesStats.event_id.in_(drifted))
+                     .values(seats_sold=EventSalesStats.seats_sold + 1))
+    reconciler = EventStatsReconciler(session_factory=Session)
+    reports = {}
+    for name, repair in (("report only", False), ("repair", True), ("after repair", False)):
+        reports[name] = reconciler.reconcile_once(repair=repair)
+        print(f"reconcile, {name:<13} {reports[name]['duration_seconds']:>6.2f} s, "
+              f"{reports[name]['drifted_events']} of {reports[name]['checked_events']} events drifted")
+    engine.dispose()
+
+    checks = {
+        "summary matches the three aggregates for every event": not mismatched,
+        f"reconciler finds exactly the {args.drifted} bumped events": [d["event_id"] for d in reports["report only"]["drift"]] == drifted,
+        "no drift left after repairing": reports["after repair"]["drifted_events"] == 0,
+    }
+    for name, ok in checks.items():
+        print(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
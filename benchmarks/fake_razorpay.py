@@ -0,0 +1,137 @@
+"""
+Local stand-in for the Razorpay orders API.
+
+Serves just enough of https://api.razorpay.com/v1 for the booking flow, with
+configurable latency and failure rate, so the gateway client's timeouts,
+retries and circuit breaker can be exercised without network access:
+
+    python -m benchmarks.fake_razorpay [--port 9100] [--latency 2] [--fail-rate 0.1]
+    RAZORPAY_API_URL=http://127.0.0.1:9100/v1 uvicorn backend.main:app
+
+POST /v1/orders/{id}/pay completes a checkout and returns the fields the
+Razorpay popup would hand to the frontend, signed with RAZORPAY_KEY_SECRET.
+With --webhook-url it also delivers a signed payment.captured webhook there,
+like Razorpay does:
+
+    python -m benchmarks.fake_razorpay --webhook-url http://127.0.0.1:8000/payments/razorpay/webhook
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import secrets
+import time
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from backend.payment_utils import RAZORPAY_KEY_SECRET, RAZORPAY_WEBHOOK_SECRET
+
+
+def webhook_request(payment, webhook_secret: str = RAZORPAY_WEBHOOK_SECRET):
+    """Body and headers of a payment.captured webhook for `payment`, signed like Razorpay signs them."""
+    body = json.dumps({
+        "entity": "event",
+        "account_id": "acc_fake",
+        "event": "payment.captured",
+        "contains": ["payment"],
+        "payload": {"payment": {"entity": payment}},
+        "created_at": int(time.time()),
+    }).encode()
+    headers = {
+        "Content-Type": "application/json",
+        "X-Razorpay-Event-Id": f"evt_{secrets.token_hex(7)}",
+        "X-Razorpay-Signature": hmac.new(webhook_secret.encode(), body, hashlib.sha256).hexdigest(),
+    }
+    return body, headers
+
+
+def create_app(latency: float = 0.0, fail_rate: float = 0.0, key_secret: str = RAZORPAY_KEY_SECRET,
+               webhook_url: Optional[str] = None, webhook_secret: str = RAZORPAY_WEBHOOK_SECRET) -> FastAPI:
+    app = FastAPI(title="Fake Razorpay")
+    orders = {}
+    payments = {}
+    deliveries = set()
+
+    async def deliver_webhook(payment):
+        body, headers = webhook_request(payment, webhook_secret)
+        async with httpx.AsyncClient(timeout=10) as client:
+            for attempt in range(3):
+                try:
+                    if (await client.post(webhook_url, content=body, headers=headers)).is_success:
+                        return
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(2 ** attempt)
+
+    async def simulate_gateway():
+        if latency:
+            await asyncio.sleep(latency)
+        if fail_rate and random.random() < fail_rate:
+            raise HTTPException(status_code=503, detail="Simulated gateway failure")
+
+    @app.post("/v1/orders")
+    async def create_order(data: dict):
+        await simulate_gateway()
+        order = {
+            "id": f"order_{secrets.token_hex(7)}",
+            "entity": "order",
+            "amount": data["amount"],
+            "amount_paid": 0,
+            "amount_due": data["amount"],
+            "currency": data.get("currency", "INR"),
+            "receipt": data.get("receipt"),
+            "status": "created",
+            "attempts": 0,
+            "created_at": int(time.time()),
+        }
+        orders[order["id"]] = order
+        return order
+
+    @app.post("/v1/orders/{order_id}/pay")
+    async def pay_order(order_id: str):
+        order = orders.get(order_id)
+        if order is None:
+            raise HTTPException(status_code=404, detail="Order not found")
+        payment_id = f"pay_{secrets.token_hex(7)}"
+        order.update(status="paid", amount_paid=order["amount"], amount_due=0, attempts=order["attempts"] + 1)
+        payment = {"id": payment_id, "entity": "payment", "amount": order["amount"], "currency": order["currency"],
+                   "status": "captured", "order_id": order_id, "method": "card", "captured": True}
+        payments[payment_id] = payment
+        if webhook_url:
+            task = asyncio.create_task(deliver_webhook(payment))
+            deliveries.add(task)
+            task.add_done_callback(deliveries.discard)
+        signature = hmac.new(key_secret.encode(), f"{order_id}|{payment_id}".encode(), hashlib.sha256).hexdigest()
+        return {"razorpay_order_id": order_id, "razorpay_payment_id": payment_id, "razorpay_signature": signature}
+
+    @app.get("/v1/payments/{payment_id}")
+    async def fetch_payment(payment_id: str):
+        await simulate_gateway()
+        payment = payments.get(payment_id)
+        if payment is None:
+            raise HTTPException(status_code=404, detail="Payment not found")
+        return payment
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every API call")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of API calls answered with 503")
+    parser.add_argument("--webhook-url", help="where to deliver payment.captured webhooks")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    uvicorn.run(create_app(args.latency, args.fail_rate, webhook_url=args.webhook_url), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Offline gates at a sold-out final.
+
+Every gate scans its share of the crowd against the exported manifest with
+no database access. Some attendees hand their ticket over the fence to a
+second gate, some rescan at the same one, some tickets are refunded before
+or after the export and some codes are forged. The gates then upload their
+scan logs at once, and the ticket states that result must match what
+actually happened at the gates.
+
+    python -m benchmarks.gate_simulation [--gates 20] [--attendees 50000]
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from backend.gate_manifest import MANIFEST_PUBLIC_KEY, GateScanner, apply_gate_scans, build_manifest
+from backend.ticket_codes import make_ticket_code
+from database.models import EntryLog, Ticket, TicketStatus
+
+from .seeding import ENTRY_MANAGER_ID, SOLD_OUT_EVENT_ID, seed_sold_out_event, sessions, temp_database
+
+
+def cancel_tickets(Session, ticket_ids):
+    db = Session()
+    try:
+        db.execute(update(Ticket).where(Ticket.id.in_(ticket_ids)).values(status=TicketStatus.CANCELLED))
+        db.commit()
+    finally:
+        db.close()
+
+
+def plan_arrivals(rng, attendees: int, gates: int, refunded_before):
+    """Returns per-gate scan queues of (ticket_code, ticket_id or None, scanned_at) and the expected outcome."""
+    queues = [[] for _ in range(gates)]
+    start = datetime.now()
+    passback, rescans = set(), 0
+    for ticket_id in range(1, attendees + 1):
+        code = make_ticket_code(ticket_id, SOLD_OUT_EVENT_ID, ticket_id)
+        gate = rng.randrange(gates)
+        at = start + timedelta(seconds=rng.uniform(0, 3600))
+        queues[gate].append((code, ticket_id, at))
+        roll = rng.random()
+        if roll < 0.02 and ticket_id not in refunded_before:
+            # Hands the ticket back over the fence to someone at another gate
+            other = (gate + rng.randrange(1, gates)) % gates
+            queues[other].append((code, ticket_id, at + timedelta(seconds=rng.uniform(1, 600))))
+            passback.add(ticket_id)
+        elif roll < 0.03:
+            queues[gate].append((code, ticket_id, at + timedelta(seconds=5)))
+            rescans += 1
+    forged = max(attendees // 100, 1)
+    for n in range(forged):
+        code = make_ticket_code(attendees + 1 + n, SOLD_OUT_EVENT_ID, 1)[:-4] + "AAAA"
+        queues[rng.randrange(gates)].append((code, None, start + timedelta(seconds=rng.uniform(0, 3600))))
+    for queue in queues:
+        queue.sort(key=lambda scan: scan[2])
+    return queues, passback, rescans, forged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gates", type=int, default=20)
+    parser.add_argument("--attendees", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    if args.gates < 2:
+        parser.error("--gates must be at least 2")
+
+    rng = random.Random(args.seed)
+    engine = temp_database("gates.db")
+    seed_sold_out_event(engine, args.attendees)
+    Session = sessions(engine)
+
+    ticket_ids = range(1, args.attendees + 1)
+    refunded_before = set(rng.sample(ticket_ids, max(args.attendees // 100, 1)))
+    cancel_tickets(Session, refunded_before)
+
+    db = Session()
+    started = time.perf_counter()
+    manifest = build_manifest(db, SOLD_OUT_EVENT_ID)
+    export_seconds = time.perf_counter() - started
+    db.close()
+
+    candidates = [t for t in ticket_ids if t not in refunded_before]
+    refunded_after = set(rng.sample(candidates, max(args.attendees // 500, 1)))
+    cancel_tickets(Session, refunded_after)
+
+    queues, passback, rescans, forged = plan_arrivals(rng, args.attendees, args.gates, refunded_before)
+    # Gates get only the public key; a manifest altered after signing must not load
+    scanners = [GateScanner(manifest, MANIFEST_PUBLIC_KEY) for _ in range(args.gates)]
+    try:
+        GateScanner(dict(manifest, entries=manifest["entries"][::-1]), MANIFEST_PUBLIC_KEY)
+        tampered_refused = False
+    except ValueError:
+        tampered_refused = True
+
+    def run_gate(scanner, queue):
+        for code, _, at in queue:
+            scanner.scan(code, at)
+
+    threads = [threading.Thread(target=run_gate, args=(s, q)) for s, q in zip(scanners, queues)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    scan_seconds = time.perf_counter() - started
+    total_scans = sum(len(q) for q in queues)
+
+    results, errors = [], []
+
+    def sync_gate(scanner):
+        db = Session()
+        try:
+            results.append(apply_gate_scans(db, SOLD_OUT_EVENT_ID, scanner.drain_scans(), ENTRY_MANAGER_ID))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=sync_gate, args=(s,)) for s in scanners]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    sync_seconds = time.perf_counter() - started
+
+    db = Session()
+    used = {t for (t,) in db.query(Ticket.id).filter(Ticket.status == TicketStatus.USED)}
+    logged = db.query(EntryLog).count()
+    db.close()
+
+    conflicts = [c for r in results for c in r["conflicts"]]
+    expected_used = set(ticket_ids) - refunded_before - refunded_after
+    checks = {
+        "tampered manifest refused": tampered_refused,
+        "all gates synced": not errors,
+        "every valid attendee admitted once": used == expected_used,
+        "no refunded ticket admitted": not used & (refunded_before | refunded_after),
+        "pass-backs reported as conflicts": {c["ticket_id"] for c in conflicts if c["reason"] == "Ticket already used"} == passback - refunded_after,
+        "late refunds reported as conflicts": {c["ticket_id"] for c in conflicts if c["reason"] == "Ticket cancelled"} == refunded_after,
+        "every scan logged": logged == total_scans,
+    }
+
+    print(f"Manifest: {manifest['ticket_count']} tickets, {len(manifest['entries']) / 1024:.0f} KiB, exported in {export_seconds * 1000:.0f} ms")
+    print(f"Offline scans: {total_scans} across {args.gates} gates in {scan_seconds:.2f}s ({total_scans / scan_seconds:,.0f} scans/s)")
+    print(f"  rejected locally: {sum(r['failed'] for r in results)} ({len(refunded_before)} refunded before export, {rescans} rescans, {forged} forged)")
+    print(f"Sync: {len(results)} gates in {sync_seconds:.2f}s, {len(used)} tickets used, {len(conflicts)} conflicts")
+    for name, ok in checks.items():
+        print(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    for e in errors:
+        print(f"  sync error: {e}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Does a slow or failing payment gateway hold up unrelated requests?
+
+Checkouts (POST /customer/orders/{id}/create-razorpay-order) start at a
+fixed rate, whether or not earlier ones have finished, against the fake
+Razorpay server, while other clients poll seat deltas. Poll throughput and
+p99 should stay flat whether the gateway answers at once, takes 2s a call
+(dozens of checkouts waiting on it at any time) or fails every call (the
+circuit breaker then answers checkouts with 503 without calling it).
+
+    python -m benchmarks.gateway_benchmark [--seconds 10] [--checkout-rate 20] [--poll-clients 8]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from collections import Counter
+
+import httpx
+from sqlalchemy import insert, text
+
+from database.models import Order, OrderStatus
+
+from .app_server import bearer, free_port, start_fake_gateway, start_server, stop
+from .seeding import UPCOMING_EVENT_ID, customer_email, seed_catalog, temp_database
+
+EVENTS = 20
+SEATS_PER_EVENT = 100
+PENDING_ORDERS = 20000
+FIRST_PENDING_ORDER_ID = 1_000_000
+# (name, fake gateway options)
+SCENARIOS = (
+    ("gateway instant", ["--latency", "0"]),
+    ("gateway +2s latency", ["--latency", "2"]),
+    ("gateway failing", ["--fail-rate", "1"]),
+)
+
+
+def add_pending_orders(engine):
+    """Unpaid orders for the checkout clients, spread over the seeded customers; returns (order_id, user_id) pairs."""
+    with engine.begin() as conn:
+        customers = [user_id for (user_id,) in conn.execute(text("SELECT id FROM users WHERE role = 'customer'"))]
+        orders = [(FIRST_PENDING_ORDER_ID + n, customers[n % len(customers)]) for n in range(PENDING_ORDERS)]
+        conn.execute(insert(Order), [
+            {"id": order_id, "user_id": user_id, "event_id": UPCOMING_EVENT_ID, "total_amount": 100.0, "payment_mode": "simulation",
+             "order_status": OrderStatus.PENDING.value, "seat_count": 1}
+            for order_id, user_id in orders
+        ])
+    return orders
+
+
+async def run_scenario(base_url: str, seconds: float, checkout_rate: float, poll_clients: int, orders):
+    done = asyncio.Event()
+    poll_latencies, checkout_latencies, outcomes = [], [], Counter()
+    limits = httpx.Limits(max_connections=None)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def checkout(order_id, user_id):
+            headers = bearer(customer_email(user_id), user_id, "customer")
+            started = time.perf_counter()
+            try:
+                response = await client.post(f"/customer/orders/{order_id}/create-razorpay-order", headers=headers)
+            except httpx.TransportError as e:
+                outcomes[type(e).__name__] += 1
+                return
+            outcomes[response.status_code] += 1
+            checkout_latencies.append(time.perf_counter() - started)
+
+        async def start_checkouts():
+            checkouts = []
+            while not done.is_set():
+                checkouts.append(asyncio.create_task(checkout(*next(orders))))
+                await asyncio.sleep(1 / checkout_rate)
+            await asyncio.gather(*checkouts)
+
+        async def poll():
+            while not done.is_set():
+                started = time.perf_counter()
+                try:
+                    response = await client.get(f"/customer/events/{UPCOMING_EVENT_ID}/seats?since=0")
+                except httpx.TransportError as e:
+                    outcomes[f"poll {type(e).__name__}"] += 1
+                    continue
+                if response.status_code != 200:
+                    outcomes[f"poll {response.status_code}"] += 1
+                    continue
+                poll_latencies.append(time.perf_counter() - started)
+
+        tasks = [asyncio.create_task(start_checkouts())] + [asyncio.create_task(poll()) for _ in range(poll_clients)]
+        await asyncio.sleep(seconds)
+        done.set()
+        await asyncio.gather(*tasks)
+    return poll_latencies, checkout_latencies, outcomes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--checkout-rate", type=float, default=20, help="checkouts started per second")
+    parser.add_argument("--poll-clients", type=int, default=8)
+    args = parser.parse_args(argv)
+    if args.seconds <= 0 or args.checkout_rate <= 0 or args.poll_clients < 1:
+        parser.error("--seconds, --checkout-rate and --poll-clients must be positive")
+
+    engine = temp_database("gateway.db")
+    seed_catalog(engine, EVENTS, SEATS_PER_EVENT)
+    orders = iter(add_pending_orders(engine))
+    database_url = str(engine.url)
+    engine.dispose()
+
+    print(f"{args.checkout_rate:g} checkouts/s and {args.poll_clients} pollers for {args.seconds:g}s per scenario")
+    print(f"{'scenario':<22} {'polls/s':>8} {'poll p99':>10} {'checkouts/s':>12} {'checkout p50':>13}   outcomes")
+    ok = True
+    for name, gateway_options in SCENARIOS:
+        gateway_port, app_port = free_port(), free_port()
+        gateway = start_fake_gateway(gateway_port, *gateway_options)
+        server = None
+        try:
+            server = start_server(database_url, app_port, RAZORPAY_API_URL=f"http://127.0.0.1:{gateway_port}/v1")
+            poll_latencies, checkout_latencies, outcomes = asyncio.run(
+                run_scenario(f"http://127.0.0.1:{app_port}", args.seconds, args.checkout_rate, args.poll_clients, orders))
+        finally:
+            stop(server, gateway)
+        poll_cuts = statistics.quantiles(poll_latencies, n=100) if len(poll_latencies) >= 2 else [0.0] * 99
+        checkout_p50 = statistics.median(checkout_latencies) if checkout_latencies else 0.0
+        print(f"{name:<22} {len(poll_latencies) / args.seconds:>8,.0f} {poll_cuts[98] * 1000:>7.1f} ms "
+              f"{len(checkout_latencies) / args.seconds:>12,.1f} {checkout_p50 * 1000:>10.0f} ms   "
+              + ", ".join(f"{outcome}: {n}" for outcome, n in sorted(outcomes.items(), key=str)))
+        ok = ok and not any(str(outcome).startswith("poll") for outcome in outcomes)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+A seat hold that expires between checkout and payment.
+
+Each case places an order, links a Razorpay order to it and pushes its
+hold past held_until, as a slow payment popup would. The payment then
+arrives through POST .../verify-razorpay-payment or through the webhook
+outbox, before or after the hold sweeper has run. Both paths must give the
+same answer: a hold the sweeper has not released yet is still the
+customer's, and once the sweeper has released it (and cancelled the order)
+the payment is refused either way.
+
+    python -m benchmarks.hold_expiry_check
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from backend.event_stats import EventStatsReconciler
+from backend.hold_sweeper import HoldSweeper
+from backend.idempotency import IdempotencyStore
+from backend.payment_outbox import PaymentEventProcessor, record_payment_event
+from backend.routers.customer import OrderCreate, PaymentVerification, attach_gateway_order, confirm_razorpay_payment, create_order
+from database.models import Order, OrderStatus, Seat
+
+from .seeding import FIRST_CUSTOMER_ID, FLASH_SALE_EVENT_ID, seed_flash_sale, sessions, temp_database
+
+SEATS = 4
+# (path, whether the sweeper runs before the payment arrives)
+CASES = (("verify", False), ("webhook", False), ("verify", True), ("webhook", True))
+
+
+def pay_after_expiry(path: str, swept: bool):
+    """
+    Runs one case on its own database. Returns the order's final status, the
+    seats booked for it, the seats it asked for and how many events' sales
+    counters drifted.
+    """
+    engine = temp_database(f"{path}-{'swept' if swept else 'held'}.db")
+    seed_flash_sale(engine, SEATS, 1)
+    Session = sessions(engine)
+    user_id, seat_ids = FIRST_CUSTOMER_ID, [1, 2]
+    db = Session()
+    try:
+        order_data = OrderCreate(event_id=FLASH_SALE_EVENT_ID, seat_ids=seat_ids)
+        placed = create_order(db, order_data, user_id)
+        order_id, amount = placed["order_id"], round(placed["total_amount"] * 100)
+        gateway_order_id = attach_gateway_order(db, order_id, f"order_expiry{order_id}")
+
+        # The customer is still in the payment popup when the hold runs out
+        with engine.begin() as conn:
+            conn.execute(update(Seat).where(Seat.order_id == order_id).values(held_until=datetime.now() - timedelta(seconds=1)))
+        if swept:
+            HoldSweeper(session_factory=Session).sweep_once()
+
+        payment = {"id": f"pay_expiry{order_id}", "order_id": gateway_order_id, "amount": amount, "status": "captured"}
+        if path == "verify":
+            payment_data = PaymentVerification(razorpay_order_id=gateway_order_id, razorpay_payment_id=payment["id"],
+                                               razorpay_signature="-", seat_ids=seat_ids)
+            try:
+                IdempotencyStore(purge_interval=0).run(db, user_id, None, "verify", payment_data, confirm_razorpay_payment,
+                                                       order_id, payment_data, payment, user_id)
+            except HTTPException:
+                db.rollback()
+        else:
+            record_payment_event(db, "payment.captured", payment, "{}")
+            PaymentEventProcessor(session_factory=Session).process_once()
+
+        db.expire_all()
+        status = db.get(Order, order_id).order_status
+        booked = sorted(seat_id for (seat_id,) in db.query(Seat.id).filter(Seat.order_id == order_id, Seat.status == "booked"))
+    finally:
+        db.close()
+    drift = EventStatsReconciler(session_factory=Session, repair=False).reconcile_once(event_ids=[FLASH_SALE_EVENT_ID])
+    engine.dispose()
+    return status, booked, seat_ids, drift["drifted_events"]
+
+
+def main(argv=None):
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args(argv)
+
+    outcomes = {}
+    print(f"{'payment via':<12} {'sweeper ran':<12} {'order':<11} booked seats")
+    for path, swept in CASES:
+        status, booked, requested, drifted = pay_after_expiry(path, swept)
+        outcomes[path, swept] = (status, booked, requested, drifted)
+        print(f"{path:<12} {'yes' if swept else 'no':<12} {status:<11} {booked or '-'}")
+
+    checks = {
+        "verify books an expired hold the sweeper has not released":
+            outcomes["verify", False][0] == OrderStatus.CONFIRMED and outcomes["verify", False][1] == outcomes["verify", False][2],
+        "the webhook books an expired hold the sweeper has not released":
+            outcomes["webhook", False][0] == OrderStatus.CONFIRMED and outcomes["webhook", False][1] == outcomes["webhook", False][2],
+        "verify refuses a hold the sweeper released":
+            outcomes["verify", True][0] != OrderStatus.CONFIRMED and not outcomes["verify", True][1],
+        "the webhook refuses a hold the sweeper released":
+            outcomes["webhook", True][0] != OrderStatus.CONFIRMED and not outcomes["webhook", True][1],
+        "sales counters match the seats": not any(drifted for *_, drifted in outcomes.values()),
+    }
+    for name, ok in checks.items():
+        print(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Login storm versus everyone else.
+
+A probe polls seat deltas every 20 ms, first on a quiet server and then
+while many clients hammer POST /token with valid credentials, backing off
+on 503 as Retry-After says. Password checks run on the bounded hashing
+pool, so the probe's p99 should barely move, and logins past the pool's
+queue should be shed with 503 rather than pile up.
+
+    python -m benchmarks.login_storm [--storm-clients 64] [--seconds 15]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from collections import Counter
+
+import httpx
+from sqlalchemy import text
+
+from backend.auth import get_password_hash
+
+from .app_server import free_port, start_server, stop
+from .seeding import UPCOMING_EVENT_ID, seed_catalog, temp_database
+
+EVENTS = 20
+SEATS_PER_EVENT = 100
+PASSWORD = "storm-password"
+
+
+async def probe(client, path: str, interval: float, done: asyncio.Event):
+    latencies, failures = [], 0
+    while not done.is_set():
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures += 1
+        except httpx.TransportError:
+            failures += 1
+        await asyncio.sleep(interval)
+    return latencies, failures
+
+
+async def log_in_repeatedly(client, email: str, done: asyncio.Event, outcomes: Counter):
+    while not done.is_set():
+        try:
+            response = await client.post("/token", data={"username": email, "password": PASSWORD})
+        except httpx.TransportError as e:
+            outcomes[type(e).__name__] += 1
+            continue
+        outcomes[response.status_code] += 1
+        if response.status_code == 503:
+            # Well-behaved clients back off as told
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+
+
+async def run_phase(base_url: str, seconds: float, storm_clients: int, emails):
+    done, outcomes = asyncio.Event(), Counter()
+    limits = httpx.Limits(max_connections=storm_clients + 1)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client, \
+            httpx.AsyncClient(base_url=base_url, timeout=60) as probe_client:
+        stormers = [asyncio.create_task(log_in_repeatedly(client, emails[n % len(emails)], done, outcomes))
+                    for n in range(storm_clients)]
+        prober = asyncio.create_task(probe(probe_client, f"/customer/events/{UPCOMING_EVENT_ID}/seats?since=0", 0.02, done))
+        await asyncio.sleep(seconds)
+        done.set()
+        latencies, failures = await prober
+        await asyncio.gather(*stormers)
+    return latencies, failures, outcomes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--storm-clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=15)
+    args = parser.parse_args(argv)
+    if args.storm_clients < 1 or args.seconds <= 0:
+        parser.error("--storm-clients and --seconds must be positive")
+
+    engine = temp_database("storm.db")
+    seed_catalog(engine, EVENTS, SEATS_PER_EVENT)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE users SET password = :password"), {"password": get_password_hash(PASSWORD)})
+        emails = [email for (email,) in conn.execute(text("SELECT email FROM users WHERE role = 'customer'"))]
+    database_url = str(engine.url)
+    engine.dispose()
+
+    port = free_port()
+    server = start_server(database_url, port)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        asyncio.run(run_phase(base_url, 2, 1, emails))  # warm-up: starts the hashing workers
+        phases = {
+            "quiet": asyncio.run(run_phase(base_url, args.seconds, 0, emails)),
+            f"{args.storm_clients} clients logging in": asyncio.run(run_phase(base_url, args.seconds, args.storm_clients, emails)),
+        }
+    finally:
+        stop(server)
+
+    print(f"Probe: GET seat deltas every 20 ms for {args.seconds:g}s per phase")
+    print(f"{'phase':<28} {'probes':>7} {'p50':>9} {'p99':>9} {'failed':>7}   logins")
+    ok = True
+    for name, (latencies, failures, outcomes) in phases.items():
+        cuts = statistics.quantiles(latencies, n=100) if len(latencies) >= 2 else [0.0] * 99
+        logins = ", ".join(f"{status}: {n}" for status, n in sorted(outcomes.items(), key=str)) or "-"
+        print(f"{name:<28} {len(latencies):>7} {cuts[49] * 1000:>6.1f} ms {cuts[98] * 1000:>6.1f} ms {failures:>7}   {logins}")
+        ok = ok and failures == 0 and set(outcomes) <= {200, 503}
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
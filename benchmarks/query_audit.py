@@ -0,0 +1,254 @@
+"""
+Query plan audit for the router hot paths.
+
+Calls the hot-path router functions against the seed_catalog dataset and
+runs EXPLAIN QUERY PLAN on every statement they emit. A full table scan
+fails the audit, and so does place_order running more statements than its
+budget, or more for a returning customer than for a first-time buyer
+(an N+1 regression). It also counts what authenticating a request costs:
+a warm token should need no query at all, and neither should a token whose
+role claim the route refuses.
+
+    python -m benchmarks.query_audit [--events 200] [--seats-per-event 500]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from backend.auth import admin_only, customer_only, get_user_by_email
+from backend.event_catalog import CatalogQuery, decode_cursor, list_catalog
+from backend.event_search import search_events
+from backend.event_stats import EventStatsReconciler
+from backend.gate_manifest import apply_gate_scans, build_manifest
+from backend.hold_sweeper import HoldSweeper
+from backend.idempotency import IdempotencyStore
+from backend.payment_outbox import PaymentEventProcessor, record_payment_event
+from backend.principal_cache import principal_cache
+from backend.routers import admin, customer, entry, organizer
+from backend.seat_map import SeatMapRegistry
+from backend.seat_reservation import seat_changes_since
+from database.db import run_db
+from database.models import User
+
+from .seeding import (
+    ENTRY_MANAGER_ID, FIRST_CUSTOMER_ID, FIRST_ORGANIZER_ID, ORGANIZERS, customer_email, seed_catalog, sessions, temp_database,
+)
+
+# Statements one place_order call may run, including its commit's writes
+PLACE_ORDER_STATEMENT_BUDGET = 8
+# Authenticated requests made with one token when counting the auth dependency's statements
+AUTH_REQUESTS = 20
+
+
+def is_full_scan(detail: str) -> bool:
+    # "SCAN seats" is a table scan; "SCAN seats USING [COVERING] INDEX ..." walks an index,
+    # and "SCAN event_search VIRTUAL TABLE INDEX ..." is a full-text lookup
+    return (detail.startswith("SCAN ") and " USING " not in detail and "CONSTANT ROW" not in detail
+            and " VIRTUAL TABLE INDEX " not in detail)
+
+
+class QueryPlanRecorder:
+    """Explains every SELECT/UPDATE/DELETE run on a SQLite engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = 0
+        self.full_scans = []
+
+    def _explain(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            return
+        self.statements += 1
+        plan = cursor.connection.execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        # Scanning a subquery's result is bounded by the subquery, which is checked on its own
+        subqueries = {row[-1].split(" ", 1)[1] for row in plan if row[-1].startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+        for row in plan:
+            if is_full_scan(row[-1]) and row[-1][len("SCAN "):] not in subqueries:
+                self.full_scans.append((row[-1], " ".join(statement.split())))
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._explain)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._explain)
+
+    def assert_no_full_scans(self):
+        if self.full_scans:
+            report = "\n".join(f"  {detail}\n    {statement}" for detail, statement in self.full_scans)
+            raise AssertionError(f"{len(self.full_scans)} full table scan(s):\n{report}")
+
+
+class StatementCounter:
+    """Counts the statements run on an engine while active; an executemany counts once."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = 0
+
+    def _count(self, *args):
+        self.statements += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+
+def exercise_hot_paths(Session, events: int, seats_per_event: int):
+    event_id = 10  # upcoming, so place_order accepts it
+    db = Session()
+    try:
+        organizer_user = db.get(User, FIRST_ORGANIZER_ID + event_id % ORGANIZERS)
+        entry_user = db.get(User, ENTRY_MANAGER_ID)
+        customer_user = db.get(User, FIRST_CUSTOMER_ID + 1)
+
+        admin.get_organizers_with_profiles(None, db, None)
+        admin.get_organizers_with_profiles([10, 11, 12], db, None)
+        # Pages of one, so there is a next page with as few as two upcoming events (--events 20)
+        first_page = list_catalog(db, CatalogQuery(limit=1))
+        list_catalog(db, CatalogQuery(cursor=decode_cursor(first_page["next_cursor"]), limit=1))
+        list_catalog(db, CatalogQuery(category="Music", date_from=datetime.now()))
+        list_catalog(db, CatalogQuery(city="City 1", min_price=100))
+        search_events(db, "event 1")
+        search_events(db, "musik venue")  # misspelt, so the typo correction runs
+        registry = SeatMapRegistry()
+        registry.get(db, event_id)
+        registry.get(db, event_id)  # a hit revalidates against the event's inventory_version
+        seat_changes_since(db, event_id, 0)
+        free_seat = (event_id - 1) * seats_per_event + 2
+        order_data = customer.OrderCreate(event_id=event_id, seat_ids=[free_seat])
+        store = IdempotencyStore(purge_interval=0)
+        for _ in range(2):
+            placed = store.run(db, customer_user.id, "audit-key", "POST /customer/orders", order_data, customer.create_order, order_data, customer_user.id)
+        customer.attach_gateway_order(db, placed["order_id"], "order_audit")
+        customer.view_tickets(db, customer_user)
+        organizer.get_my_events(db, organizer_user)
+        organizer.view_booking_summary(event_id, db, organizer_user)
+        entry.check_ticket(db, "TICK-AUDIT1", entry_user.id)
+        entry.use_ticket(db, 1)
+        entry.admit_ticket(db, "TICK-AUDIT3", entry_user.id, 1)
+        build_manifest(db, event_id)
+        first_ticket = (event_id - 1) * ((seats_per_event + 1) // 2) + 1
+        apply_gate_scans(db, event_id, [{"ticket_id": first_ticket, "scanned_at": datetime.now(), "result": "success"}], entry_user.id)
+        HoldSweeper(session_factory=Session).sweep_once()
+        record_payment_event(db, "payment.captured", {"id": "pay_audit", "order_id": "order_audit", "amount": 10000}, "{}")
+        PaymentEventProcessor(session_factory=Session).process_once()
+        EventStatsReconciler(session_factory=Session).reconcile_once(event_ids=[event_id, event_id + 1])
+    finally:
+        db.close()
+
+
+def count_place_order_statements(engine, Session, seats_per_event: int):
+    """
+    Statements run by one place_order for a first-time buyer and for a
+    customer with three confirmed orders for the same event. The limit check
+    reads a maintained counter, so the two must be equal.
+    """
+    event_id = 20  # upcoming and untouched by exercise_hot_paths
+    free_seats = iter(range((event_id - 1) * seats_per_event + 2, event_id * seats_per_event + 1, 2))
+    store = IdempotencyStore(purge_interval=0)
+    counts = {}
+    db = Session()
+    try:
+        for label, user_id, history in (("first order", 150, 0), ("after 3 confirmed orders", 151, 3)):
+            for _ in range(history):
+                seat_id = next(free_seats)
+                order_data = customer.OrderCreate(event_id=event_id, seat_ids=[seat_id])
+                placed = store.run(db, user_id, None, "POST /customer/orders", order_data, customer.create_order, order_data, user_id)
+                payment = customer.PaymentConfirm(seat_ids=[seat_id])
+                store.run(db, user_id, None, "confirm_payment", payment, customer.confirm_simulated_payment, placed["order_id"], payment, user_id)
+            order_data = customer.OrderCreate(event_id=event_id, seat_ids=[next(free_seats)])
+            with StatementCounter(engine) as counter:
+                store.run(db, user_id, None, "POST /customer/orders", order_data, customer.create_order, order_data, user_id)
+            counts[label] = counter.statements
+    finally:
+        db.close()
+    return counts
+
+
+def count_auth_statements(engine, Session):
+    """
+    Statements the auth dependency runs per request, over AUTH_REQUESTS
+    requests with one customer token: loading the user by email on every
+    request, as get_current_user did before the principal cache; customer_only
+    now; and admin_only, which refuses the token from its role claim.
+    """
+    user_id = FIRST_CUSTOMER_ID + 2
+    claims = {"sub": customer_email(user_id), "uid": user_id, "role": "customer", "exp": int(time.time()) + 3600}
+
+    async def load_by_email(db):
+        return await run_db(db, get_user_by_email, claims["sub"])
+
+    async def refused(db):
+        try:
+            await admin_only(claims, db)
+        except HTTPException:
+            pass
+
+    async def per_request(dependency):
+        db = Session()
+        try:
+            with StatementCounter(engine) as counter:
+                for _ in range(AUTH_REQUESTS):
+                    await dependency(db)
+        finally:
+            db.close()
+        return counter.statements / AUTH_REQUESTS
+
+    principal_cache.clear()
+    return {
+        "user loaded every request (before)": asyncio.run(per_request(load_by_email)),
+        "customer_only": asyncio.run(per_request(lambda db: customer_only(claims, db))),
+        "role claim refused": asyncio.run(per_request(refused)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--seats-per-event", type=int, default=500)
+    args = parser.parse_args(argv)
+    if args.events < 20:
+        parser.error("--events must be at least 20")
+
+    engine = temp_database("audit.db")
+    seed_catalog(engine, args.events, args.seats_per_event)
+    Session = sessions(engine)
+
+    with QueryPlanRecorder(engine) as recorder:
+        exercise_hot_paths(Session, args.events, args.seats_per_event)
+        place_order_statements = count_place_order_statements(engine, Session, args.seats_per_event)
+        auth_statements = count_auth_statements(engine, Session)
+
+    print(f"Explained {recorder.statements} statements")
+    try:
+        recorder.assert_no_full_scans()
+    except AssertionError as e:
+        print(e)
+        return 1
+    print("No full table scans on hot paths")
+
+    print("Statements per place_order: " + ", ".join(f"{n} ({label})" for label, n in place_order_statements.items())
+          + f"; budget {PLACE_ORDER_STATEMENT_BUDGET}")
+    if max(place_order_statements.values()) > PLACE_ORDER_STATEMENT_BUDGET or len(set(place_order_statements.values())) > 1:
+        print("place_order statement count regressed")
+        return 1
+
+    print(f"Auth statements per request ({AUTH_REQUESTS} requests, one token): "
+          + ", ".join(f"{label}: {n:g}" for label, n in auth_statements.items()))
+    if auth_statements["customer_only"] >= auth_statements["user loaded every request (before)"] or auth_statements["role claim refused"]:
+        print("auth statement count regressed")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Event search latency and index rebuild time.
+
+Event, venue, city and organizer names come from a generated vocabulary
+with a long tail, as in a real catalog, and the insert triggers keep the
+index up while events are seeded. After a full rebuild, search_events is
+timed for a common word, a rare one (among the 200 least common), two
+words, a three-letter prefix, a one-letter typo and a full event name;
+search_like, the substring fallback for other databases, gets a few of
+each since it scans. Every hit must contain every term, or one of its
+corrections, as a word prefix, checked against the event tables rather
+than the index. A full name must find its event unless a page of others
+match too, and every typo must be corrected.
+
+    python -m benchmarks.search_benchmark [--events 100000] [--queries 200]
+"""
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, insert, text
+
+from backend.event_search import correct_terms, edits1, search_events, search_like, search_terms
+from database.migrations import rebuild_event_search
+from database.models import Event, OrganizerProfile, User, UserRole, Venue
+
+from .seeding import sessions, temp_database
+
+SYLLABLES = ("ka", "lo", "mi", "ra", "ven", "tor", "sa", "bel", "dun", "ri", "mo", "zan", "el", "ca", "tri",
+             "pha", "nor", "lu", "sen", "gra", "do", "vi", "ster", "an", "qui", "ber", "ol", "ma", "ny", "fe")
+VOCABULARY = 5000
+CATEGORIES = ("Music", "Sports", "Comedy", "Theatre", "Conference", "Festival", "Workshop", "Exhibition")
+VENUE_KINDS = ("Arena", "Hall", "Stadium", "Theatre", "Grounds", "Club")
+CITIES = 50
+VENUES = 2000
+ORGANIZERS = 1000
+SEED_BATCH = 50000
+FALLBACK_QUERIES = 10
+RARE_WORDS = 200
+SEARCH_PAGE = 20
+
+_DOCUMENTS_SQL = text("""
+    SELECT e.id, e.name || ' ' || e.category || ' ' || coalesce(v.name, '') || ' ' || coalesce(v.city, '') || ' '
+        || coalesce(p.company_name, u.name, '') AS document
+    FROM events e
+    LEFT JOIN venues v ON v.id = e.venue_id
+    LEFT JOIN organizer_profiles p ON p.user_id = e.organizer_id
+    LEFT JOIN users u ON u.id = e.organizer_id
+    WHERE e.id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+
+def vocabulary(rng):
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))))
+    words = sorted(words)
+    rng.shuffle(words)
+    # Zipf-like: the first words are far more common than the last
+    return words, [1 / (rank + 1) for rank in range(len(words))]
+
+
+def seed(engine, events: int, rng, words, weights):
+    """Returns the seconds spent inserting events, which includes the triggers filling the index."""
+    title = str.capitalize
+    cities = [title(word) for word in words[-CITIES:]]
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": o, "name": f"{title(rng.choice(words))} {title(rng.choice(words))}", "email": f"org{o}@search",
+             "password": "x", "role": UserRole.ORGANIZER.value}
+            for o in range(1, ORGANIZERS + 1)
+        ])
+        conn.execute(insert(OrganizerProfile), [
+            {"user_id": o, "company_name": f"{title(rng.choice(words))} Productions"}
+            for o in range(1, ORGANIZERS + 1) if rng.random() < 0.8
+        ])
+        conn.execute(insert(Venue), [
+            {"id": v, "name": f"{title(rng.choices(words, weights)[0])} {rng.choice(VENUE_KINDS)}", "city": cities[v % CITIES],
+             "total_capacity": 1000, "address": "-"}
+            for v in range(1, VENUES + 1)
+        ])
+    start = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    started = time.perf_counter()
+    for first in range(1, events + 1, SEED_BATCH):
+        with engine.begin() as conn:
+            conn.execute(insert(Event), [
+                {"id": e, "venue_id": rng.randint(1, VENUES), "organizer_id": rng.randint(1, ORGANIZERS),
+                 "name": " ".join(title(word) for word in rng.choices(words, weights, k=rng.randint(2, 4))),
+                 "category": rng.choice(CATEGORIES), "event_date": start + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+                 "ticket_price": 500.0, "max_tickets_per_user": 4, "status": "upcoming", "inventory_version": 0,
+                 "hold_ttl_seconds": 600}
+                for e in range(first, min(first + SEED_BATCH, events + 1))
+            ])
+    return time.perf_counter() - started
+
+
+def plan_queries(db, rng, words, queries: int):
+    """Search strings per kind; typo queries are paired with the word they misspell."""
+    names = [name for (name,) in db.execute(
+        text("SELECT name FROM events WHERE id IN (SELECT abs(random()) % (SELECT max(id) FROM events) + 1 FROM events LIMIT :n)"),
+        {"n": queries})]
+    known = set(words)
+    indexed = [term for (term,) in db.execute(text("SELECT term FROM event_search_vocab ORDER BY doc, term"))]
+    common, rare = words[:20], [term for term in indexed if term in known and len(term) >= 5][:RARE_WORDS]
+    typos = []
+    while len(typos) < queries:
+        word = rng.choice(rare)
+        typo = rng.choice(sorted(edits1(word)))
+        # A typo that is itself a word, or the start of one, is a legitimate search
+        if len(typo) >= 5 and typo.isalpha() and not any(other.startswith(typo) for other in known):
+            typos.append((typo, word))
+    return {
+        "common word": [rng.choice(common) for _ in range(queries)],
+        "rare word": [rng.choice(rare) for _ in range(queries)],
+        "two words": [" ".join(rng.sample(name.split(), 2)) for name in names if len(name.split()) >= 2][:queries],
+        "prefix (3 letters)": [rng.choice(rare)[:3] for _ in range(queries)],
+        "one-letter typo": typos,
+        "full event name": names,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200, help="queries timed per kind")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    if args.events < 1000 or args.queries < FALLBACK_QUERIES:
+        parser.error(f"need at least 1000 events and {FALLBACK_QUERIES} queries")
+
+    rng = random.Random(args.seed)
+    words, weights = vocabulary(rng)
+    engine = temp_database("search.db")
+    insert_seconds = seed(engine, args.events, rng, words, weights)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        rebuild_event_search(conn)
+    rebuild_seconds = time.perf_counter() - started
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    db = sessions(engine)()
+
+    print(f"{args.events:,} upcoming events, {len(words):,} distinct name words")
+    print(f"  seeding: {args.events / insert_seconds:,.0f} events/s with the index kept up by triggers")
+    print(f"  python -m backend.event_search --rebuild: {rebuild_seconds:.1f}s")
+    print(f"{'query':<20} {'p50':>9} {'p99':>9} {'hits':>6} {'fallback p50':>13}")
+    checks = {}
+    for kind, queries in plan_queries(db, rng, words, args.queries).items():
+        latencies, hits, unmatched, missed, crowded, uncorrected, intended_found = [], 0, 0, 0, 0, 0, 0
+        for query in queries:
+            query, intended = query if isinstance(query, tuple) else (query, None)
+            started = time.perf_counter()
+            result = search_events(db, query, SEARCH_PAGE)
+            latencies.append(time.perf_counter() - started)
+            hits += len(result["items"])
+            if intended is not None:
+                uncorrected += result["corrected_query"] is None
+                intended_found += result["corrected_query"] is not None and intended in result["corrected_query"].split()
+            if kind == "full event name" and all(item["name"] != query for item in result["items"]):
+                # Only a miss if the page had room: a name made of common words can be in dozens of events
+                missed += 1
+                crowded += len(result["items"]) == SEARCH_PAGE
+            # Each term must match one of its alternatives: itself, or the corrections searched for it
+            terms = search_terms(query)
+            alternatives = correct_terms(db, terms) if result["corrected_query"] else [[term] for term in terms]
+            if result["items"]:
+                documents = db.execute(_DOCUMENTS_SQL, {"ids": [item["id"] for item in result["items"]]}).all()
+                for _, document in documents:
+                    tokens = re.findall(r"\w+", document.lower())
+                    unmatched += not all(any(token.startswith(term) for token in tokens for term in options)
+                                         for options in alternatives)
+        fallback = []
+        for query in queries[:FALLBACK_QUERIES]:
+            query = query[0] if isinstance(query, tuple) else query
+            started = time.perf_counter()
+            search_like(db, search_terms(query), SEARCH_PAGE)
+            fallback.append(time.perf_counter() - started)
+        cuts = statistics.quantiles(latencies, n=100)
+        print(f"{kind:<20} {cuts[49] * 1000:>6.2f} ms {cuts[98] * 1000:>6.2f} ms {hits / len(queries):>6.1f} "
+              f"{statistics.median(fallback) * 1000:>10.1f} ms")
+        checks[f"{kind}: every hit contains every (corrected) term"] = unmatched == 0
+        if kind == "one-letter typo":
+            # The most common word one edit away wins, which is not always the one misspelled
+            print(f"  corrected to the misspelled word in {intended_found}/{len(queries)} queries")
+            checks[f"{kind}: every typo corrected"] = uncorrected == 0
+        if kind == "full event name":
+            print(f"  the event itself in the first page for {len(queries) - missed}/{len(queries)} names")
+            checks[f"{kind}: the event itself is found unless a page of others match"] = missed == crowded
+    db.close()
+    for name, ok in checks.items():
+        print(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
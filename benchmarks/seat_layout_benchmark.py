@@ -0,0 +1,103 @@
+"""
+Seat layout generation at 1k, 10k and 100k seats.
+
+Each venue is laid out through the organizer endpoint, which inserts seats
+in chunks, and then laid out again; the second run must create nothing.
+Next to it the same seats go in the way create_seats used to add them, one
+ORM object per seat.
+
+    python -m benchmarks.seat_layout_benchmark [--sizes 1000 10000 100000]
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from backend.routers.organizer import create_seat_layout
+from backend.seat_layout import MAX_SEATS_PER_REQUEST, MAX_SECTION_ROWS, SeatLayout, SectionLayout
+from database.models import Event, Seat, User, UserRole, Venue
+
+from .seeding import sessions, temp_database
+
+ORGANIZER_ID = 1
+SEATS_PER_ROW = 100
+
+
+def seed(engine, sizes):
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": ORGANIZER_ID, "name": "Organizer", "email": "org@bench", "password": "x",
+                                     "role": UserRole.ORGANIZER.value}])
+        conn.execute(insert(Venue), [{"id": 1, "name": "Stadium", "city": "City", "total_capacity": max(sizes), "address": "-"}])
+        conn.execute(insert(Event), [
+            {"id": e, "venue_id": 1, "organizer_id": ORGANIZER_ID, "name": f"Event {e}", "category": "Sports",
+             "event_date": datetime.now() + timedelta(days=30), "ticket_price": 100.0, "max_tickets_per_user": 4,
+             "status": "upcoming", "inventory_version": 0, "hold_ttl_seconds": 600}
+            for e in range(1, 2 * len(sizes) + 1)
+        ])
+
+
+def layout_for(size: int):
+    rows = size // SEATS_PER_ROW
+    return SeatLayout(sections=[
+        SectionLayout(name=f"S{n + 1}", rows=min(MAX_SECTION_ROWS, rows - start), seats_per_row=SEATS_PER_ROW, price=100.0 + n)
+        for n, start in enumerate(range(0, rows, MAX_SECTION_ROWS))
+    ])
+
+
+def orm_seats(Session, event_id: int, size: int) -> float:
+    """The pre-layout create_seats loop: one ORM object per seat, flushed in one commit."""
+    db = Session()
+    try:
+        started = time.perf_counter()
+        db.add_all([Seat(event_id=event_id, seat_number=f"S{i + 1}", status="available") for i in range(size)])
+        db.commit()
+        return time.perf_counter() - started
+    finally:
+        db.close()
+
+
+def layout_seats(Session, organizer, event_id: int, layout):
+    db = Session()
+    try:
+        started = time.perf_counter()
+        created = create_seat_layout(event_id, layout, db, organizer)["created"]
+        return time.perf_counter() - started, created
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args(argv)
+
+    for size in args.sizes:
+        if size % SEATS_PER_ROW or not 0 < size <= MAX_SEATS_PER_REQUEST:
+            parser.error(f"sizes must be multiples of {SEATS_PER_ROW} up to {MAX_SEATS_PER_REQUEST}")
+
+    engine = temp_database("seats.db")
+    seed(engine, args.sizes)
+    Session = sessions(engine)
+    db = Session()
+    organizer = db.get(User, ORGANIZER_ID)
+    db.expunge(organizer)
+    db.close()
+
+    ok = True
+    print(f"{'seats':>8} {'ORM add_all':>16} {'layout':>16} {'re-run':>10}")
+    for n, size in enumerate(args.sizes):
+        orm_seconds = orm_seats(Session, 2 * n + 1, size)
+        layout = layout_for(size)
+        layout_seconds, created = layout_seats(Session, organizer, 2 * n + 2, layout)
+        rerun_seconds, recreated = layout_seats(Session, organizer, 2 * n + 2, layout)
+        ok = ok and created == size and recreated == 0
+        print(f"{size:>8} {size / orm_seconds:>10,.0f} sps {size / layout_seconds:>10,.0f} sps {rerun_seconds * 1000:>7.0f} ms"
+              + ("" if created == size and recreated == 0 else f"  FAIL: created {created}, re-run created {recreated}"))
+    print("(sps: seats inserted per second)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Seat stream fan-out under load.
+
+Ten thousand subscribers wait on one event's SeatEventBroker while another
+thread publishes seat changes, as committing requests do. Every batch is
+encoded the way the SSE endpoint writes it; slow subscribers get their
+changes coalesced instead of queued. Latency runs from publish to the
+subscriber seeing the oldest change in its batch. No sockets are involved,
+so this measures the broker and encoding only.
+
+    python -m benchmarks.seat_stream_load [--subscribers 10000] [--updates 200] [--rate 100]
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+
+from backend.seat_events import SeatEventBroker
+
+EVENT_ID = 1
+
+
+async def consume(subscription, slow_seconds, final_version, published, latencies, received):
+    seen_version, messages, sent_bytes = 0, 0, 0
+    while seen_version < final_version:
+        batch = await subscription.next_batch()
+        arrived = time.perf_counter()
+        sent_bytes += len(f"id: {batch['version']}\nevent: seats\ndata: {json.dumps(batch)}\n\n")  # as the endpoint writes it
+        latencies.append(arrived - published[seen_version + 1])
+        for seat_id, status in batch["seats"].items():
+            received[seat_id] = status
+        seen_version = batch["version"]
+        messages += 1
+        if slow_seconds:
+            await asyncio.sleep(slow_seconds)
+    return messages, sent_bytes
+
+
+def publish_changes(broker, changes, rate, published):
+    for version, (seat_ids, status) in enumerate(changes, start=1):
+        published[version] = time.perf_counter()
+        broker.publish(EVENT_ID, seat_ids, status, version)
+        time.sleep(1 / rate)
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    changes = [(rng.sample(range(1, args.seats + 1), rng.randint(1, 4)), rng.choice(("held", "booked", "available")))
+               for _ in range(args.updates)]
+    final = {}
+    for seat_ids, status in changes:
+        final.update(dict.fromkeys(seat_ids, status))
+
+    broker = SeatEventBroker()
+    published, latencies = {}, []
+    states = [{} for _ in range(args.subscribers)]
+    slow = set(rng.sample(range(args.subscribers), int(args.subscribers * args.slow_fraction)))
+    consumers = [
+        asyncio.create_task(consume(broker.subscribe(EVENT_ID), args.slow_seconds if n in slow else 0,
+                                    args.updates, published, latencies, states[n]))
+        for n in range(args.subscribers)
+    ]
+    await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    publisher = threading.Thread(target=publish_changes, args=(broker, changes, args.rate, published))
+    publisher.start()
+    results = await asyncio.gather(*consumers)
+    elapsed = time.perf_counter() - started
+    publisher.join()
+    return elapsed, latencies, results, slow, sum(state == final for state in states)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=100, help="published changes per second")
+    parser.add_argument("--seats", type=int, default=5000)
+    parser.add_argument("--slow-fraction", type=float, default=0.1)
+    parser.add_argument("--slow-seconds", type=float, default=0.25, help="time a slow consumer spends per message")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    if args.subscribers < 1 or args.updates < 1 or args.rate <= 0:
+        parser.error("--subscribers, --updates and --rate must be positive")
+
+    elapsed, latencies, results, slow, in_sync = asyncio.run(run(args))
+    fast_messages = [m for n, (m, _) in enumerate(results) if n not in slow]
+    slow_messages = [m for n, (m, _) in enumerate(results) if n in slow]
+    sent_bytes = sum(b for _, b in results)
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) >= 2 else [latencies[0]] * 99
+    print(f"Published {args.updates} changes at {args.rate:g}/s to {args.subscribers} subscribers in {elapsed:.2f}s")
+    print(f"  delivered {len(latencies):,} messages ({len(latencies) / elapsed:,.0f}/s, {sent_bytes / 1024 / 1024:.1f} MiB encoded)")
+    print(f"  latency p50 {cuts[49] * 1000:.1f} ms, p99 {cuts[98] * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms")
+    if fast_messages:
+        print(f"  messages per fast subscriber: {statistics.mean(fast_messages):.0f}")
+    if slow_messages:
+        print(f"  messages per slow subscriber: {statistics.mean(slow_messages):.0f} (coalesced)")
+    ok = in_sync == args.subscribers
+    print(f"  [{'ok' if ok else 'FAIL'}] every subscriber ends on the final seat states ({in_sync}/{args.subscribers})")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
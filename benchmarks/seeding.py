@@ -0,0 +1,174 @@
+"""
+Datasets shared by the benchmarks.
+
+Rows go in through Core inserts, which the app's counters never see, so
+every seed backfills the maintained tables afterwards as the migrations do
+on an existing database.
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import sessionmaker
+
+from database.db import create_db_engine
+from database.migrations import BACKFILLS, run_migrations
+from database.models import (
+    EntryLog, Event, Order, OrganizerProfile, Seat, Ticket, User, Venue, OrderStatus, SeatStatus, TicketStatus, UserRole,
+)
+
+ENTRY_MANAGER_ID = 2
+FIRST_CUSTOMER_ID = 100
+
+# The catalog: many events, most of them past, half of every event's seats sold
+ORGANIZERS = 20
+VENUES = 50
+CITIES = 5
+FIRST_ORGANIZER_ID = 10
+UPCOMING_EVENT_ID = 10  # every tenth event is upcoming
+
+# The flash sale and the sold-out final are single-event datasets
+FLASH_SALE_EVENT_ID = 1
+SOLD_OUT_EVENT_ID = 1
+
+
+def temp_database(name: str):
+    """Engine on a new, migrated SQLite database in its own temporary directory."""
+    engine = create_db_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), name)}")
+    run_migrations(engine)
+    return engine
+
+
+def sessions(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def catalog_customers(events: int) -> int:
+    return max(events * 10, 100)
+
+
+def customer_email(user_id: int) -> str:
+    """Login of a seed_catalog customer."""
+    return f"c{user_id - FIRST_CUSTOMER_ID}@audit"
+
+
+def seed_catalog(engine, events: int, seats_per_event: int):
+    """
+    `events` events with `seats_per_event` seats each. Every even-numbered
+    seat is sold: one confirmed order, an active ticket (TICK-AUDIT<order id>)
+    and a successful scan per seat. Half the organizers have a profile.
+    """
+    customers = catalog_customers(events)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": ENTRY_MANAGER_ID, "name": "Entry", "email": "entry@audit", "password": "x", "role": UserRole.ENTRY_MANAGER.value},
+        ] + [
+            {"id": FIRST_ORGANIZER_ID + o, "name": f"Organizer {o}", "email": f"org{o}@audit", "password": "x",
+             "role": UserRole.ORGANIZER.value}
+            for o in range(ORGANIZERS)
+        ] + [
+            {"id": FIRST_CUSTOMER_ID + i, "name": f"Customer {i}", "email": customer_email(FIRST_CUSTOMER_ID + i), "password": "x",
+             "role": UserRole.CUSTOMER.value}
+            for i in range(customers)
+        ])
+        conn.execute(insert(OrganizerProfile), [
+            {"user_id": FIRST_ORGANIZER_ID + o, "company_name": f"Company {o}", "bio": "-", "years_of_experience": o,
+             "specialization": "Music", "is_verified": o % 2 == 0}
+            for o in range(0, ORGANIZERS, 2)  # half of them have not created a profile yet
+        ])
+        conn.execute(insert(Venue), [
+            {"id": v, "name": f"Venue {v}", "city": f"City {v % CITIES}", "total_capacity": seats_per_event, "address": "-"}
+            for v in range(1, VENUES + 1)
+        ])
+        conn.execute(insert(Event), [
+            # Like a real catalog, most events are in the past and each organizer owns a few
+            {"id": e, "venue_id": 1 + e % VENUES, "organizer_id": FIRST_ORGANIZER_ID + e % ORGANIZERS, "name": f"Event {e}",
+             "category": "Music", "event_date": datetime.now() + timedelta(days=30), "ticket_price": 100.0, "max_tickets_per_user": 4,
+             "status": "upcoming" if e % 10 == 0 else "closed", "inventory_version": 1, "hold_ttl_seconds": 600}
+            for e in range(1, events + 1)
+        ])
+        seat_rows, order_rows, ticket_rows, log_rows = [], [], [], []
+        seat_id = order_id = 0
+        for e in range(1, events + 1):
+            for n in range(seats_per_event):
+                seat_id += 1
+                booked = n % 2 == 0
+                seat_rows.append({"id": seat_id, "event_id": e, "seat_number": f"S{n + 1}", "version": 1,
+                                  "status": (SeatStatus.BOOKED if booked else SeatStatus.AVAILABLE).value})
+                if booked:
+                    order_id += 1
+                    order_rows.append({"id": order_id, "user_id": FIRST_CUSTOMER_ID + order_id % customers, "event_id": e,
+                                       "total_amount": 100.0, "payment_mode": "simulation",
+                                       "order_status": OrderStatus.CONFIRMED.value})
+                    ticket_rows.append({"id": order_id, "order_id": order_id, "seat_id": seat_id,
+                                        "ticket_code": f"TICK-AUDIT{order_id}", "status": TicketStatus.ACTIVE.value})
+                    log_rows.append({"ticket_id": order_id, "validated_by": ENTRY_MANAGER_ID, "result": "success"})
+        conn.execute(insert(Seat), seat_rows)
+        conn.execute(insert(Order), order_rows)
+        conn.execute(insert(Ticket), ticket_rows)
+        conn.execute(insert(EntryLog), log_rows)
+        conn.execute(text(BACKFILLS["user_event_ticket_counts"]))
+        conn.execute(text(BACKFILLS["event_sales_stats"]))
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def seed_flash_sale(engine, seats: int, customers: int):
+    """One upcoming event with `seats` available seats and `customers` customers who have bought nothing yet."""
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": 1, "name": "Organizer", "email": "org@race", "password": "x", "role": UserRole.ORGANIZER.value},
+        ] + [
+            {"id": FIRST_CUSTOMER_ID + c, "name": f"Fan {c}", "email": f"fan{c}@race", "password": "x", "role": UserRole.CUSTOMER.value}
+            for c in range(customers)
+        ])
+        conn.execute(insert(Venue), [{"id": 1, "name": "Arena", "city": "City", "total_capacity": seats, "address": "-"}])
+        conn.execute(insert(Event), [{
+            "id": FLASH_SALE_EVENT_ID, "venue_id": 1, "organizer_id": 1, "name": "Flash sale", "category": "Music",
+            "event_date": datetime.now() + timedelta(days=30), "ticket_price": 100.0, "max_tickets_per_user": 4,
+            "status": "upcoming", "inventory_version": 0, "hold_ttl_seconds": 600,
+        }])
+        conn.execute(insert(Seat), [
+            {"id": n, "event_id": FLASH_SALE_EVENT_ID, "seat_number": f"S{n}", "status": SeatStatus.AVAILABLE.value, "version": 0}
+            for n in range(1, seats + 1)
+        ])
+        conn.execute(text(BACKFILLS["event_sales_stats"]))
+
+
+def seed_sold_out_event(engine, attendees: int):
+    """
+    One event happening now, every seat sold: ticket, order and seat n share
+    id n, and each ticket's code is make_ticket_code(n, SOLD_OUT_EVENT_ID, n).
+    """
+    from backend.ticket_codes import make_ticket_code
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": 1, "name": "Organizer", "email": "org@sim", "password": "x", "role": UserRole.ORGANIZER.value},
+            {"id": ENTRY_MANAGER_ID, "name": "Gate", "email": "gate@sim", "password": "x", "role": UserRole.ENTRY_MANAGER.value},
+            {"id": 3, "name": "Crowd", "email": "crowd@sim", "password": "x", "role": UserRole.CUSTOMER.value},
+        ])
+        conn.execute(insert(Venue), [{"id": 1, "name": "Stadium", "city": "City", "total_capacity": attendees, "address": "-"}])
+        conn.execute(insert(Event), [{
+            "id": SOLD_OUT_EVENT_ID, "venue_id": 1, "organizer_id": 1, "name": "Final", "category": "Sports",
+            "event_date": datetime.now(), "ticket_price": 100.0, "max_tickets_per_user": attendees,
+            "status": "upcoming", "inventory_version": 1, "hold_ttl_seconds": 600,
+        }])
+        conn.execute(insert(Seat), [
+            {"id": n, "event_id": SOLD_OUT_EVENT_ID, "seat_number": f"S{n}", "status": SeatStatus.BOOKED.value, "version": 1}
+            for n in range(1, attendees + 1)
+        ])
+        conn.execute(insert(Order), [
+            {"id": n, "user_id": 3, "event_id": SOLD_OUT_EVENT_ID, "total_amount": 100.0, "payment_mode": "simulation",
+             "order_status": OrderStatus.CONFIRMED.value}
+            for n in range(1, attendees + 1)
+        ])
+        conn.execute(insert(Ticket), [
+            {"id": n, "order_id": n, "seat_id": n, "ticket_code": make_ticket_code(n, SOLD_OUT_EVENT_ID, n),
+             "status": TicketStatus.ACTIVE.value}
+            for n in range(1, attendees + 1)
+        ])
+        conn.execute(text(BACKFILLS["event_sales_stats"]))
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
@@ -0,0 +1,89 @@
+"""
+Signed ticket codes versus lookups by code.
+
+Every ticket of the sold-out event is validated three ways: the signature
+alone, as an offline gate checks it; the signature and then a primary-key
+read, as check_ticket does; and a query on ticket_code, as every scan used
+to. Forged codes and codes for another event are timed as well, because
+the signature turns them away before the database is touched.
+
+    python -m benchmarks.ticket_code_benchmark [--tickets 50000]
+"""
+import argparse
+import random
+import sys
+import time
+
+from backend.ticket_codes import make_ticket_code, read_ticket_code
+from database.models import Ticket
+
+from .seeding import SOLD_OUT_EVENT_ID, seed_sold_out_event, sessions, temp_database
+
+
+def timed(fn, codes):
+    started = time.perf_counter()
+    results = [fn(code) for code in codes]
+    return len(codes) / (time.perf_counter() - started), results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    if args.tickets < 1:
+        parser.error("--tickets must be positive")
+
+    rng = random.Random(args.seed)
+    engine = temp_database("codes.db")
+    seed_sold_out_event(engine, args.tickets)
+    Session = sessions(engine)
+
+    genuine = [make_ticket_code(n, SOLD_OUT_EVENT_ID, n) for n in range(1, args.tickets + 1)]
+    rng.shuffle(genuine)
+    bad_count = max(args.tickets // 10, 1)
+    forged = [make_ticket_code(args.tickets + n, SOLD_OUT_EVENT_ID, n)[:-4] + "AAAA" for n in range(1, bad_count + 1)]
+    wrong_event = [make_ticket_code(n, SOLD_OUT_EVENT_ID + 1, n) for n in range(1, bad_count + 1)]
+
+    def signature_only(code):
+        claims = read_ticket_code(code)
+        return claims is not None and claims.event_id == SOLD_OUT_EVENT_ID
+
+    db = Session()
+    try:
+        def signature_then_primary_key(code):
+            if not signature_only(code):
+                return False
+            return db.get(Ticket, read_ticket_code(code).ticket_id) is not None
+
+        def lookup_by_code(code):
+            # There is no event check here: the code carries no event and the old path did not join orders
+            return db.query(Ticket).filter(Ticket.ticket_code == code).first() is not None
+
+        methods = {
+            "signature only": signature_only,
+            "signature + primary key": signature_then_primary_key,
+            "lookup by ticket_code": lookup_by_code,
+        }
+        print(f"{args.tickets} genuine codes, {bad_count} forged, {bad_count} for another event")
+        print(f"{'method':<26} {'genuine/s':>11} {'forged/s':>11} {'wrong event/s':>14}")
+        checks = {}
+        for name, method in methods.items():
+            genuine_rate, genuine_results = timed(method, genuine)
+            forged_rate, forged_results = timed(method, forged)
+            wrong_rate, wrong_results = timed(method, wrong_event)
+            db.expunge_all()
+            print(f"{name:<26} {genuine_rate:>11,.0f} {forged_rate:>11,.0f} {wrong_rate:>14,.0f}")
+            checks[f"{name}: every genuine code accepted"] = all(genuine_results)
+            checks[f"{name}: every forged code rejected"] = not any(forged_results)
+            if name != "lookup by ticket_code":
+                checks[f"{name}: every wrong-event code rejected"] = not any(wrong_results)
+    finally:
+        db.close()
+    for name, ok in checks.items():
+        print(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, bindparam, inspect, literal, text
+from .db import Base
+from . import models  # registers every table on Base.metadata
+from .models import DEFAULT_HOLD_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Populates derived tables the first time they are created on an existing database
+BACKFILLS = {
+    "user_event_ticket_counts": """
+        INSERT INTO user_event_ticket_counts (user_id, event_id, ticket_count)
+        SELECT o.user_id, o.event_id, COUNT(t.id)
+        FROM orders o JOIN tickets t ON t.order_id = o.id
+        WHERE o.order_status = 'confirmed'
+        GROUP BY o.user_id, o.event_id
+    """,
+    "event_sales_stats": """
+        INSERT INTO event_sales_stats (event_id, seats_available, seats_held, seats_sold, gross_revenue, refunded_amount, scans_admitted)
+        SELECT e.id,
+            (SELECT COUNT(*) FROM seats s WHERE s.event_id = e.id AND s.status = 'available'),
+            (SELECT COUNT(*) FROM seats s WHERE s.event_id = e.id AND s.status = 'held'),
+            (SELECT COUNT(*) FROM seats s WHERE s.event_id = e.id AND s.status = 'booked'),
+            (SELECT COALESCE(SUM(o.total_amount), 0) FROM orders o WHERE o.event_id = e.id AND o.order_status IN ('confirmed', 'refunded')),
+            (SELECT COALESCE(SUM(o.total_amount), 0) FROM orders o WHERE o.event_id = e.id AND o.order_status = 'refunded'),
+            (SELECT COUNT(*) FROM tickets t JOIN orders o ON o.id = t.order_id WHERE o.event_id = e.id AND t.status = 'used')
+        FROM events e
+    """,
+}
+
+# Run once, when the (table, column) they are keyed on is added to an existing table;
+# :held_until is one default hold TTL from the migration
+COLUMN_BACKFILLS = {
+    # Before holds, place_order marked a pending order's seats booked without
+    # linking them to it; they are the booked seats no ticket points at. They
+    # become holds that give the customer one more TTL to pay, owned by the
+    # order when it is the event's only pending one. The sweeper then
+    # releases whatever is left unpaid.
+    ("seats", "held_until"): """
+        UPDATE seats SET
+            status = 'held',
+            held_until = :held_until,
+            order_id = (
+                SELECT MIN(o.id) FROM orders o
+                WHERE o.event_id = seats.event_id AND o.order_status = 'pending'
+                HAVING COUNT(*) = 1
+            )
+        WHERE status = 'booked'
+          AND id NOT IN (SELECT seat_id FROM tickets WHERE seat_id IS NOT NULL)
+          AND event_id IN (SELECT event_id FROM orders WHERE order_status = 'pending')
+    """,
+}
+
+# Run before a unique index is added to an existing table: deletes the duplicates
+# that are safe to drop. Seats keep one row per (event, seat number), dropping
+# only available copies that no order or ticket points at.
+DEDUPES = {
+    "uq_seats_event_id_seat_number": """
+        DELETE FROM seats
+        WHERE status = 'available' AND order_id IS NULL
+          AND id NOT IN (SELECT seat_id FROM tickets WHERE seat_id IS NOT NULL)
+          AND EXISTS (
+              SELECT 1 FROM seats k
+              WHERE k.event_id = seats.event_id AND k.seat_number = seats.seat_number AND k.id <> seats.id
+                AND (k.status <> 'available' OR k.order_id IS NOT NULL OR k.id < seats.id)
+          )
+    """,
+}
+
+# Recounts the seat columns of event_sales_stats after a migration deletes or moves seats
+RECOUNT_SEAT_STATS = """
+    UPDATE event_sales_stats SET
+        seats_available = (SELECT COUNT(*) FROM seats s WHERE s.event_id = event_sales_stats.event_id AND s.status = 'available'),
+        seats_held = (SELECT COUNT(*) FROM seats s WHERE s.event_id = event_sales_stats.event_id AND s.status = 'held'),
+        seats_sold = (SELECT COUNT(*) FROM seats s WHERE s.event_id = event_sales_stats.event_id AND s.status = 'booked')
+"""
+
+# SQLite FTS5 index over upcoming events, kept in sync by triggers so every
+# writer (ORM, Core bulk updates, the admin shell) updates it. Each row is one
+# event, keyed by rowid = events.id, with its venue and organizer folded in.
+EVENT_SEARCH_DOCUMENTS = """
+    INSERT INTO event_search (rowid, name, category, venue, organizer)
+    SELECT e.id, e.name, e.category, coalesce(v.name, '') || ' ' || coalesce(v.city, ''), coalesce(p.company_name, u.name, '')
+    FROM events e
+    LEFT JOIN venues v ON v.id = e.venue_id
+    LEFT JOIN organizer_profiles p ON p.user_id = e.organizer_id
+    LEFT JOIN users u ON u.id = e.organizer_id
+    WHERE e.status = 'upcoming' AND {where}
+"""
+
+def _refresh_search_documents(where: str) -> str:
+    return f"DELETE FROM event_search WHERE rowid IN (SELECT e.id FROM events e WHERE {where}); " + EVENT_SEARCH_DOCUMENTS.format(where=where) + ";"
+
+EVENT_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS event_search USING fts5(
+        name, category, venue, organizer,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    # Term list with document counts, used to correct typos
+    "CREATE VIRTUAL TABLE IF NOT EXISTS event_search_vocab USING fts5vocab(event_search, row)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS event_search_events_insert AFTER INSERT ON events WHEN new.status = 'upcoming' BEGIN
+        {EVENT_SEARCH_DOCUMENTS.format(where="e.id = new.id")};
+    END
+    """,
+    # Only the indexed columns, so inventory_version bumps on every booking do not touch the index
+    f"""
+    CREATE TRIGGER IF NOT EXISTS event_search_events_update AFTER UPDATE OF name, category, venue_id, organizer_id, status ON events BEGIN
+        DELETE FROM event_search WHERE rowid = old.id;
+        {EVENT_SEARCH_DOCUMENTS.format(where="e.id = new.id")};
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS event_search_events_delete AFTER DELETE ON events BEGIN
+        DELETE FROM event_search WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS event_search_venues_update AFTER UPDATE OF name, city ON venues BEGIN
+        {_refresh_search_documents("e.venue_id = new.id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS event_search_profiles_insert AFTER INSERT ON organizer_profiles BEGIN
+        {_refresh_search_documents("e.organizer_id = new.user_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS event_search_profiles_update AFTER UPDATE OF company_name, user_id ON organizer_profiles BEGIN
+        {_refresh_search_documents("e.organizer_id IN (old.user_id, new.user_id)")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS event_search_profiles_delete AFTER DELETE ON organizer_profiles BEGIN
+        {_refresh_search_documents("e.organizer_id = old.user_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS event_search_users_update AFTER UPDATE OF name ON users WHEN new.role = 'organizer' BEGIN
+        {_refresh_search_documents("e.organizer_id = new.id")}
+    END
+    """,
+]
+
+def rebuild_event_search(conn):
+    """Repopulates the event search index from the events, venues and organizer tables (SQLite only)."""
+    conn.execute(text("DELETE FROM event_search"))
+    conn.execute(text(EVENT_SEARCH_DOCUMENTS.format(where="1 = 1")))
+    conn.execute(text("INSERT INTO event_search (event_search) VALUES ('optimize')"))
+
+def _duplicate_keys(conn, index, limit: int = 10):
+    """Up to `limit` key values that more than one row of the index's table shares; NULLs never conflict."""
+    columns = ", ".join(column.name for column in index.columns)
+    not_null = " AND ".join(f"{column.name} IS NOT NULL" for column in index.columns)
+    return conn.execute(text(
+        f"SELECT {columns}, COUNT(*) FROM {index.table.name} WHERE {not_null} "
+        f"GROUP BY {columns} HAVING COUNT(*) > 1 LIMIT {limit}"
+    )).all()
+
+def _prepare_unique_index(conn, index) -> int:
+    """
+    Removes the duplicates DEDUPES knows how to drop, then refuses to go on if
+    any remain, naming them, rather than failing on the CREATE UNIQUE INDEX.
+    Returns the number of rows deleted.
+    """
+    deleted = 0
+    if index.name in DEDUPES:
+        deleted = conn.execute(text(DEDUPES[index.name])).rowcount
+        if deleted:
+            logger.warning("Deleted %d duplicate %s rows before creating %s", deleted, index.table.name, index.name)
+    duplicates = _duplicate_keys(conn, index)
+    if duplicates:
+        keys = "; ".join(", ".join(map(str, row[:-1])) + f" ({row[-1]} rows)" for row in duplicates)
+        raise RuntimeError(
+            f"Cannot create unique index {index.name}: {index.table.name} has duplicate "
+            f"({', '.join(column.name for column in index.columns)}) values, e.g. {keys}. Resolve them and restart."
+        )
+    return deleted
+
+def run_migrations(engine):
+    """
+    Brings an existing database file up to date with the models.
+    Creates missing tables, adds missing columns and creates missing indexes.
+    Only additive changes are supported; nothing is dropped or altered,
+    except duplicate rows that would block a new unique index (DEDUPES).
+    """
+    existing_tables = set(inspect(engine).get_table_names())
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+
+    created_indexes = False
+    seats_changed = False
+    hold_expiry = datetime.now() + timedelta(seconds=DEFAULT_HOLD_TTL_SECONDS)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            added_columns = []
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.default is not None and column.default.is_scalar:
+                    default = literal(column.default.arg).compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+                    ddl += f" DEFAULT {default}"
+                conn.execute(text(ddl))
+                added_columns.append(column.name)
+
+            # After every column is in, since a backfill may fill several
+            for column_name in added_columns:
+                backfill = COLUMN_BACKFILLS.get((table.name, column_name))
+                if backfill is None:
+                    continue
+                statement = text(backfill).bindparams(bindparam("held_until", hold_expiry, type_=DateTime()))
+                if conn.execute(statement).rowcount and table.name == "seats":
+                    seats_changed = True
+
+            existing_indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    if index.unique and table.name in existing_tables:
+                        if _prepare_unique_index(conn, index) and table.name == "seats":
+                            seats_changed = True
+                    index.create(bind=conn)
+                    created_indexes = True
+
+        if existing_tables:
+            for table_name, backfill in BACKFILLS.items():
+                if table_name not in existing_tables:
+                    conn.execute(text(backfill))
+            if seats_changed and "event_sales_stats" in existing_tables:
+                conn.execute(text(RECOUNT_SEAT_STATS))
+
+        if engine.dialect.name == "sqlite":
+            search_index_missing = "event_search" not in existing_tables
+            for ddl in EVENT_SEARCH_DDL:
+                conn.execute(text(ddl))
+            if search_index_missing:
+                rebuild_event_search(conn)
+
+        # Give the SQLite planner statistics for the new indexes
+        if created_indexes and engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -27,11 +27,29 @@ class TicketStatus(str, enum.Enum):
     USED = "used"
     CANCELLED = "cancelled"
 
+class SeatStatus(str, enum.Enum):
+    AVAILABLE = "available"
+    HELD = "held"
+    BOOKED = "booked"
+
+# How long place_order keeps seats held while the customer pays
+DEFAULT_HOLD_TTL_SECONDS = 600
+# Shorter holds expire mid-checkout; longer ones keep unpaid seats off sale
+MIN_HOLD_TTL_SECONDS = 60
+MAX_HOLD_TTL_SECONDS = 3600
+
 class RefundStatus(str, enum.Enum):
     PENDING = "pending"
     APPROVED = "approved"
     REJECTED = "rejected"
 
+class PaymentEventStatus(str, enum.Enum):
+    PENDING = "pending"
+    PROCESSED = "processed" # order confirmed and tickets issued
+    IGNORED = "ignored" # order was already confirmed
+    REJECTED = "rejected" # payment cannot be applied; needs a manual refund
+    FAILED = "failed"
+
 class SupportStatus(str, enum.Enum):
     OPEN = "open"
     IN_PROGRESS = "in_progress"
@@ -43,7 +61,7 @@ class User(Base):
     name = Column(String)
     email = Column(String, unique=True, index=True)
     password = Column(String)
-    role = Column(String, default=UserRole.CUSTOMER)
+    role = Column(String, default=UserRole.CUSTOMER, index=True)
 
 class OrganizerProfile(Base):
     __tablename__ = "organizer_profiles"
@@ -68,24 +86,50 @@ class Venue(Base):
 class Event(Base):
     __tablename__ = "events"
     id = Column(Integer, primary_key=True, index=True)
-    venue_id = Column(Integer, ForeignKey("venues.id"))
-    organizer_id = Column(Integer, ForeignKey("users.id"))
+    venue_id = Column(Integer, ForeignKey("venues.id"), index=True)
+    organizer_id = Column(Integer, ForeignKey("users.id"), index=True)
     name = Column(String)
     category = Column(String)
     event_date = Column(DateTime)
     ticket_price = Column(Float)
     max_tickets_per_user = Column(Integer)
-    status = Column(String, default=EventStatus.UPCOMING)
+    hold_ttl_seconds = Column(Integer, default=DEFAULT_HOLD_TTL_SECONDS)
+    inventory_version = Column(Integer, default=0) # bumped on every seat status change
+    status = Column(String, default=EventStatus.UPCOMING, index=True)
 
     venue = relationship("Venue")
     organizer = relationship("User")
 
+    __table_args__ = (
+        # Catalog pages walk upcoming events in (event_date, id) order, optionally within one category
+        Index("ix_events_status_date_id", "status", "event_date", "id"),
+        Index("ix_events_status_category_date_id", "status", "category", "event_date", "id"),
+    )
+
 class Seat(Base):
     __tablename__ = "seats"
     id = Column(Integer, primary_key=True, index=True)
     event_id = Column(Integer, ForeignKey("events.id"))
     seat_number = Column(String)
-    status = Column(String, default="available") # available, booked
+    section = Column(String, nullable=True)
+    price = Column(Float, nullable=True) # price tier; falls back to Event.ticket_price
+    status = Column(String, default=SeatStatus.AVAILABLE) # available, held, booked
+    held_until = Column(DateTime, nullable=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=True) # order holding/owning the seat
+    version = Column(Integer, default=0) # Event.inventory_version of the last status change
+
+    __table_args__ = (
+        # Expired-hold sweeps: WHERE status = 'held' AND held_until < now ORDER BY held_until
+        Index("ix_seats_status_held_until", "status", "held_until"),
+        # Seat map deltas: WHERE event_id = ? AND version > ?
+        Index("ix_seats_event_id_version", "event_id", "version"),
+        # Booking summary counts: WHERE event_id = ? AND status = ?
+        Index("ix_seats_event_id_status", "event_id", "status"),
+        # Makes seat generation idempotent (INSERT ... ON CONFLICT DO NOTHING)
+        Index("uq_seats_event_id_seat_number", "event_id", "seat_number", unique=True),
+        # Payment webhooks book an order's held seats: WHERE order_id IN (...)
+        Index("ix_seats_order_id", "order_id"),
+    )
 
 class Order(Base):
     __tablename__ = "orders"
@@ -96,14 +140,44 @@ class Order(Base):
     payment_mode = Column(String)
     order_status = Column(String, default=OrderStatus.PENDING)
     booking_time = Column(DateTime, server_default=func.now())
+    gateway_order_id = Column(String, nullable=True) # Razorpay order created for this order
+    seat_count = Column(Integer, nullable=True) # seats held at checkout; NULL on orders placed before it was recorded
 
     user = relationship("User")
     event = relationship("Event")
 
+    __table_args__ = (
+        Index("ix_orders_user_id_event_id_order_status", "user_id", "event_id", "order_status"),
+        # Revenue per event: WHERE event_id = ? AND order_status = 'confirmed'
+        Index("ix_orders_event_id_order_status", "event_id", "order_status"),
+        # Payment webhooks: WHERE gateway_order_id IN (...). Partial, since most orders never get one
+        Index("uq_orders_gateway_order_id", "gateway_order_id", unique=True,
+              sqlite_where=text("gateway_order_id IS NOT NULL"), postgresql_where=text("gateway_order_id IS NOT NULL")),
+    )
+
+class UserEventTicketCount(Base):
+    # Confirmed tickets per (user, event), maintained when tickets are issued or refunded
+    __tablename__ = "user_event_ticket_counts"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    event_id = Column(Integer, ForeignKey("events.id"), primary_key=True)
+    ticket_count = Column(Integer, default=0, nullable=False)
+
+class EventSalesStats(Base):
+    # Per-event sales counters, maintained in the transactions that change them (see backend/event_stats.py)
+    __tablename__ = "event_sales_stats"
+    event_id = Column(Integer, ForeignKey("events.id"), primary_key=True)
+    seats_available = Column(Integer, default=0, nullable=False)
+    seats_held = Column(Integer, default=0, nullable=False)
+    seats_sold = Column(Integer, default=0, nullable=False)
+    gross_revenue = Column(Float, default=0, nullable=False) # every order ever confirmed, refunded or not
+    refunded_amount = Column(Float, default=0, nullable=False)
+    scans_admitted = Column(Integer, default=0, nullable=False) # tickets currently marked used
+    reconciled_at = Column(DateTime, nullable=True)
+
 class Ticket(Base):
     __tablename__ = "tickets"
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
     seat_id = Column(Integer, ForeignKey("seats.id"))
     ticket_code = Column(String, unique=True, index=True)
     status = Column(String, default=TicketStatus.ACTIVE)
@@ -112,10 +186,39 @@ class Ticket(Base):
     order = relationship("Order")
     seat = relationship("Seat")
 
+class IdempotencyKey(Base):
+    # Stored response per (user, Idempotency-Key), replayed for retried requests until it expires
+    __tablename__ = "idempotency_keys"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String) # endpoint + body fingerprint; a reused key must match it
+    response = Column(String) # JSON body
+    expires_at = Column(DateTime, index=True)
+
+class PaymentEvent(Base):
+    # Outbox of verified payment webhooks, applied to orders by the payment event processor
+    __tablename__ = "payment_events"
+    id = Column(Integer, primary_key=True, index=True)
+    gateway_payment_id = Column(String, unique=True) # redelivered webhooks for a payment are dropped on this
+    gateway_order_id = Column(String)
+    event_type = Column(String)
+    amount = Column(Integer) # paise
+    payload = Column(String)
+    status = Column(String, default=PaymentEventStatus.PENDING)
+    result = Column(String, nullable=True)
+    attempts = Column(Integer, default=0)
+    received_at = Column(DateTime, server_default=func.now())
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Processor batches: WHERE status = 'pending' ORDER BY id
+        Index("ix_payment_events_status_id", "status", "id"),
+    )
+
 class RefundRequest(Base):
     __tablename__ = "refund_requests"
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
     requested_by = Column(Integer, ForeignKey("users.id"))
     reason = Column(String)
     status = Column(String, default=RefundStatus.PENDING)
@@ -139,7 +242,7 @@ class SupportCase(Base):
 class EntryLog(Base):
     __tablename__ = "entry_logs"
     id = Column(Integer, primary_key=True, index=True)
-    ticket_id = Column(Integer, ForeignKey("tickets.id"))
+    ticket_id = Column(Integer, ForeignKey("tickets.id"), index=True)
     validated_by = Column(Integer, ForeignKey("users.id"))
     scanned_at = Column(DateTime, server_default=func.now())
     result = Column(String) # success, failed
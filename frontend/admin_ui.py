@@ -16,6 +16,10 @@ def admin_dashboard():
 
     st.subheader("Manage Venues & Events")
     
+    # The tabs render together on every run, so load what they show up front and in parallel
+    venues, organizers, all_e, stats = api_client.fetch_concurrently(
+        api_client.get_venues, api_client.get_organizers_with_profiles, api_client.get_all_events, api_client.get_event_sales_stats)
+    
     tab1, tab2, tab3, tab4 = st.tabs(["Venues", "Events", "All System Events", "Manage Organizers"])
     
     with tab1:
@@ -30,7 +34,6 @@ def admin_dashboard():
                 st.rerun()
         
         st.write("### Existing Venues")
-        venues = api_client.get_venues()
         if not venues or (isinstance(venues, dict) and "detail" in venues):
             st.info("No venues found. Create one above or use 'Seed Sample Data'.")
         else:
@@ -39,16 +42,13 @@ def admin_dashboard():
 
     with tab2:
         with st.expander("Create New Event"):
-            venues = api_client.get_venues()
-            organizers = api_client.get_organizers()
-            
-            if not venues or not organizers or (isinstance(venues, dict) and "detail" in venues):
+            if not venues or not organizers or any(isinstance(r, dict) and "detail" in r for r in (venues, organizers)):
                 st.warning("You need at least one Venue and one Organizer to create an event.")
             else:
                 venue_options = {f"{v['name']} (ID: {v['id']})": v['id'] for v in venues}
                 org_options = {}
                 for o in organizers:
-                    profile = api_client.get_organizer_profile(o['id'])
+                    profile = o['profile']
                     v_status = "✅" if (profile and profile.get('is_verified')) else "⏳"
                     label = f"{o['name']} ({v_status} {profile.get('specialization', 'No Spec') if profile else 'No Profile'})"
                     org_options[label] = o['id']
@@ -78,21 +78,31 @@ def admin_dashboard():
     
     with tab3:
         st.subheader("Global Event List")
-        all_e = api_client.get_all_events()
         if not all_e or (isinstance(all_e, dict) and "detail" in all_e):
             st.info("No events found in the system.")
         else:
             for e in all_e:
                 st.markdown(f"**{e['name']}** | Org ID: {e['organizer_id']} | Status: {e['status']}")
+
+        st.subheader("Sales Overview")
+        if isinstance(stats, list) and stats:
+            st.dataframe(stats, use_container_width=True, hide_index=True)
+        if st.button("Reconcile Counters"):
+            report = api_client.reconcile_event_stats()
+            if "checked_events" in report:
+                st.success(f"Checked {report['checked_events']} events, {report['drifted_events']} drifted")
+                if report["drift"]:
+                    st.json(report["drift"])
+            else:
+                st.error(report.get("detail", "Reconciliation failed"))
     
     with tab4:
         st.subheader("Organizer Vetting")
-        orgs = api_client.get_organizers()
-        if not orgs:
+        if not organizers or (isinstance(organizers, dict) and "detail" in organizers):
             st.info("No organizers found.")
         else:
-            for o in orgs:
-                prof = api_client.get_organizer_profile(o['id'])
+            for o in organizers:
+                prof = o['profile']
                 with st.expander(f"{o['name']} ({o['email']})"):
                     if prof:
                         st.write(f"**Company**: {prof['company_name']}")
@@ -111,7 +121,7 @@ def organizer_dashboard():
     st.title("📅 Organizer Dashboard")
     
     st.subheader("Event Selection")
-    my_events = api_client.get_my_events()
+    my_events, profile = api_client.fetch_concurrently(api_client.get_my_events, api_client.get_my_profile)
     
     if not my_events:
         st.info("No active events found for your account. Please ask the Admin to assign you an event.")
@@ -140,6 +150,24 @@ def organizer_dashboard():
                 st.success(res["message"])
             else:
                 st.error(res.get("detail", "Error creating seats"))
+        
+        with st.expander("Generate Section Layout"):
+            st.caption("Creates seats named <section>-<row>-<seat>. Re-running the same layout skips seats that already exist.")
+            sec_name = st.text_input("Section Name", value="A", key="layout_section")
+            sec_rows = st.number_input("Rows", min_value=1, value=10, key="layout_rows")
+            sec_per_row = st.number_input("Seats Per Row", min_value=1, value=20, key="layout_per_row")
+            sec_price = st.number_input("Section Price (₹, 0 = event price)", min_value=0.0, value=0.0, key="layout_price")
+            if st.button("Generate Layout", key="layout_btn"):
+                res = api_client.create_seat_layout(event_id, [{
+                    "name": sec_name,
+                    "rows": sec_rows,
+                    "seats_per_row": sec_per_row,
+                    "price": sec_price or None
+                }])
+                if "message" in res:
+                    st.success(res["message"])
+                else:
+                    st.error(res.get("detail", "Error creating layout"))
     
     with t2:
         st.subheader("Real-time Summary")
@@ -150,6 +178,10 @@ def organizer_dashboard():
                 col1.metric("Total Capacity", summary['total_seats'])
                 col2.metric("Tickets Sold", summary['booked_seats'])
                 col3.metric("Total Revenue", f"₹{summary['revenue']:.2f}")
+                col4, col5, col6 = st.columns(3)
+                col4.metric("On Hold", summary['held_seats'])
+                col5.metric("Refunded", f"₹{summary['refunded_amount']:.2f}")
+                col6.metric("Admitted", summary['scans_admitted'])
                 
                 if summary['total_seats'] > 0:
                     occ = (summary['booked_seats'] / summary['total_seats']) * 100
@@ -169,7 +201,6 @@ def organizer_dashboard():
     
     with t4:
         st.subheader("Organizer Profile")
-        profile = api_client.get_my_profile()
         
         with st.form("profile_form"):
             name = st.text_input("Company/Individual Name", value=profile.get("company_name", ""))
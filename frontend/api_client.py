@@ -1,113 +1,215 @@
+import json
+import threading
+import uuid
+
 import requests
 import streamlit as st
 
+from api_transport import API_TIMEOUT, new_fetch_pool, new_http_session
+
 BASE_URL = "http://localhost:8000"
 
-def signup(name, email, password, role):
-    response = requests.post(f"{BASE_URL}/signup", json={"name": name, "email": email, "password": password, "role": role})
-    return response.json()
+# Set on fetch_concurrently's worker threads, which cannot reach st.session_state
+_worker = threading.local()
 
+@st.cache_resource
+def _http_session():
+    """Keep-alive connection pool shared by every browser session of this Streamlit server."""
+    return new_http_session()
 
-def login(email, password):
-    response = requests.post(f"{BASE_URL}/token", data={"username": email, "password": password})
-    return response.json()
+@st.cache_resource
+def _fetch_pool():
+    return new_fetch_pool()
 
 def get_headers():
     if "token" in st.session_state:
         return {"Authorization": f"Bearer {st.session_state['token']}"}
     return {}
 
+def _state():
+    # (http session, auth headers, this run's GET cache)
+    state = getattr(_worker, "state", None)
+    if state is None:
+        state = (_http_session(), get_headers(), st.session_state.setdefault("api_cache", {}))
+    return state
+
+def begin_rerun():
+    """Starts a fresh response cache; call once at the top of every script run."""
+    st.session_state["api_cache"] = {}
+
+def fetch_concurrently(*calls):
+    """Runs independent read calls (zero-argument callables) on the shared pool and returns their results in order."""
+    state = _state()
+    def run(call):
+        _worker.state = state
+        try:
+            return call()
+        finally:
+            _worker.state = None
+    return list(_fetch_pool().map(run, calls))
+
 def handle_response(response):
     try:
         return response.json()
     except Exception:
         return {"detail": f"API Error {response.status_code}: {response.text[:100]}"}
 
+def _get(path, params=None):
+    """GET, reusing the response from earlier in this script run; any write in between empties the cache."""
+    session, headers, cache = _state()
+    key = (path, json.dumps(params, sort_keys=True, default=str))
+    if key in cache:
+        return cache[key]
+    response = session.get(f"{BASE_URL}{path}", params=params, headers=headers, timeout=API_TIMEOUT)
+    result = handle_response(response)
+    if response.ok:
+        cache[key] = result
+    return result
+
+def _send(method, path, headers=None, **kwargs):
+    session, auth_headers, cache = _state()
+    cache.clear()
+    return session.request(method, f"{BASE_URL}{path}", headers={**auth_headers, **(headers or {})}, timeout=API_TIMEOUT, **kwargs)
+
+def signup(name, email, password, role):
+    return _send("POST", "/signup", json={"name": name, "email": email, "password": password, "role": role}).json()
+
+
+def login(email, password):
+    return _send("POST", "/token", data={"username": email, "password": password}).json()
+
+def post_idempotent(path, json, idempotency_key, retries=2):
+    """POSTs with an Idempotency-Key and resends it on connection errors; the server answers a repeat with the first response."""
+    for attempt in range(retries + 1):
+        try:
+            return _send("POST", path, json=json, headers={"Idempotency-Key": idempotency_key})
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+
 # Admin APIs
 def add_venue(data):
-    return handle_response(requests.post(f"{BASE_URL}/admin/venues", json=data, headers=get_headers()))
+    return handle_response(_send("POST", "/admin/venues", json=data))
 
 def add_event(data):
-    return handle_response(requests.post(f"{BASE_URL}/admin/events", json=data, headers=get_headers()))
+    return handle_response(_send("POST", "/admin/events", json=data))
 
 def get_all_events():
-    return handle_response(requests.get(f"{BASE_URL}/admin/events/all", headers=get_headers()))
+    return _get("/admin/events/all")
+
+def get_event_sales_stats():
+    return _get("/admin/events/stats")
+
+def reconcile_event_stats():
+    return handle_response(_send("POST", "/admin/event-stats/reconcile"))
 
 def get_venues():
-    return handle_response(requests.get(f"{BASE_URL}/admin/venues", headers=get_headers()))
+    return _get("/admin/venues")
 
 def get_organizers():
-    return handle_response(requests.get(f"{BASE_URL}/admin/organizers", headers=get_headers()))
+    return _get("/admin/organizers")
 
 def seed_db():
-    return handle_response(requests.post(f"{BASE_URL}/admin/seed", headers=get_headers()))
+    return handle_response(_send("POST", "/admin/seed"))
 
 # Organizer APIs
 def create_seats(event_id, count):
-    return handle_response(requests.post(f"{BASE_URL}/organizer/events/{event_id}/seats", params={"seat_count": count}, headers=get_headers()))
+    return handle_response(_send("POST", f"/organizer/events/{event_id}/seats", params={"seat_count": count}))
+
+def create_seat_layout(event_id, sections):
+    return handle_response(_send("POST", f"/organizer/events/{event_id}/seats/layout", json={"sections": sections}))
 
 def get_my_events():
-    return handle_response(requests.get(f"{BASE_URL}/organizer/events/me", headers=get_headers()))
+    return _get("/organizer/events/me")
 
 def get_event_summary(event_id):
-    return handle_response(requests.get(f"{BASE_URL}/organizer/events/{event_id}/summary", headers=get_headers()))
+    return _get(f"/organizer/events/{event_id}/summary")
 
 def close_event_bookings(event_id):
-    return handle_response(requests.patch(f"{BASE_URL}/organizer/events/{event_id}/close", headers=get_headers()))
+    return handle_response(_send("PATCH", f"/organizer/events/{event_id}/close"))
 
 def get_my_profile():
-    return handle_response(requests.get(f"{BASE_URL}/organizer/profile/me", headers=get_headers()))
+    return _get("/organizer/profile/me")
 
 def update_profile(data):
-    return handle_response(requests.post(f"{BASE_URL}/organizer/profile/update", json=data, headers=get_headers()))
+    return handle_response(_send("POST", "/organizer/profile/update", json=data))
 
 def get_organizer_profile(org_id):
-    return handle_response(requests.get(f"{BASE_URL}/admin/organizers/{org_id}/profile", headers=get_headers()))
+    return _get(f"/admin/organizers/{org_id}/profile")
+
+def get_organizers_with_profiles(ids=None):
+    return _get("/admin/organizers/profiles", {"ids": ids} if ids else None)
 
 # Customer APIs
-def get_events():
-    return handle_response(requests.get(f"{BASE_URL}/customer/events", headers=get_headers()))
+def get_events(cursor=None, limit=20, **filters):
+    # filters: category, city, date_from, date_to, min_price, max_price, fields; returns {"items", "next_cursor"}
+    params = {k: v for k, v in filters.items() if v not in (None, "")}
+    params.update(cursor=cursor, limit=limit)
+    return _get("/customer/events", params)
+
+def search_events(query, limit=20):
+    return _get("/customer/events/search", {"q": query, "limit": limit})
 
 def get_available_seats(event_id):
-    return handle_response(requests.get(f"{BASE_URL}/customer/events/{event_id}/seats", headers=get_headers()))
+    return _get(f"/customer/events/{event_id}/seats")
+
+def get_seat_changes(event_id, since):
+    return _get(f"/customer/events/{event_id}/seats", {"since": since})
 
-def place_order(event_id, seat_ids, offer_code=None):
-    return handle_response(requests.post(f"{BASE_URL}/customer/orders", json={"event_id": event_id, "seat_ids": seat_ids, "offer_code": offer_code}, headers=get_headers()))
+def place_order(event_id, seat_ids, offer_code=None, idempotency_key=None):
+    return handle_response(post_idempotent("/customer/orders", {"event_id": event_id, "seat_ids": seat_ids, "offer_code": offer_code}, idempotency_key or str(uuid.uuid4())))
 
-def confirm_payment(order_id, seat_ids):
-    return handle_response(requests.post(f"{BASE_URL}/customer/orders/{order_id}/confirm_payment", json={"seat_ids": seat_ids}, headers=get_headers()))
+def confirm_payment(order_id, seat_ids, idempotency_key=None):
+    return handle_response(post_idempotent(f"/customer/orders/{order_id}/confirm_payment", {"seat_ids": seat_ids}, idempotency_key or f"confirm-{order_id}"))
 
 def create_razorpay_order_api(order_id):
-    return handle_response(requests.post(f"{BASE_URL}/customer/orders/{order_id}/create-razorpay-order", headers=get_headers()))
+    return handle_response(_send("POST", f"/customer/orders/{order_id}/create-razorpay-order"))
 
-def verify_razorpay_payment_api(order_id, razorpay_data):
-    return handle_response(requests.post(f"{BASE_URL}/customer/orders/{order_id}/verify-razorpay-payment", json=razorpay_data, headers=get_headers()))
+def verify_razorpay_payment_api(order_id, razorpay_data, idempotency_key=None):
+    return handle_response(post_idempotent(f"/customer/orders/{order_id}/verify-razorpay-payment", razorpay_data, idempotency_key or f"verify-{order_id}-{razorpay_data['razorpay_payment_id']}"))
+
+def get_order(order_id):
+    return _get(f"/customer/orders/{order_id}")
 
 def get_my_tickets():
-    return handle_response(requests.get(f"{BASE_URL}/customer/tickets", headers=get_headers()))
+    return _get("/customer/tickets")
 
 # Entry APIs
-def validate_ticket(code):
-    return handle_response(requests.post(f"{BASE_URL}/entry/validate/{code}", headers=get_headers()))
+def validate_ticket(code, event_id=None):
+    params = {"event_id": event_id} if event_id else None
+    return handle_response(_send("POST", f"/entry/validate/{code}", params=params))
+
+def admit_ticket(code, event_id=None):
+    params = {"event_id": event_id} if event_id else None
+    return handle_response(_send("POST", f"/entry/admit/{code}", params=params))
 
 def mark_used(ticket_id):
-    return handle_response(requests.patch(f"{BASE_URL}/entry/tickets/{ticket_id}/use", headers=get_headers()))
+    return handle_response(_send("PATCH", f"/entry/tickets/{ticket_id}/use"))
+
+def get_manifest_key():
+    return _get("/entry/manifest-key")
+
+def get_gate_manifest(event_id):
+    return _get(f"/entry/events/{event_id}/manifest")
+
+def upload_gate_scans(event_id, scans):
+    return handle_response(_send("POST", f"/entry/events/{event_id}/scans", json={"scans": scans}))
 
 # Support APIs
 def get_cases():
-    return handle_response(requests.get(f"{BASE_URL}/support/cases", headers=get_headers()))
+    return _get("/support/cases")
 
 def update_case_status(case_id, status, notes):
-    return handle_response(requests.patch(f"{BASE_URL}/support/cases/{case_id}", json={"status": status, "notes": notes}, headers=get_headers()))
+    return handle_response(_send("PATCH", f"/support/cases/{case_id}", json={"status": status, "notes": notes}))
 
 def get_refunds():
-    return handle_response(requests.get(f"{BASE_URL}/support/refunds", headers=get_headers()))
+    return _get("/support/refunds")
 
 def approve_refund(refund_id, approve: bool):
-    return handle_response(requests.post(f"{BASE_URL}/support/refunds/{refund_id}/approve", json={"approve": approve}, headers=get_headers()))
+    return handle_response(_send("POST", f"/support/refunds/{refund_id}/approve", json={"approve": approve}))
 
 def raise_support_case(order_id, description):
-    return handle_response(requests.post(f"{BASE_URL}/customer/support", json={"order_id": order_id, "description": description}, headers=get_headers()))
+    return handle_response(_send("POST", "/customer/support", json={"order_id": order_id, "description": description}))
 
 def request_refund(order_id, reason):
-    return handle_response(requests.post(f"{BASE_URL}/customer/refunds", json={"order_id": order_id, "reason": reason}, headers=get_headers()))
+    return handle_response(_send("POST", "/customer/refunds", json={"order_id": order_id, "reason": reason}))
@@ -0,0 +1,27 @@
+"""HTTP session and fetch pool behind api_client, kept free of Streamlit so they can be driven from a script."""
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds; without one a hung backend hangs the page forever
+API_TIMEOUT = (3.05, 30)
+API_POOL_SIZE = 16
+API_FETCH_WORKERS = 8
+
+def new_http_session():
+    """Keep-alive connection pool with retries; api_client shares one between every browser session."""
+    session = requests.Session()
+    # Sessions are shared between users, so never keep cookies; auth travels in headers
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    # Connection failures are retried for any method (nothing was sent); reads and 502-504s only for GETs
+    retry = Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504), allowed_methods=frozenset({"GET", "HEAD"}), raise_on_status=False)
+    adapter = HTTPAdapter(pool_maxsize=API_POOL_SIZE, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def new_fetch_pool():
+    return ThreadPoolExecutor(max_workers=API_FETCH_WORKERS, thread_name_prefix="api-fetch")
@@ -1,4 +1,5 @@
 import streamlit as st
+import api_client
 from auth_ui import login_section, signup_section
 from customer_ui import customer_dashboard
 from admin_ui import admin_dashboard, organizer_dashboard
@@ -6,6 +7,7 @@ from entry_ui import entry_dashboard
 from support_ui import support_dashboard
 
 st.set_page_config(page_title="Eventora - Ticket Booking Platform", layout="wide", initial_sidebar_state="expanded")
+api_client.begin_rerun()
 
 # Custom CSS for "Wowed" design
 st.markdown("""
@@ -1,6 +1,21 @@
+import uuid
+
 import streamlit as st
-from api_client import get_events, get_available_seats, place_order, confirm_payment, get_my_tickets, raise_support_case, request_refund, create_razorpay_order_api, verify_razorpay_payment_api
+from api_client import fetch_concurrently, get_events, search_events, get_seat_changes, place_order, confirm_payment, get_my_tickets, raise_support_case, request_refund, create_razorpay_order_api, verify_razorpay_payment_api, get_order
+
 
+def get_seat_map(event_id):
+    # Keep a local copy of the seat map across reruns and only pull what changed since its version
+    seat_maps = st.session_state.setdefault("seat_maps", {})
+    local = seat_maps.get(event_id, {"version": -1, "seats": {}})
+    res = get_seat_changes(event_id, local["version"])
+    if "changes" not in res:
+        return list(local["seats"].values())
+    for s in res["changes"]:
+        local["seats"][s["id"]] = s
+    local["version"] = res["version"]
+    seat_maps[event_id] = local
+    return list(local["seats"].values())
 
 def customer_dashboard():
     st.title("🎟️ Online Event Booking")
@@ -9,7 +24,25 @@ def customer_dashboard():
     
     with tab1:
         st.header("Upcoming Events")
-        events = get_events()
+        search = st.text_input("🔍 Search events, venues, cities or organizers").strip()
+        f1, f2, f3 = st.columns(3)
+        category = f1.text_input("Category")
+        city = f2.text_input("City")
+        max_price = f3.number_input("Max Price", min_value=0.0, value=0.0, step=100.0)
+        filters = {"category": category.strip(), "city": city.strip(), "max_price": max_price or None}
+        # Pages already walked for these filters, as the cursors that fetched them
+        if st.session_state.get("event_filters") != filters:
+            st.session_state["event_filters"] = filters
+            st.session_state["event_cursors"] = [None]
+        cursors = st.session_state["event_cursors"]
+        # My Tickets renders on the same run, so fetch its tickets alongside the page
+        if search:
+            page, tickets = fetch_concurrently(lambda: search_events(search), get_my_tickets)
+            if isinstance(page, dict) and page.get("corrected_query"):
+                st.caption(f"Showing results for: {page['corrected_query']}")
+        else:
+            page, tickets = fetch_concurrently(lambda: get_events(cursor=cursors[-1], **filters), get_my_tickets)
+        events = page.get("items", []) if isinstance(page, dict) else []
         if not events:
             st.info("No upcoming events found.")
         
@@ -18,7 +51,7 @@ def customer_dashboard():
                 st.markdown(f"""
                 <div class="card">
                     <h3>{ev['name']}</h3>
-                    <p>Category: {ev['category']} | Date: {ev['event_date']}</p>
+                    <p>Category: {ev['category']} | City: {ev['city']} | Date: {ev['event_date']}</p>
                     <p>Price: <b>₹{ev['ticket_price']}</b></p>
                 </div>
                 """, unsafe_allow_html=True)
@@ -26,21 +59,30 @@ def customer_dashboard():
                     st.session_state["selected_event"] = ev
                     st.session_state["booking_step"] = "seats"
         
+        p1, p2 = st.columns(2)
+        if not search and len(cursors) > 1 and p1.button("⬅️ Previous"):
+            cursors.pop()
+            st.rerun()
+        if not search and isinstance(page, dict) and page.get("next_cursor") and p2.button("Next ➡️"):
+            cursors.append(page["next_cursor"])
+            st.rerun()
+        
         if "booking_step" in st.session_state and st.session_state["booking_step"] == "seats":
             st.divider()
             ev = st.session_state["selected_event"]
             st.subheader(f"Select Seats for {ev['name']}")
-            seats = get_available_seats(ev['id'])
+            seats = get_seat_map(ev['id'])
             
             if not seats:
                 st.warning("No seats generated for this event yet.")
             else:
                 booked_count = sum(1 for s in seats if s['status'] == 'booked')
+                held_count = sum(1 for s in seats if s['status'] == 'held')
                 total_count = len(seats)
-                st.write(f"📊 Capacity: {total_count} | Booked: {booked_count} | Available: {total_count - booked_count}")
+                st.write(f"📊 Capacity: {total_count} | Booked: {booked_count} | On Hold: {held_count} | Available: {total_count - booked_count - held_count}")
                 
                 st.write("### Seating Map")
-                st.caption("🟩 Available | 🟥 Booked")
+                st.caption("🟩 Available | 🟨 On Hold | 🟥 Booked")
                 
                 selected_seat_ids = []
                 # 10 columns grid
@@ -49,12 +91,17 @@ def customer_dashboard():
                     col = row_cols[i % 10]
                     if s['status'] == 'booked':
                         col.button(f"🚫 {s['seat_number']}", key=f"seat_{s['id']}", disabled=True)
+                    elif s['status'] == 'held':
+                        col.button(f"⏳ {s['seat_number']}", key=f"seat_{s['id']}", disabled=True)
                     else:
                         if col.checkbox(f"💺 {s['seat_number']}", key=f"seat_cb_{s['id']}"):
                             selected_seat_ids.append(s['id'])
                 
                 if st.button("Proceed to Pay"):
-                    res = place_order(ev['id'], selected_seat_ids)
+                    # Same checkout and seats -> same key, so a rerun or resend replays the first order instead of failing
+                    checkout_id = st.session_state.setdefault("checkout_id", str(uuid.uuid4()))
+                    order_key = f"{checkout_id}-{ev['id']}-{'.'.join(map(str, sorted(selected_seat_ids)))}"
+                    res = place_order(ev['id'], selected_seat_ids, idempotency_key=order_key)
                     if "order_id" in res:
                         st.session_state["pending_order"] = res
                         st.session_state["selected_seat_ids"] = selected_seat_ids
@@ -70,6 +117,8 @@ def customer_dashboard():
             st.subheader("💳 Complete Payment")
             st.write(f"Order ID: {order_info['order_id']}")
             st.write(f"Total Amount: ₹{order_info['total_amount']}")
+            if order_info.get('held_until'):
+                st.caption(f"Seats are held until {order_info['held_until']}. Complete payment before then.")
             
             pay_method = st.radio("Select Payment Method", ["Simulation (Fast)", "Razorpay (Test Mode)"])
             
@@ -79,6 +128,7 @@ def customer_dashboard():
                     if "message" in pay_res:
                         st.success("Booking confirmed! Check 'My Tickets'.")
                         del st.session_state["booking_step"]
+                        st.session_state.pop("checkout_id", None)
                         st.rerun()
                     else:
                         st.error("Payment failed.")
@@ -95,6 +145,18 @@ def customer_dashboard():
                         st.error("Failed to create Razorpay order.")
                 
                 if "rzp_order_id" in st.session_state:
+                    # Razorpay's webhook confirms the order on the server even if this tab is closed
+                    if st.button("Check Payment Status"):
+                        status_res = get_order(order_info['order_id'])
+                        if status_res.get("order_status") == "confirmed":
+                            st.success(f"Payment received! {status_res['ticket_count']} ticket(s) generated.")
+                            del st.session_state["booking_step"]
+                            del st.session_state["rzp_order_id"]
+                            st.session_state.pop("checkout_id", None)
+                            st.rerun()
+                        else:
+                            st.info(f"Order is {status_res.get('order_status', 'unknown')}; payment not confirmed yet.")
+
                     st.write("---")
                     st.caption("Simulate Razorpay Success Callback")
                     payment_id = st.text_input("Razorpay Payment ID", value="pay_test_123")
@@ -112,13 +174,13 @@ def customer_dashboard():
                             st.success("Payment verified! Ticket generated.")
                             del st.session_state["booking_step"]
                             del st.session_state["rzp_order_id"]
+                            st.session_state.pop("checkout_id", None)
                             st.rerun()
                         else:
                             st.error(verify_res.get("detail", "Verification failed. (Note: Signature verification will fail if not using real keys)"))
 
     with tab2:
         st.header("Your Tickets")
-        tickets = get_my_tickets()
         if not tickets:
             st.info("You haven't booked any tickets yet.")
         for t in tickets:
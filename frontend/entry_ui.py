@@ -1,13 +1,37 @@
+import base64
+import hashlib
+import os
+import struct
+from datetime import datetime
+
 import streamlit as st
-from api_client import validate_ticket, mark_used
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+from api_client import validate_ticket, admit_ticket, mark_used, get_manifest_key, get_gate_manifest, upload_gate_scans
+
+# Pin the backend's manifest key here (GET /entry/manifest-key) to stop trusting whatever the server sends
+GATE_MANIFEST_PUBLIC_KEY = os.getenv("GATE_MANIFEST_PUBLIC_KEY")
 
 def entry_dashboard():
     st.title("🛂 Entry Management")
+    mode = st.radio("Mode", ["Online", "Offline scanner"], horizontal=True)
+    if mode == "Offline scanner":
+        offline_scanner()
+        return
+
     st.subheader("Scan / Validate Tickets")
     
+    event_id = st.number_input("Event ID at this gate (0 = any event)", min_value=0, step=1)
     code = st.text_input("Enter Ticket Code")
-    if st.button("Validate"):
-        res = validate_ticket(code)
+    admit_col, validate_col = st.columns(2)
+    if admit_col.button("Admit", type="primary"):
+        res = admit_ticket(code.strip(), int(event_id) or None)
+        if "ticket_id" in res:
+            st.success(f"{res['message']} (#{res['ticket_id']})")
+        else:
+            st.error(res.get("detail", "Invalid code"))
+    if validate_col.button("Validate Only"):
+        res = validate_ticket(code.strip(), int(event_id) or None)
         if "ticket_id" in res:
             st.success(res["message"])
             if st.button(f"Mark Ticket #{res['ticket_id']} as USED"):
@@ -15,3 +39,67 @@ def entry_dashboard():
                 st.info(use_res["message"])
         else:
             st.error(res.get("detail", "Invalid code"))
+
+def code_hash(code):
+    # Must match backend/gate_manifest.py
+    return int.from_bytes(hashlib.sha256(code.strip().upper().encode()).digest()[:8], "big")
+
+def manifest_signature_ok(manifest, public_key):
+    # Must match backend/gate_manifest.py
+    payload = f"manifest:{manifest['event_id']}:{manifest['generated_at']}:{manifest['entries']}".encode()
+    try:
+        Ed25519PublicKey.from_public_bytes(base64.b64decode(public_key)).verify(base64.b64decode(manifest["signature"]), payload)
+    except (InvalidSignature, ValueError):
+        return False
+    return True
+
+def offline_scanner():
+    st.subheader("Offline Scanner")
+    st.caption("Download the event manifest while online, scan without a connection, then upload the scans.")
+
+    event_id = st.number_input("Event ID", min_value=1, step=1)
+    if st.button("Download Manifest"):
+        manifest = get_gate_manifest(int(event_id))
+        public_key = GATE_MANIFEST_PUBLIC_KEY or get_manifest_key().get("public_key")
+        if "entries" in manifest and not (public_key and manifest_signature_ok(manifest, public_key)):
+            st.error("Manifest signature does not match, not loaded")
+        elif "entries" in manifest:
+            records = struct.iter_unpack(">QI", base64.b64decode(manifest["entries"]))
+            st.session_state["gate_manifest"] = {"event_id": manifest["event_id"], "tickets": dict(records)}
+            st.session_state["gate_admitted"] = set()
+            st.session_state["gate_scans"] = []
+            st.success(f"Loaded {manifest['ticket_count']} tickets for event {manifest['event_id']}")
+        else:
+            st.error(manifest.get("detail", "Could not download manifest"))
+
+    manifest = st.session_state.get("gate_manifest")
+    if not manifest:
+        return
+
+    st.info(f"Scanning for event {manifest['event_id']} • {len(manifest['tickets'])} tickets loaded")
+    code = st.text_input("Scan Ticket Code")
+    if st.button("Scan") and code:
+        ticket_id = manifest["tickets"].get(code_hash(code))
+        admitted = st.session_state["gate_admitted"]
+        if ticket_id is None:
+            result = "failed"
+            st.error("Invalid ticket")
+        elif ticket_id in admitted:
+            result = "failed"
+            st.error("Ticket already used")
+        else:
+            result = "success"
+            admitted.add(ticket_id)
+            st.success(f"Valid ticket #{ticket_id}")
+        st.session_state["gate_scans"].append({"ticket_id": ticket_id, "scanned_at": datetime.now().isoformat(), "result": result})
+
+    pending = st.session_state["gate_scans"]
+    if pending and st.button(f"Upload {len(pending)} Scans"):
+        res = upload_gate_scans(manifest["event_id"], pending)
+        if "received" in res:
+            st.session_state["gate_scans"] = []
+            st.success(f"Synced {res['received']} scans, {res['admitted']} admitted")
+            for conflict in res["conflicts"]:
+                st.warning(f"Ticket #{conflict['ticket_id']}: {conflict['reason']}")
+        else:
+            st.error(res.get("detail", "Upload failed, scans kept for retry"))
@@ -1,14 +1,14 @@
 import streamlit as st
-from api_client import get_cases, get_refunds, update_case_status, approve_refund
+from api_client import fetch_concurrently, get_cases, get_refunds, update_case_status, approve_refund
 
 def support_dashboard():
     st.title("🎧 Support Representative")
     
+    cases, refunds = fetch_concurrently(get_cases, get_refunds)
     tab1, tab2 = st.tabs(["Active Cases", "Refund Requests"])
     
     with tab1:
         st.subheader("User Support Tickets")
-        cases = get_cases()
         
         if not cases:
             st.info("No active support cases.")
@@ -39,7 +39,6 @@ def support_dashboard():
 
     with tab2:
         st.subheader("Pending Refunds")
-        refunds = get_refunds()
         
         if not refunds:
             st.info("No pending refund requests.")